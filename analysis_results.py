@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+
+# What analyze_log_result returns: plain, slotted records that the report
+# writers (see report_writers) render as Markdown, JSON or NDJSON and that
+# tickets read directly. Epochs are seconds; counts are (name, count)
+# pairs in report order.
+
+@dataclass(slots=True)
+class TemplateFinding:
+    """
+    One error template (see log_templates) with its occurrences.
+    """
+    template_id: int
+    text: str
+    count: int
+    first_seen: float | None
+    last_seen: float | None
+    samples: list[str]
+
+@dataclass(slots=True)
+class CodeSnippet:
+    file: str
+    line: int
+    text: str
+
+@dataclass(slots=True)
+class TraceFinding:
+    """
+    One distinct stack trace (see TraceGroup), with the code snippets of
+    its frames when code context was available.
+    """
+    language: str
+    fingerprint: str
+    exception: str | None
+    count: int
+    first_seen: float | None
+    last_seen: float | None
+    lines: list[str]
+    snippets: list[CodeSnippet] = field(default_factory=list)
+
+@dataclass(slots=True)
+class TraceSummary:
+    language: str
+    total: int
+    traces: list[TraceFinding]
+
+@dataclass(slots=True)
+class FileSummary:
+    """
+    Totals of one file of a multi-file analysis. traces holds
+    (language, total, [(fingerprint, count)]) per trace format.
+    """
+    path: str
+    line_count: int
+    error_line_count: int
+    distinct_templates: int
+    levels: list[tuple[str, int]]
+    timeline_label: str
+    timeline: list[tuple[str, int]]
+    error_types: list[tuple[str, int]]
+    traces: list[tuple[str, int, list[tuple[str, int]]]]
+
+@dataclass(slots=True)
+class FieldSummary:
+    """
+    Aggregates of one field of structured records. top_values counts the
+    non-numeric values (all values of a name:top field), approximately if
+    capped; the numeric ones are summarized by minimum, maximum, mean and
+    percentiles, (p, value) pairs within 1% of the exact values.
+    """
+    name: str
+    count: int
+    top_values: list[tuple[str, int]]
+    capped: bool
+    numeric_count: int
+    minimum: float | None
+    maximum: float | None
+    mean: float | None
+    percentiles: list[tuple[int, float]]
+
+@dataclass(slots=True)
+class StructuredSummary:
+    """
+    The JSON-lines records among the log's lines (see structured_logs),
+    read with the parser named.
+    """
+    record_count: int
+    parser: str
+    loggers: list[tuple[str, int]]
+    fields: list[FieldSummary]
+
+@dataclass(slots=True)
+class PatchSuggestion:
+    """
+    The LLM's answer for one error template.
+    """
+    template: TemplateFinding
+    patch: str
+
+@dataclass(slots=True)
+class ReportContext:
+    # Excerpt of the cached report given as context and how it relates
+    excerpt: str
+    truncated: bool
+    related_error_types: list[str]
+    llm_summary: str | None = None
+
+@dataclass(slots=True)
+class CodeContextSummary:
+    readme: str | None
+    file_count: int | None
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """
+    Everything a log report shows. error is set (and everything else left
+    empty) when the log could not be read; log_sets and files are only
+    filled for multi-file analyses. window is the (since, until) time
+    window analyzed, None for the whole log. structured is only set when
+    the log has structured records.
+    """
+    label: str
+    error: str | None = None
+    window: tuple[str | None, str | None] | None = None
+    log_sets: list[tuple[str, list[str]]] | None = None
+    levels: list[tuple[str, int]] = field(default_factory=list)
+    timeline_label: str = ""
+    timeline: list[tuple[str, int]] = field(default_factory=list)
+    line_count: int = 0
+    error_line_count: int = 0
+    error_types: list[tuple[str, int]] = field(default_factory=list)
+    templates: list[TemplateFinding] = field(default_factory=list)
+    traces: list[TraceSummary] = field(default_factory=list)
+    detector_counts: list[tuple[str, int]] = field(default_factory=list)
+    structured: StructuredSummary | None = None
+    files: list[FileSummary] | None = None
+    report_context: ReportContext | None = None
+    suggestions: list[PatchSuggestion] | None = None
+    code_context: CodeContextSummary | None = None
+    performance: dict | None = None
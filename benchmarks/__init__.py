@@ -0,0 +1,5 @@
+"""
+Benchmarks for the log analysis pipeline: a deterministic synthetic log
+generator (benchmarks.generate) and a runner that times each stage and the
+whole analysis against a stored baseline (benchmarks.run).
+"""
@@ -0,0 +1,232 @@
+"""
+Deterministic synthetic logs for benchmarking.
+
+    python -m benchmarks.generate bench.log --size 10MB
+    python -m benchmarks.generate bench.log --size 1GB --levels INFO=70,ERROR=20,WARNING=10 \
+        --formats iso,syslog --python-traces 5 --java-traces 2 --nodejs-traces 2
+    python -m benchmarks.generate bench.jsonl --size 100MB --json
+
+The same settings and seed always produce the same bytes. Timestamps
+advance monotonically from 2024-03-01 in every format the analyzer
+recognises; trace densities are traces per 1000 log lines. With --json
+every line is a JSON record instead, its stack trace in an "exception"
+field, with latency_ms and status fields to aggregate.
+"""
+import argparse
+import json
+import random
+import time
+
+DEFAULT_LEVELS = {"INFO": 80, "DEBUG": 6, "WARNING": 8, "ERROR": 5, "CRITICAL": 1}
+TIMESTAMP_FORMATS = ("iso", "slash", "clf", "syslog")
+DEFAULT_FORMATS = ("iso",)
+DEFAULT_TRACE_DENSITY = {"python": 2.0, "java": 1.0, "nodejs": 1.0}
+START_EPOCH = 1709251200  # 2024-03-01 00:00:00 UTC
+MEAN_LINE_GAP = 0.05  # seconds between log lines
+WRITE_BATCH = 4096  # lines per write
+SIZE_UNITS = {"KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+
+MESSAGES = {
+    "INFO": ("request id={n} path=/api/v1/items/{n} status=200 took {n}ms",
+             "user {n} logged in from 10.0.{b}.{b}",
+             "cache refresh finished: {n} keys in {n}ms"),
+    "DEBUG": ("poll cycle {n}: {n} events queued",
+              "connection {hex} returned to pool"),
+    "WARNING": ("slow query took {n}ms on shard {b}",
+                "retrying request {uuid} (attempt {b})"),
+    "ERROR": ("ConnectionError: connection to 10.0.{b}.{b}:{port} refused",
+              "ValueError: invalid value {n} for field user_id",
+              "TimeoutError: upstream 10.1.{b}.{b}:{port} did not answer within {n}ms"),
+    "CRITICAL": ("worker {n} crashed: MemoryError",
+                 "disk /dev/sd{letter} failed health check"),
+}
+PYTHON_TRACES = (
+    ['Traceback (most recent call last):',
+     '  File "/srv/app/handlers.py", line 42, in handle',
+     '    result = process(request)',
+     '  File "/srv/app/service.py", line 17, in process',
+     '    raise ValueError(f"bad id {id}")',
+     'ValueError: bad id {n}'],
+    ['Traceback (most recent call last):',
+     '  File "/srv/app/worker.py", line 88, in run',
+     '    self.flush()',
+     '  File "/srv/app/db/session.py", line 230, in flush',
+     '    conn.execute(stmt)',
+     'KeyError: \'shard-{b}\''],
+)
+JAVA_TRACES = (
+    ['java.lang.IllegalStateException: connection pool exhausted (size={b})',
+     '    at com.example.db.Pool.acquire(Pool.java:88)',
+     '    at com.example.api.Handler.handle(Handler.java:31)',
+     '    at java.base/java.lang.Thread.run(Thread.java:833)',
+     ''],
+    ['java.io.IOException: stream closed after {n} bytes',
+     '    at com.example.io.Reader.read(Reader.java:120)',
+     '    at com.example.ingest.Job.process(Job.java:57)',
+     ''],
+)
+NODEJS_TRACES = (
+    ['TypeError: Cannot read properties of undefined (reading \'id\')',
+     '    at handler (/srv/api/routes/items.js:23:17)',
+     '    at Layer.handle (/srv/api/node_modules/express/lib/router/layer.js:95:5)',
+     ''],
+    ['RangeError: Maximum call stack size exceeded',
+     '    at walk (/srv/api/lib/tree.js:11:9)',
+     '    at walk (/srv/api/lib/tree.js:14:12)',
+     ''],
+)
+TRACES = {"python": PYTHON_TRACES, "java": JAVA_TRACES, "nodejs": NODEJS_TRACES}
+
+def parse_size(text):
+    """
+    "10MB", "1GB", "512KB" or a plain byte count.
+    """
+    text = text.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+def format_size(size):
+    for unit, factor in reversed(SIZE_UNITS.items()):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+def _format_stamp(epoch, fmt):
+    t = time.gmtime(epoch)
+    if fmt == "iso":
+        return time.strftime("%Y-%m-%d %H:%M:%S", t)
+    if fmt == "slash":
+        return time.strftime("%Y/%m/%d %H:%M:%S", t)
+    if fmt == "clf":
+        return time.strftime("[%d/%b/%Y:%H:%M:%S +0000]", t)
+    return f"{time.strftime('%b', t)} {t.tm_mday:2d} {time.strftime('%H:%M:%S', t)}"
+
+class LogGenerator:
+    """
+    Endless, reproducible stream of log lines. levels maps level names to
+    relative weights, formats lists the timestamp formats to rotate through
+    (one picked per line) and trace_density gives, per language, how many
+    stack traces follow every 1000 log lines. structured=True writes JSON
+    records (ISO timestamps only) with the trace in an "exception" field.
+    """
+    def __init__(self, levels=None, formats=DEFAULT_FORMATS, trace_density=None, seed=1, structured=False):
+        self.levels = dict(levels or DEFAULT_LEVELS)
+        unknown = set(formats) - set(TIMESTAMP_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown timestamp format(s) {', '.join(sorted(unknown))}; expected {', '.join(TIMESTAMP_FORMATS)}")
+        self.formats = tuple(formats)
+        self.trace_density = dict(DEFAULT_TRACE_DENSITY if trace_density is None else trace_density)
+        self.rng = random.Random(seed)
+        self._fields = _Fields(self.rng)
+        self.epoch = float(START_EPOCH)
+        self._stamps = {}
+        self.structured = structured
+
+    def _stamp(self, fmt):
+        second = int(self.epoch)
+        cached = self._stamps.get(fmt)
+        if cached is None or cached[0] != second:
+            cached = self._stamps[fmt] = (second, _format_stamp(second, fmt))
+        return cached[1]
+
+    def _fill(self, template):
+        if "{" not in template:
+            return template
+        return template.format_map(self._fields)
+
+    def lines(self):
+        rng = self.rng
+        level_names = list(self.levels)
+        level_weights = list(self.levels.values())
+        trace_langs = [lang for lang, density in self.trace_density.items() if density > 0]
+        trace_chance = [(lang, self.trace_density[lang] / 1000.0) for lang in trace_langs]
+        while True:
+            self.epoch += rng.expovariate(1 / MEAN_LINE_GAP)
+            fmt = self.formats[0] if len(self.formats) == 1 else rng.choice(self.formats)
+            level = rng.choices(level_names, level_weights)[0]
+            message = self._fill(rng.choice(MESSAGES.get(level, MESSAGES["INFO"])))
+            logger = rng.choice(('api', 'worker', 'db', 'auth'))
+            traces = [[self._fill(line) for line in rng.choice(TRACES[lang])] for lang, chance in trace_chance if rng.random() < chance]
+            if self.structured:
+                record = {"timestamp": self._stamp("iso").replace(" ", "T") + "Z", "level": level, "logger": logger, "message": message,
+                          "latency_ms": round(rng.lognormvariate(3, 1), 3), "status": rng.choice((200, 200, 200, 201, 404, 500))}
+                if traces:
+                    record["exception"] = "\n".join(traces[0]).strip()
+                yield json.dumps(record)
+                continue
+            yield f"{self._stamp(fmt)} {level} [{logger}] {message}"
+            for trace in traces:
+                yield from trace
+
+class _Fields(dict):
+    # Random values for the {n}, {b}, {port}, {hex}, {uuid}, {letter} and
+    # {id} placeholders of the message templates.
+    def __init__(self, rng):
+        super().__init__()
+        self.rng = rng
+
+    def __missing__(self, key):
+        rng = self.rng
+        if key == "n":
+            return rng.randrange(1, 100000)
+        if key == "b":
+            return rng.randrange(0, 256)
+        if key == "port":
+            return rng.randrange(1024, 65536)
+        if key == "hex":
+            return f"0x{rng.getrandbits(32):08x}"
+        if key == "uuid":
+            return "%08x-%04x-%04x-%04x-%012x" % tuple(rng.getrandbits(bits) for bits in (32, 16, 16, 16, 48))
+        if key == "letter":
+            return rng.choice("abcdef")
+        return "{" + key + "}"
+
+def generate_log(path, size, levels=None, formats=DEFAULT_FORMATS, trace_density=None, seed=1, structured=False):
+    """
+    Write about `size` bytes of synthetic log to path (stopping at the first
+    line boundary past it). Returns (bytes written, lines written).
+    """
+    generator = LogGenerator(levels, formats, trace_density, seed, structured).lines()
+    written = lines = 0
+    with open(path, "wb") as f:
+        while written < size:
+            batch = "".join(next(generator) + "\n" for _ in range(WRITE_BATCH)).encode()
+            if written + len(batch) > size:
+                # trim the last batch to the first line end past `size`
+                cut = batch.find(b"\n", size - written - 1) + 1
+                batch = batch[:cut]
+            f.write(batch)
+            written += len(batch)
+            lines += batch.count(b"\n")
+    return written, lines
+
+def _parse_levels(text):
+    levels = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        levels[name.strip().upper()] = float(weight or 1)
+    return levels
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.generate", description="Write a deterministic synthetic log.")
+    parser.add_argument("path")
+    parser.add_argument("--size", default="10MB", help="target size, e.g. 10MB, 1GB (default: 10MB)")
+    parser.add_argument("--levels", type=_parse_levels, help="level weights, e.g. INFO=80,WARNING=10,ERROR=10")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS), help=f"timestamp formats to mix: {', '.join(TIMESTAMP_FORMATS)}")
+    for lang, density in DEFAULT_TRACE_DENSITY.items():
+        parser.add_argument(f"--{lang}-traces", type=float, default=density, help=f"{lang} traces per 1000 lines (default: {density:g})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="write JSON-lines records instead of text lines")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    density = {lang: getattr(args, f"{lang}_traces") for lang in DEFAULT_TRACE_DENSITY}
+    start = time.perf_counter()
+    size, lines = generate_log(args.path, parse_size(args.size), args.levels, args.formats.split(","), density, args.seed, args.json)
+    print(f"Wrote {args.path}: {size} bytes, {lines} lines in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
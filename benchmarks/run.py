@@ -0,0 +1,229 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks.run                      # 10MB input, compared with the baseline
+    python -m benchmarks.run --sizes 10MB,1GB,10GB
+    python -m benchmarks.run --update-baseline    # record the current numbers
+    python -m benchmarks.run --stages analyze_log_file --workers 4
+
+Inputs are generated once by benchmarks.generate into benchmarks/data/.
+Each stage runs in a fresh interpreter so its peak RSS is its own; the
+line-level stages are fed the log in batches of BATCH_LINES lines, the
+end-to-end stages read the file themselves. The run fails (exit status 1)
+when a stage's MB/s drops, or its peak RSS grows, by more than the
+threshold relative to benchmarks/baseline.json.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from itertools import islice
+from benchmarks.generate import format_size, generate_log, parse_size
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SIZES = ("10MB",)
+DEFAULT_THRESHOLD = 0.10
+BATCH_LINES = 100000
+# Small inputs finish in a second or two, where noise dominates: take the
+# best of several runs unless told otherwise.
+SMALL_INPUT_BYTES = 100 << 20
+SMALL_INPUT_REPEAT = 3
+LINE_STAGES = ("parse_log_levels_and_timestamps", "parse_python_stack_traces", "parse_java_stack_traces", "parse_nodejs_stack_traces")
+FILE_STAGES = ("analyze_log", "analyze_log_file")
+STAGES = LINE_STAGES + FILE_STAGES
+
+def input_path(size, seed):
+    return os.path.join(DATA_DIR, f"synthetic_{format_size(size)}_seed{seed}.log")
+
+def ensure_input(size, seed):
+    """
+    Path of the generated input of this size and its (bytes, lines),
+    generating it on first use.
+    """
+    path = input_path(size, seed)
+    meta_path = path + ".meta.json"
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["bytes"] == os.path.getsize(path):
+            return path, meta["bytes"], meta["lines"]
+    os.makedirs(DATA_DIR, exist_ok=True)
+    print(f"Generating {format_size(size)} benchmark log in {path} ...", file=sys.stderr)
+    n_bytes, n_lines = generate_log(path, size, seed=seed)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"bytes": n_bytes, "lines": n_lines, "seed": seed}, f)
+    return path, n_bytes, n_lines
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of this process or any of its finished children
+    (worker pools), or None where the resource module is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def run_stage(stage, path, workers):
+    """
+    Time one stage over path in this process. Returns seconds spent in it.
+    """
+    import log_analysis
+    if stage in LINE_STAGES:
+        from log_input import open_log_lines
+        func = getattr(log_analysis, stage)
+        elapsed = 0.0
+        with open_log_lines(path) as lines:
+            while True:
+                batch = list(islice(lines, BATCH_LINES))
+                if not batch:
+                    break
+                start = time.perf_counter()
+                func(batch)
+                elapsed += time.perf_counter() - start
+        return elapsed
+    start = time.perf_counter()
+    if stage == "analyze_log":
+        log_analysis.analyze_log(path, workers)
+    else:
+        log_analysis.analyze_log_file(path, workers=workers)
+    return time.perf_counter() - start
+
+def measure(stage, path, workers, repeat):
+    """
+    Run a stage `repeat` times, each in a fresh interpreter. Returns the
+    best time in seconds and the highest peak RSS in bytes (or None).
+    """
+    best = rss = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--child", stage, path, "--workers", str(workers)],
+            cwd=os.path.dirname(BENCH_DIR), capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"{stage} failed:\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        if result["peak_rss"] is not None:
+            rss = max(rss or 0, result["peak_rss"])
+    return best, rss
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_baseline(results, path=BASELINE_PATH):
+    baseline = load_baseline(path) or {"results": {}}
+    baseline["machine"] = f"{platform.platform()} / {platform.python_implementation()} {platform.python_version()} / {os.cpu_count()} CPUs"
+    for size_label, stages in results.items():
+        baseline["results"].setdefault(size_label, {}).update(stages)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def compare(current, reference, threshold):
+    """
+    Regressions of one stage against its baseline entry, as messages.
+    """
+    problems = []
+    if reference.get("mb_per_sec") and current["mb_per_sec"] < reference["mb_per_sec"] * (1 - threshold):
+        problems.append(f"throughput {current['mb_per_sec']:.1f} MB/s vs {reference['mb_per_sec']:.1f} MB/s")
+    if reference.get("peak_rss_mb") and current["peak_rss_mb"] is not None and current["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + threshold):
+        problems.append(f"peak RSS {current['peak_rss_mb']:.1f} MB vs {reference['peak_rss_mb']:.1f} MB")
+    return problems
+
+def _change(current, reference, key):
+    if not reference or not reference.get(key) or current[key] is None:
+        return ""
+    return f"{(current[key] / reference[key] - 1) * 100:+.1f}%"
+
+def run(sizes, stages, workers=1, repeat=None, seed=1, threshold=DEFAULT_THRESHOLD, update_baseline=False):
+    """
+    Benchmark each stage on each input size and print a table. Returns
+    (results, regressions): results[size][stage] holds seconds,
+    lines_per_sec, mb_per_sec and peak_rss_mb.
+    """
+    baseline = load_baseline()
+    reference = baseline["results"] if baseline and not update_baseline else {}
+    results = {}
+    regressions = []
+    print(f"{'input':>6}  {'stage':<32} {'lines/s':>12} {'MB/s':>8} {'peak RSS':>10}  {'vs baseline (MB/s, RSS)'}")
+    for size in sizes:
+        size_label = format_size(size)
+        path, n_bytes, n_lines = ensure_input(size, seed)
+        results[size_label] = {}
+        for stage in stages:
+            runs = repeat or (SMALL_INPUT_REPEAT if n_bytes < SMALL_INPUT_BYTES else 1)
+            seconds, rss = measure(stage, path, workers, runs)
+            current = {
+                "seconds": round(seconds, 4),
+                "lines_per_sec": round(n_lines / seconds, 1),
+                "mb_per_sec": round(n_bytes / (1 << 20) / seconds, 2),
+                "peak_rss_mb": None if rss is None else round(rss / (1 << 20), 1),
+            }
+            results[size_label][stage] = current
+            ref = reference.get(size_label, {}).get(stage)
+            rss_text = "n/a" if current["peak_rss_mb"] is None else f"{current['peak_rss_mb']:.1f} MB"
+            print(f"{size_label:>6}  {stage:<32} {current['lines_per_sec']:>12,.0f} {current['mb_per_sec']:>8.1f} {rss_text:>10}  "
+                  f"{_change(current, ref, 'mb_per_sec')} {_change(current, ref, 'peak_rss_mb')}".rstrip())
+            if ref:
+                regressions.extend(f"{size_label} {stage}: {problem}" for problem in compare(current, ref, threshold))
+    if update_baseline:
+        save_baseline(results)
+        print(f"Baseline saved to {BASELINE_PATH}")
+    elif baseline is None:
+        print("No baseline yet; run with --update-baseline to record one.")
+    return results, regressions
+
+def _child(stage, path, workers):
+    seconds = run_stage(stage, path, workers)
+    print(json.dumps({"seconds": seconds, "peak_rss": peak_rss_bytes()}))
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Benchmark the log analysis stages.")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help="comma-separated input sizes, e.g. 10MB,1GB,10GB (default: 10MB)")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated stages (default: all of {', '.join(STAGES)})")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the end-to-end stages (default: 1)")
+    parser.add_argument("--repeat", type=int, help="runs per stage; the fastest counts (default: 3 below 100MB, else 1)")
+    parser.add_argument("--seed", type=int, default=1, help="generator seed (default: 1)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed regression as a fraction (default: 0.10)")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline instead of comparing")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE")
+    parser.add_argument("--child", nargs=2, metavar=("STAGE", "PATH"), help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child:
+        _child(args.child[0], args.child[1], args.workers)
+        return 0
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        print(f"Unknown stage(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    results, regressions = run(sizes, stages, args.workers, args.repeat, args.seed, args.threshold, args.update_baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"- {regression}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
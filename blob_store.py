@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_ROOT = "cached_github_files"
+BLOBS_DIR = ".blobs"
+MANIFEST_NAME = ".manifest.json"
+DEFAULT_BUDGET_BYTES = 512 << 20
+
+def git_blob_sha(data):
+    """
+    The SHA git itself gives this content, so blobs line up with tree listings.
+    """
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+class BlobStore:
+    """
+    Content-addressed file store shared by every cached repo and ref: each
+    distinct file content is kept once under its git blob SHA. Reads refresh
+    a blob's mtime, and evict() drops the least recently used blobs until
+    the store fits its byte budget.
+    """
+    def __init__(self, root=CACHE_ROOT, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.root = root
+        self.blob_dir = os.path.join(root, BLOBS_DIR)
+        self.budget_bytes = budget_bytes
+
+    def _path(self, sha):
+        return os.path.join(self.blob_dir, sha[:2], sha[2:])
+
+    def has(self, sha):
+        return os.path.exists(self._path(sha))
+
+    def size(self, sha):
+        return os.path.getsize(self._path(sha))
+
+    def touch(self, sha):
+        try:
+            os.utime(self._path(sha))
+        except OSError:
+            pass
+
+    def put(self, data):
+        """
+        Store content (bytes) and return its blob SHA.
+        """
+        sha = git_blob_sha(data)
+        path = self._path(sha)
+        if os.path.exists(path):
+            self.touch(sha)
+            return sha
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return sha
+
+    def get(self, sha):
+        """
+        Content of a blob as bytes, or None if it is not (or no longer) stored.
+        """
+        try:
+            with open(self._path(sha), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.touch(sha)
+        return data
+
+    def _blobs(self):
+        # (mtime, size, sha) for every stored blob
+        if not os.path.isdir(self.blob_dir):
+            return []
+        blobs = []
+        for prefix in os.scandir(self.blob_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                st = entry.stat()
+                blobs.append((st.st_mtime, st.st_size, prefix.name + entry.name))
+        return blobs
+
+    def usage(self):
+        return sum(size for _, size, _ in self._blobs())
+
+    def _remove(self, sha):
+        try:
+            os.remove(self._path(sha))
+        except OSError:
+            pass
+
+    def evict(self, keep=()):
+        """
+        Remove least recently used blobs (other than those in keep) until the
+        store is within budget. Returns the number removed.
+        """
+        blobs = sorted(self._blobs())
+        total = sum(size for _, size, _ in blobs)
+        removed = 0
+        keep = set(keep)
+        for _, size, sha in blobs:
+            if total <= self.budget_bytes:
+                break
+            if sha in keep:
+                continue
+            self._remove(sha)
+            total -= size
+            removed += 1
+        return removed
+
+    def collect_garbage(self):
+        """
+        Remove blobs no manifest refers to any more. Returns the number removed.
+        """
+        referenced = {entry["sha"] for _, _, manifest in iter_manifests(self.root) for entry in manifest.values()}
+        removed = 0
+        for _, _, sha in self._blobs():
+            if sha not in referenced:
+                self._remove(sha)
+                removed += 1
+        return removed
+
+def cached_ref_dir(repo_dir, ref_label, root=CACHE_ROOT):
+    return os.path.join(root, repo_dir, ref_label)
+
+def repo_dir_name(repo):
+    return repo.replace("/", "__")
+
+def load_manifest(target_dir):
+    """
+    {path: {"sha", "etag", "size", "cached_at"}} for one cached ref. Entries
+    from older caches without a blob SHA are dropped.
+    """
+    try:
+        with open(os.path.join(target_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {path: entry for path, entry in manifest.items() if entry.get("sha")}
+
+def save_manifest(target_dir, manifest):
+    os.makedirs(target_dir, exist_ok=True)
+    path = os.path.join(target_dir, MANIFEST_NAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+def manifest_entry(sha, size, etag=None):
+    return {"sha": sha, "etag": etag, "size": size, "cached_at": int(time.time())}
+
+def iter_manifests(root=CACHE_ROOT):
+    """
+    Yield (repo_dir, ref_label, manifest) for every cached ref.
+    """
+    if not os.path.isdir(root):
+        return
+    for repo_dir in sorted(os.listdir(root)):
+        repo_path = os.path.join(root, repo_dir)
+        if repo_dir.startswith(".") or not os.path.isdir(repo_path):
+            continue
+        for ref_label in sorted(os.listdir(repo_path)):
+            path = os.path.join(repo_path, ref_label)
+            if os.path.isdir(path):
+                yield repo_dir, ref_label, load_manifest(path)
+
+def cached_repos(root=CACHE_ROOT):
+    """
+    {repo_dir: [ref_label, ...]} for refs whose manifest lists any files.
+    """
+    repos = {}
+    for repo_dir, ref_label, manifest in iter_manifests(root):
+        if manifest:
+            repos.setdefault(repo_dir, []).append(ref_label)
+    return repos
+
+def read_cached_file(store, manifest, path):
+    """
+    Decoded content of one manifest path, or None if its blob was evicted.
+    """
+    entry = manifest.get(path)
+    data = store.get(entry["sha"]) if entry else None
+    return None if data is None else data.decode("utf-8", errors="replace")
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+
+CHECKPOINT_VERSION = 3
+HEAD_HASH_BYTES = 4096
+
+def file_identity(path, head_len=HEAD_HASH_BYTES):
+    """
+    Identify a log file by device, inode and a hash of its first head_len
+    bytes; a rotated or rewritten file changes at least one of them.
+    """
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        head = f.read(head_len)
+    return {
+        "device": st.st_dev,
+        "inode": st.st_ino,
+        "size": st.st_size,
+        "head_len": len(head),
+        "head_hash": hashlib.sha1(head).hexdigest(),
+    }
+
+def load_checkpoint(checkpoint_path):
+    """
+    Return the saved checkpoint dict, or None if there is none or it
+    cannot be read.
+    """
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        return None
+    return checkpoint
+
+def same_log(saved, log_file_path, offset):
+    """
+    Whether log_file_path is still the file identified by saved (see
+    file_identity), grown or not but not rotated (new inode or different
+    head) nor truncated below offset.
+    """
+    try:
+        current = file_identity(log_file_path, saved["head_len"])
+    except OSError:
+        return False
+    if (current["device"], current["inode"]) != (saved["device"], saved["inode"]):
+        return False
+    return current["size"] >= offset and current["head_hash"] == saved["head_hash"]
+
+def resume_offset(checkpoint, log_file_path, settings):
+    """
+    Return the byte offset to resume from, or None when the log has to be
+    rescanned from the start: no checkpoint, different analysis settings,
+    a rotated file (new inode or different head) or a truncated one.
+    """
+    if not checkpoint or checkpoint.get("settings") != settings:
+        return None
+    if not same_log(checkpoint["log"], log_file_path, checkpoint["offset"]):
+        return None
+    return checkpoint["offset"]
+
+def save_checkpoint(checkpoint_path, log_file_path, offset, settings, state):
+    """
+    Atomically write a checkpoint: the log's identity, the offset up to
+    which it has been processed and the serialized analyzer state.
+    """
+    checkpoint = {
+        "version": CHECKPOINT_VERSION,
+        "log": file_identity(log_file_path),
+        "offset": offset,
+        "settings": settings,
+        "state": state,
+    }
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
@@ -1,75 +1,136 @@
 import os
 import sys
 from rich.console import Console
+from rich.markup import escape
 from rich.panel import Panel
 import questionary
-from config import load_config, save_config
-from log_analysis import analyze_log_file
+from config import get_analysis_fields, get_analysis_workers, get_blob_store, get_config_value, get_flag, get_hub_options, get_llm_cache, get_llm_options, load_config, save_config
+from hub_client import HubError, get_hub_client
+from log_analysis import analyze_log_result
+from llm_cache import CACHE_MODES
+from timestamps import BUCKET_SECONDS, time_bound
 from github_context import fetch_code_context, fetch_file_content, cache_github_files
-import requests
+from blob_store import cached_ref_dir, cached_repos, load_manifest, read_cached_file, save_manifest
+from log_follow import follow_log_files
+from log_sets import log_label
+from log_watcher import MAX_POLL_INTERVAL, MIN_POLL_INTERVAL, watch_log_endpoint
+from report_writers import REPORT_FORMATS, performance_lines, report_path as log_report_path, write_report
+from search_index import DEFAULT_LIMIT as SEARCH_LIMIT, Query, search_logs, update_search_indexes
+from structured_logs import parse_field_spec
+from tickets import DEFAULT_JIRA_URL, JIRA_CONCURRENCY, describe_filed, get_jira_client, suggested_tickets, write_ticket_report
+import perf
+import sqlite3
 import threading
-import time
 import shutil
-import re
 
 console = Console()
 
-LLAMALYTICSHUB_URL = os.environ.get("LLAMALYTICSHUB_URL", "http://localhost:5000")
-
 log_watcher_thread = None
 log_watcher_stop = threading.Event()
+# Stages and HTTP calls of the whole interactive session
+session_metrics = perf.Metrics()
 
 def print_banner():
     console.print(Panel("Llogfather Log Analysis CLI", style="bold magenta"))
 
 def main_menu():
-    while True:
-        print_banner()
-        choice = questionary.select(
-            "Main Menu:",
-            choices=[
-                "Analyze Log File",
-                "Configure GitHub Token",
-                "View Config",
-                "Call LlamalyticsHub API Endpoints",
-                "Start Log Watcher",
-                "Cache GitHub Files",
-                "Manage Cached GitHub Files",
-                "Jira Issue Management",
-                "Exit"
-            ]
-        ).ask()
-        if choice == "Analyze Log File":
-            analyze_log_file_flow()
-        elif choice == "Configure GitHub Token":
-            configure_github_token()
-        elif choice == "View Config":
-            config = load_config()
-            console.print(config)
-            input("Press Enter to return to menu...")
-        elif choice == "Call LlamalyticsHub API Endpoints":
-            call_llamalyticshub_menu()
-        elif choice == "Start Log Watcher":
-            start_log_watcher_menu()
-        elif choice == "Cache GitHub Files":
-            cache_github_files_menu()
-        elif choice == "Manage Cached GitHub Files":
-            manage_cached_github_files_menu()
-        elif choice == "Jira Issue Management":
-            jira_issue_management_menu()
-        elif choice == "Exit":
-            sys.exit(0)
+    with perf.recording(session_metrics):
+        while True:
+            print_banner()
+            choice = questionary.select(
+                "Main Menu:",
+                choices=[
+                    "Analyze Log File",
+                    "Search Logs",
+                    "Configure GitHub Token",
+                    "Configure Analysis Workers",
+                    "View Config",
+                    "Call LlamalyticsHub API Endpoints",
+                    "Start Log Watcher",
+                    "Follow Local Log Files",
+                    "Cache GitHub Files",
+                    "Manage Cached GitHub Files",
+                    "Jira Issue Management",
+                    "View Performance Metrics",
+                    "Exit"
+                ]
+            ).ask()
+            if choice == "Analyze Log File":
+                analyze_log_file_flow()
+            elif choice == "Search Logs":
+                search_logs_menu()
+            elif choice == "Configure GitHub Token":
+                configure_github_token()
+            elif choice == "Configure Analysis Workers":
+                configure_analysis_workers()
+            elif choice == "View Config":
+                config = load_config()
+                console.print(config)
+                input("Press Enter to return to menu...")
+            elif choice == "Call LlamalyticsHub API Endpoints":
+                call_llamalyticshub_menu()
+            elif choice == "Start Log Watcher":
+                start_log_watcher_menu()
+            elif choice == "Follow Local Log Files":
+                follow_log_files_menu()
+            elif choice == "Cache GitHub Files":
+                cache_github_files_menu()
+            elif choice == "Manage Cached GitHub Files":
+                manage_cached_github_files_menu()
+            elif choice == "Jira Issue Management":
+                jira_issue_management_menu()
+            elif choice == "View Performance Metrics":
+                view_performance_metrics()
+            elif choice == "Exit":
+                sys.exit(0)
+
+def _optional_time(text):
+    # questionary validator: blank, or a time time_bound understands
+    if not text.strip():
+        return True
+    try:
+        time_bound(text)
+    except ValueError as e:
+        return str(e)
+    return True
+
+def _valid_fields(text):
+    # questionary validator: comma-separated NAME or NAME:top specs
+    try:
+        for spec in filter(str.strip, text.split(",")):
+            parse_field_spec(spec)
+    except ValueError as e:
+        return str(e)
+    return True
 
 def analyze_log_file_flow():
-    log_file = questionary.path("Select log file to analyze:").ask()
+    log_file = questionary.path("Select log file, directory or glob pattern to analyze:").ask()
     config = load_config()
     github_token = config.get("github_token")
     repo = questionary.text("GitHub repo (user/repo) for context (optional):").ask()
     output_dir = questionary.path("Output directory for report:", default="reports").ask()
     os.makedirs(output_dir, exist_ok=True)
+    default_bucket = config.get("analysis_bucket", "hour")
+    bucket = questionary.select(
+        "Log frequency granularity:",
+        choices=list(BUCKET_SECONDS),
+        default=default_bucket if default_bucket in BUCKET_SECONDS else "hour"
+    ).ask()
+    # A time window is located through the log's time index instead of a full read
+    since = questionary.text("Analyze from (YYYY-MM-DD HH:MM, blank for the start of the log):", validate=_optional_time).ask()
+    until = questionary.text("Analyze until (blank for the end of the log):", validate=_optional_time).ask()
+    since = time_bound(since) if since and since.strip() else None
+    until = time_bound(until) if until and until.strip() else None
+    # Only JSON-lines records have fields to aggregate
+    fields = questionary.text("Fields of JSON-lines records to aggregate (NAME or NAME:top, comma-separated):",
+                              default=", ".join(get_analysis_fields(config)), validate=_valid_fields).ask()
+    fields = [spec.strip() for spec in (fields or "").split(",") if spec.strip()]
+    build_search_index = questionary.confirm("Keep a search index of these logs (for Search Logs)?", default=get_flag(config, "analysis_search_index")).ask()
+    metrics = perf.Metrics()
     code_context = None
     if github_token and repo:
-        code_context = fetch_code_context(repo, github_token)
+        with perf.recording(metrics), perf.stage("github context"):
+            code_context = fetch_code_context(repo, github_token, api_url=config.get("github_api_url"))
     # Optionally use cached report as context
     cache_dir = "cached_reports"
     report_context = None
@@ -82,40 +143,68 @@ def analyze_log_file_flow():
                 with open(os.path.join(cache_dir, report_name), "r", encoding="utf-8") as f:
                     report_context = f.read()
     # Optionally use cached code files as context
-    cached_code_dir = "cached_github_files"
     code_files_context = []
-    if os.path.isdir(cached_code_dir):
-        repos = [d for d in os.listdir(cached_code_dir) if os.path.isdir(os.path.join(cached_code_dir, d))]
-        if repos:
-            use_code = questionary.confirm("Use cached code files as context?", default=False).ask()
-            if use_code:
-                repo_choice = questionary.select("Select cached repo:", choices=repos).ask()
-                repo_path = os.path.join(cached_code_dir, repo_choice)
-                refs = [d for d in os.listdir(repo_path) if os.path.isdir(os.path.join(repo_path, d))]
-                ref_choice = questionary.select("Select branch/PR:", choices=refs).ask()
-                ref_path = os.path.join(repo_path, ref_choice)
-                files = [f for f in os.listdir(ref_path) if os.path.isfile(os.path.join(ref_path, f))]
-                file_choices = questionary.checkbox("Select code files to use as context:", choices=files).ask()
-                for fname in file_choices:
-                    with open(os.path.join(ref_path, fname), "r", encoding="utf-8") as f:
-                        code_files_context.append({"filename": fname, "content": f.read()})
+    repos = cached_repos()
+    if repos:
+        use_code = questionary.confirm("Use cached code files as context?", default=False).ask()
+        if use_code:
+            repo_choice = questionary.select("Select cached repo:", choices=list(repos)).ask()
+            ref_choice = questionary.select("Select branch/PR:", choices=repos[repo_choice]).ask()
+            manifest = load_manifest(cached_ref_dir(repo_choice, ref_choice))
+            store = get_blob_store(config)
+            file_choices = questionary.checkbox("Select code files to use as context:", choices=sorted(manifest)).ask()
+            for path in file_choices:
+                content = read_cached_file(store, manifest, path)
+                if content is None:
+                    console.print(f"[yellow]{path} was evicted from the cache; re-cache it to use it.[/yellow]")
+                    continue
+                code_files_context.append({"filename": path, "content": content})
     llm_api_key = config.get("llamalyticshub_api_key")
-    report = analyze_log_file(log_file, code_context, report_context, llm_api_key=llm_api_key, code_files_context=code_files_context)
-    report_path = os.path.join(output_dir, f"log_report_{os.path.basename(log_file)}.md")
-    with open(report_path, "w") as f:
-        f.write(report)
+    llm_cache = hub = None
+    if report_context or code_files_context:
+        hub = get_hub_client(**get_hub_options(config))
+        default_mode = config.get("llm_cache_mode", "use")
+        cache_mode = questionary.select(
+            "LLM response cache:",
+            choices=list(CACHE_MODES),
+            default=default_mode if default_mode in CACHE_MODES else "use"
+        ).ask()
+        llm_cache = get_llm_cache(config, cache_mode)
+    workers = get_analysis_workers(config)
+    log_name = log_label(log_file)
+    report_format = config.get("analysis_report_format", "md")
+    report_format = report_format if report_format in REPORT_FORMATS else "md"
+    report_path = log_report_path(output_dir, log_name, report_format)
+    # Re-running on the same growing log only reads what was appended since.
+    checkpoint_path = report_path + ".checkpoint.json"
+    profile_prefix = os.path.join(output_dir, f"profile_{log_name}") if get_flag(config, "analysis_profile") else None
+    with perf.profiling(profile_prefix):
+        result = analyze_log_result(log_file, code_context, report_context, llm_api_key=llm_api_key, code_files_context=code_files_context, workers=workers, bucket=bucket, checkpoint_path=checkpoint_path,
+                                  llm_cache=llm_cache, metrics=metrics, performance=get_flag(config, "analysis_performance_section"),
+                                  since=since, until=until, index_dir=config.get("analysis_index_dir"), hub=hub, fields=fields, **get_llm_options(config))
+        if build_search_index and result.error is None:
+            try:
+                with perf.recording(metrics):
+                    update_search_indexes(log_file, config.get("analysis_index_dir"), workers)
+                console.print("[cyan]Search index updated.[/cyan]")
+            except (OSError, sqlite3.Error) as e:
+                console.print(f"[red]Could not update the search index: {e}[/red]")
+    write_report(result, report_path, report_format)
     console.print(f"[green]Report saved to {report_path}[/green]")
+    metrics_path = os.path.join(output_dir, f"metrics_{log_name}.json")
+    metrics.save(metrics_path)
+    console.print(f"[cyan]Stage timings saved to {metrics_path}[/cyan]")
+    if profile_prefix:
+        console.print(f"[cyan]Profile saved to {profile_prefix}.prof and {profile_prefix}.txt[/cyan]")
+    if llm_cache is not None:
+        console.print(f"[cyan]{llm_cache.describe()}[/cyan]")
+        llm_cache.close()
 
     # --- Create a report of suggested Jira tickets ---
-    ticket_report_path = os.path.join(output_dir, f"suggested_tickets_{os.path.basename(log_file)}.md")
-    patch_sections = re.findall(r"### Patch Suggestion for: (.*?)\n(.*?)(?=\n### Patch Suggestion for:|\Z)", report, re.DOTALL)
+    ticket_report_path = os.path.join(output_dir, f"suggested_tickets_{log_name}.md")
+    patch_sections = suggested_tickets(result)
     if patch_sections:
-        with open(ticket_report_path, "w") as tf:
-            tf.write(f"# Suggested Jira Tickets for {os.path.basename(log_file)}\n\n")
-            for idx, (error_summary, patch) in enumerate(patch_sections, 1):
-                tf.write(f"## Ticket {idx}\n")
-                tf.write(f"**Summary:** {error_summary.strip()[:100]}\n\n")
-                tf.write(f"**Description:**\n\n{patch.strip()[:2000]}\n\n")
+        write_ticket_report(patch_sections, log_name, ticket_report_path)
         console.print(f"[yellow]Suggested Jira tickets report saved to {ticket_report_path}[/yellow]")
     else:
         console.print("[yellow]No patch suggestions found for Jira ticket report.[/yellow]")
@@ -131,28 +220,35 @@ def analyze_log_file_flow():
         ]
     ).ask()
 
-    jira_url = get_config_value("JIRASSICPACK_URL", "http://localhost:5050")
+    jira_url = get_config_value("JIRASSICPACK_URL", DEFAULT_JIRA_URL)
     if next_action in ["Create tickets in Jira", "Both"] and patch_sections:
         project = questionary.text("Jira project key for ticket creation (or leave blank to skip):").ask()
         if project:
             # Let user select which tickets to create
-            ticket_choices = [f"{error_summary.strip()[:100]}" for error_summary, _ in patch_sections]
+            ticket_choices = [ticket.summary for ticket in patch_sections]
             selected = questionary.checkbox(
                 "Select which tickets to create in Jira:", choices=ticket_choices
             ).ask()
-            for (error_summary, patch), label in zip(patch_sections, ticket_choices):
-                if label in selected:
-                    summary = error_summary.strip()[:100]
-                    description = patch.strip()[:2000]
-                    issuetype = questionary.text("Issue type (default: Task):", default="Task").ask()
-                    payload = {
-                        "project": project,
-                        "summary": summary,
-                        "description": description,
-                        "issuetype": issuetype
-                    }
-                    resp = requests.post(f"{jira_url}/jira/ticket", json=payload)
-                    console.print(f"[yellow]Jira ticket creation response:[/yellow] {resp.json()}")
+            chosen = [ticket for ticket in patch_sections if ticket.summary in selected]
+            if chosen:
+                issuetype = questionary.text("Issue type (default: Task):", default="Task").ask()
+                update_existing = questionary.confirm("Update tickets already filed for the same errors?", default=False).ask()
+                # Already filed errors (same fingerprint) are skipped or updated, never duplicated
+                client = get_jira_client(jira_url, int(config.get("jira_concurrency", JIRA_CONCURRENCY)))
+                try:
+                    for line in describe_filed(client.file_tickets(project, chosen, issuetype, update_existing)):
+                        console.print(f"[yellow]{line}[/yellow]")
+                except Exception as e:
+                    console.print(f"[red]Could not look up existing Jira tickets: {e}[/red]")
+    input("Press Enter to return to menu...")
+
+def view_performance_metrics():
+    for line in performance_lines(session_metrics.to_dict()):
+        console.print(line, markup=False)
+    path = questionary.text("Save as JSON to (leave blank to skip):").ask()
+    if path:
+        session_metrics.save(path)
+        console.print(f"[green]Metrics saved to {path}[/green]")
     input("Press Enter to return to menu...")
 
 def configure_github_token():
@@ -163,6 +259,20 @@ def configure_github_token():
     console.print("[green]GitHub token saved.[/green]")
     input("Press Enter to return to menu...")
 
+def configure_analysis_workers():
+    config = load_config()
+    workers = questionary.text(
+        "Worker processes for analyzing large log files (1 disables parallel analysis):",
+        default=str(get_analysis_workers(config))
+    ).ask()
+    if not workers or not workers.strip().isdigit() or int(workers) < 1:
+        console.print("[red]Please enter a positive whole number.[/red]")
+    else:
+        config["analysis_workers"] = int(workers)
+        save_config(config)
+        console.print(f"[green]Analysis workers set to {workers}.[/green]")
+    input("Press Enter to return to menu...")
+
 def call_llamalyticshub_menu():
     endpoints = [
         ("/help", "GET"),
@@ -183,101 +293,81 @@ def call_llamalyticshub_menu():
         ).ask()
         if choice == "Back":
             break
-        config = load_config()
-        api_key = config.get("llamalyticshub_api_key", "changeme")
-        headers = {"X-API-KEY": api_key}
-        url = LLAMALYTICSHUB_URL.rstrip("/")
-        if choice == "/help":
-            resp = requests.get(f"{url}/help", headers=headers)
-            console.print(resp.json())
-        elif choice == "/generate/text":
-            prompt = questionary.text("Prompt to analyze:").ask()
-            resp = requests.post(f"{url}/generate/text", json={"prompt": prompt}, headers=headers)
-            console.print(resp.json())
-        elif choice == "/generate/file":
-            file_path = questionary.path("Path to file to analyze:").ask()
-            with open(file_path, "rb") as f:
-                files = {"file": f}
-                resp = requests.post(f"{url}/generate/file", files=files, headers=headers)
-            console.print(resp.json())
-        elif choice == "/generate/github-pr":
-            repo = questionary.text("GitHub repo (user/repo):").ask()
-            pr_number = questionary.text("PR number:").ask()
-            token = questionary.text("GitHub token (leave blank to use config):").ask()
-            prompt = questionary.text("Prompt (optional):").ask()
-            payload = {"repo": repo, "pr_number": int(pr_number)}
-            if token:
-                payload["token"] = token
-            if prompt:
-                payload["prompt"] = prompt
-            resp = requests.post(f"{url}/generate/github-pr", json=payload, headers=headers)
-            console.print(resp.json())
-        elif choice == "/health":
-            resp = requests.get(f"{url}/health", headers=headers)
-            console.print(resp.json())
-        elif choice == "/reports":
-            resp = requests.get(f"{url}/reports", headers=headers)
-            reports = resp.json().get("reports", [])
-            console.print(reports)
-        elif choice == "/reports/<report_name>":
-            report_name = questionary.text("Report filename (e.g. my_report.md):").ask()
-            cache_path = os.path.join(cache_dir, report_name)
-            use_cache = False
-            if os.path.exists(cache_path):
-                use_cache = questionary.confirm(f"Cached report found. Use cached version?", default=True).ask()
-            if use_cache:
-                with open(cache_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                console.print(content)
-            else:
-                resp = requests.get(f"{url}/reports/{report_name}", headers=headers)
-                if resp.status_code == 200:
-                    content = resp.text
-                    with open(cache_path, "w", encoding="utf-8") as f:
-                        f.write(content)
-                    console.print(content)
-                else:
-                    console.print(resp.json())
-        elif choice == "/logs":
-            resp = requests.get(f"{url}/logs", headers=headers)
+        client = get_hub_client(**get_hub_options(load_config()))
+        try:
+            call_llamalyticshub_endpoint(client, choice, cache_dir)
+        except (HubError, OSError, ValueError) as e:
+            console.print(f"[red]Request failed: {escape(str(e))}[/red]")
+        input("Press Enter to return to endpoint menu...")
+
+def call_llamalyticshub_endpoint(client, choice, cache_dir):
+    if choice == "/help":
+        console.print(client.request("GET", "/help").json())
+    elif choice == "/generate/text":
+        prompt = questionary.text("Prompt to analyze:").ask()
+        # Long generations are shown as they arrive
+        for chunk in client.stream_text(prompt):
+            console.print(chunk, end="", markup=False, highlight=False)
+        console.print()
+    elif choice == "/generate/file":
+        file_path = questionary.path("Path to file to analyze:").ask()
+        with open(file_path, "rb") as f:
+            files = {"file": (os.path.basename(file_path), f.read())}
+        console.print(client.request("POST", "/generate/file", files=files).json())
+    elif choice == "/generate/github-pr":
+        repo = questionary.text("GitHub repo (user/repo):").ask()
+        pr_number = questionary.text("PR number:").ask()
+        token = questionary.text("GitHub token (leave blank to use config):").ask()
+        prompt = questionary.text("Prompt (optional):").ask()
+        payload = {"repo": repo, "pr_number": int(pr_number)}
+        if token:
+            payload["token"] = token
+        if prompt:
+            payload["prompt"] = prompt
+        console.print(client.request("POST", "/generate/github-pr", json=payload).json())
+    elif choice == "/health":
+        console.print(client.request("GET", "/health").json())
+    elif choice == "/reports":
+        resp = client.request("GET", "/reports")
+        reports = resp.json().get("reports", [])
+        console.print(reports)
+    elif choice == "/reports/<report_name>":
+        report_name = questionary.text("Report filename (e.g. my_report.md):").ask()
+        cache_path = os.path.join(cache_dir, report_name)
+        use_cache = False
+        if os.path.exists(cache_path):
+            use_cache = questionary.confirm(f"Cached report found. Use cached version?", default=True).ask()
+        if use_cache:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                content = f.read()
+            console.print(content)
+        else:
+            resp = client.request("GET", f"/reports/{report_name}", "/reports/:name")
             if resp.status_code == 200:
-                console.print(resp.text)
+                content = resp.text
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+                console.print(content)
             else:
                 console.print(resp.json())
-        input("Press Enter to return to endpoint menu...")
+    elif choice == "/logs":
+        resp = client.request("GET", "/logs")
+        if resp.status_code == 200:
+            console.print(resp.text)
+        else:
+            console.print(resp.json())
 
 def start_log_watcher():
     """
-    Polls /logs endpoint every 10 seconds, extracts new errors/warnings, and appends to log_watcher.md.
+    Polls the /logs endpoint for newly appended data, extracts new errors/warnings, and appends them to log_watcher.md.
+    Errors are clustered into templates: only the first line of each new template is written, and the
+    per-template counts are appended when the watcher stops.
+    Polling speeds up while errors keep arriving and backs off while the log is quiet.
     """
-    config = load_config()
-    api_key = config.get("llamalyticshub_api_key", "changeme")
-    headers = {"X-API-KEY": api_key}
-    url = LLAMALYTICSHUB_URL.rstrip("/") + "/logs"
-    last_seen = set()
-    log_file = "log_watcher.md"
-    console.print(f"[yellow]Log watcher started. Polling {url} every 10 seconds. Press Enter in the main menu to stop.[/yellow]")
-    with open(log_file, "a") as f:
-        f.write(f"# Log Watcher Report\n\n")
-    while not log_watcher_stop.is_set():
-        try:
-            resp = requests.get(url, headers=headers)
-            if resp.status_code == 200:
-                lines = resp.text.splitlines()
-                new_entries = []
-                for line in lines:
-                    if ("error" in line.lower() or "warning" in line.lower()) and line not in last_seen:
-                        new_entries.append(line)
-                        last_seen.add(line)
-                if new_entries:
-                    with open(log_file, "a") as f:
-                        for entry in new_entries:
-                            f.write(entry + "\n")
-            else:
-                console.print(f"[red]Failed to fetch logs: {resp.status_code}[/red]")
-        except Exception as e:
-            console.print(f"[red]Exception in log watcher: {e}[/red]")
-        time.sleep(10)
+    client = get_hub_client(**get_hub_options(load_config()))
+    url = client.url + "/logs"
+    console.print(f"[yellow]Log watcher started. Polling {url} every {MIN_POLL_INTERVAL:g}-{MAX_POLL_INTERVAL:g} seconds. Press Enter in the main menu to stop.[/yellow]")
+    watch_log_endpoint(client, "log_watcher.md", log_watcher_stop, on_error=lambda message: console.print(f"[red]{message}[/red]"))
     console.print("[yellow]Log watcher stopped.[/yellow]")
 
 def start_log_watcher_menu():
@@ -292,6 +382,55 @@ def start_log_watcher_menu():
     log_watcher_stop.set()
     log_watcher_thread.join()
 
+def _valid_query(text):
+    try:
+        Query(text)
+    except ValueError as e:
+        return str(e)
+    return True
+
+def search_logs_menu():
+    log_spec = questionary.path("Log file, directory or glob pattern to search:").ask()
+    if not log_spec:
+        return
+    query = questionary.text('Words to find (all must appear; "quote" exact phrases):', validate=_valid_query).ask()
+    since = questionary.text("From (YYYY-MM-DD HH:MM, blank for the start of the log):", validate=_optional_time).ask()
+    until = questionary.text("Until (blank for the end of the log):", validate=_optional_time).ask()
+    levels = questionary.checkbox("Only these levels (none for all):", choices=["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]).ask()
+    context = questionary.text("Lines of context around each match:", default="2", validate=lambda text: text.isdigit() or "Enter a number").ask()
+    config = load_config()
+    try:
+        # the index is built or extended first, so new lines are found too
+        hits, skipped = search_logs(log_spec, query, time_bound(since) if since.strip() else None, time_bound(until) if until.strip() else None,
+                                    levels or None, int(context), index_dir=config.get("analysis_index_dir"), workers=get_analysis_workers(config))
+    except (OSError, ValueError, sqlite3.Error) as e:
+        console.print(f"[red]Search failed: {e}[/red]")
+        input("Press Enter to return to menu...")
+        return
+    for hit in hits:
+        for offset, line in hit.before:
+            console.print(f"[dim]{escape(hit.path)}-{offset}- {escape(line)}[/dim]")
+        console.print(f"[cyan]{escape(hit.path)}:{hit.offset}:[/cyan] {escape(hit.line)}")
+        for offset, line in hit.after:
+            console.print(f"[dim]{escape(hit.path)}-{offset}- {escape(line)}[/dim]")
+        if hit.before or hit.after:
+            console.print("[dim]--[/dim]")
+    for path in skipped:
+        console.print(f"[yellow]{path} is compressed and was not searched.[/yellow]")
+    console.print(f"[green]{len(hits)} matching lines{' (the first ones only)' if len(hits) >= SEARCH_LIMIT else ''}.[/green]")
+    input("Press Enter to return to menu...")
+
+def follow_log_files_menu():
+    paths = questionary.text("Log file(s) to follow (comma-separated):").ask()
+    paths = [p.strip() for p in (paths or "").split(",") if p.strip()]
+    if not paths:
+        return
+    from_start = questionary.confirm("Read existing content first (otherwise only new lines)?", default=False).ask()
+    console.print("[yellow]Following logs. Press Ctrl+C to stop.[/yellow]")
+    follow_log_files(paths, from_start=from_start, console=console)
+    console.print("[yellow]Stopped following logs.[/yellow]")
+    input("Press Enter to return to menu...")
+
 def cache_github_files_menu():
     repo = questionary.text("GitHub repo (user/repo):").ask()
     config = load_config()
@@ -306,44 +445,36 @@ def cache_github_files_menu():
     else:
         pr_number = questionary.text("PR number:").ask()
     # Fetch file list for selection
-    code_context = fetch_code_context(repo, github_token)
+    code_context = fetch_code_context(repo, github_token, api_url=config.get("github_api_url"))
     file_choices = code_context.get("files", [])
     if not file_choices:
         file_paths = questionary.text("Enter file paths to cache (comma-separated):").ask().split(",")
         file_paths = [f.strip() for f in file_paths if f.strip()]
     else:
         file_paths = questionary.checkbox("Select files to cache:", choices=file_choices).ask()
-    cache_github_files(repo, github_token, file_paths, branch=branch, pr_number=pr_number)
+    cache_github_files(repo, github_token, file_paths, branch=branch, pr_number=pr_number,
+                       concurrency=int(config.get("github_concurrency", 8)), api_url=config.get("github_api_url"),
+                       budget_bytes=get_blob_store(config).budget_bytes)
     input("Press Enter to return to menu...")
 
 def manage_cached_github_files_menu():
-    cache_root = "cached_github_files"
-    if not os.path.isdir(cache_root):
-        console.print("[yellow]No cached GitHub files found.[/yellow]")
-        input("Press Enter to return to menu...")
-        return
-    # List repos
-    repos = [d for d in os.listdir(cache_root) if os.path.isdir(os.path.join(cache_root, d))]
+    repos = cached_repos()
     if not repos:
         console.print("[yellow]No cached GitHub repos found.[/yellow]")
         input("Press Enter to return to menu...")
         return
-    repo = questionary.select("Select cached repo:", choices=repos + ["Back"]).ask()
+    store = get_blob_store(load_config())
+    console.print(f"[cyan]Blob store: {store.usage() / (1 << 20):.1f} MB of {store.budget_bytes / (1 << 20):.0f} MB budget[/cyan]")
+    repo = questionary.select("Select cached repo:", choices=list(repos) + ["Back"]).ask()
     if repo == "Back":
         return
-    repo_path = os.path.join(cache_root, repo)
     # List branches/PRs
-    refs = [d for d in os.listdir(repo_path) if os.path.isdir(os.path.join(repo_path, d))]
-    ref = questionary.select("Select branch/PR:", choices=refs + ["Back"]).ask()
+    ref = questionary.select("Select branch/PR:", choices=repos[repo] + ["Back"]).ask()
     if ref == "Back":
         return
-    ref_path = os.path.join(repo_path, ref)
-    # List files
-    files = [f for f in os.listdir(ref_path) if os.path.isfile(os.path.join(ref_path, f))]
-    if not files:
-        console.print("[yellow]No cached files found for this repo/branch/PR.[/yellow]")
-        input("Press Enter to return to menu...")
-        return
+    ref_path = cached_ref_dir(repo, ref)
+    manifest = load_manifest(ref_path)
+    files = sorted(manifest)
     while True:
         action = questionary.select(
             "Manage Cached Files:",
@@ -353,13 +484,17 @@ def manage_cached_github_files_menu():
             break
         elif action == "View file":
             file_choice = questionary.select("Select file to view:", choices=files).ask()
-            with open(os.path.join(ref_path, file_choice), "r", encoding="utf-8") as f:
-                content = f.read()
-            console.print(f"[bold]{file_choice}[/bold]\n" + content)
+            content = read_cached_file(store, manifest, file_choice)
+            if content is None:
+                console.print(f"[yellow]{file_choice} was evicted from the cache.[/yellow]")
+            else:
+                console.print(f"[bold]{file_choice}[/bold]\n" + content)
             input("Press Enter to continue...")
         elif action == "Delete file":
             file_choice = questionary.select("Select file to delete:", choices=files).ask()
-            os.remove(os.path.join(ref_path, file_choice))
+            del manifest[file_choice]
+            save_manifest(ref_path, manifest)
+            store.collect_garbage()
             files.remove(file_choice)
             console.print(f"[red]Deleted {file_choice}.[/red]")
             if not files:
@@ -367,12 +502,13 @@ def manage_cached_github_files_menu():
                 break
         elif action == "Delete all for this branch/PR":
             shutil.rmtree(ref_path)
+            store.collect_garbage()
             console.print(f"[red]Deleted all cached files for {repo}/{ref}.[/red]")
             break
     input("Press Enter to return to menu...")
 
 def jira_issue_management_menu():
-    jira_url = get_config_value("JIRASSICPACK_URL", "http://localhost:5050")
+    jira_url = get_config_value("JIRASSICPACK_URL", DEFAULT_JIRA_URL)
     while True:
         action = questionary.select(
             "Jira Issue Management:",
@@ -397,22 +533,22 @@ def jira_issue_management_menu():
                 "description": description,
                 "issuetype": issuetype
             }
-            resp = requests.post(f"{jira_url}/jira/ticket", json=payload)
+            resp = perf.request("POST", f"{jira_url}/jira/ticket", "jira", json=payload)
             console.print(resp.json())
         elif action == "Update Issue":
             issue_id = questionary.text("Issue ID (e.g. ABC-123):").ask()
             field_key = questionary.text("Field to update (e.g. summary):").ask()
             field_value = questionary.text("New value:").ask()
             payload = {"fields": {field_key: field_value}}
-            resp = requests.put(f"{jira_url}/jira/ticket/{issue_id}", json=payload)
+            resp = perf.request("PUT", f"{jira_url}/jira/ticket/{issue_id}", "jira", "/jira/ticket/:id", json=payload)
             console.print(resp.json())
         elif action == "Get Issue":
             issue_id = questionary.text("Issue ID (e.g. ABC-123):").ask()
-            resp = requests.get(f"{jira_url}/jira/ticket/{issue_id}")
+            resp = perf.request("GET", f"{jira_url}/jira/ticket/{issue_id}", "jira", "/jira/ticket/:id")
             console.print(resp.json())
         elif action == "Search Issues":
             jql = questionary.text("JQL query (e.g. project=ABC AND status=Open):").ask()
-            resp = requests.get(f"{jira_url}/jira/search", params={"jql": jql})
+            resp = perf.request("GET", f"{jira_url}/jira/search", "jira", params={"jql": jql})
             console.print(resp.json())
         input("Press Enter to return to Jira menu...")
 
@@ -0,0 +1,137 @@
+from itertools import accumulate
+
+SNIPPET_CONTEXT = 5
+
+def _components(path):
+    return [part for part in path.replace("\\", "/").split("/") if part and part != "."]
+
+def frame_path(entry, language):
+    """
+    Best repository-relative guess for a stack frame's file. Java frames only
+    name the file ("Bar.java"), so the package of the qualified method
+    ("com.foo.Bar.run") supplies the directories: com/foo/Bar.java.
+    """
+    path = entry["file"]
+    if language == "java" and "/" not in path:
+        package = entry.get("func", "").split(".")[:-2]
+        if package:
+            return "/".join(package + [path])
+    return path
+
+class PathSuffixTrie:
+    """
+    Maps paths by their trailing components: "app/x.py", "src/app/x.py" and
+    "/srv/deploy/app/x.py" all find the file whose path shares the longest
+    suffix with them. Lookups cost one dict step per path component.
+    """
+    def __init__(self):
+        self._root = {}
+
+    def insert(self, path, value):
+        node = self._root
+        for part in reversed(_components(path)):
+            child = node.get(part)
+            if child is None:
+                # (children, first value inserted through this node)
+                child = node[part] = ({}, value)
+            node = child[0]
+
+    def lookup(self, path):
+        """
+        Value of the file sharing the longest path suffix (at least the
+        file name) with path, or None.
+        """
+        node, best = self._root, None
+        for part in reversed(_components(path)):
+            child = node.get(part)
+            if child is None:
+                break
+            node, best = child
+        return best
+
+class LineTable:
+    """
+    Line start offsets of one file, computed once, so a snippet is a slice
+    of the content instead of a fresh splitlines() over the whole file.
+    """
+    def __init__(self, content):
+        self.content = content
+        self.offsets = [0] + list(accumulate(map(len, content.splitlines(keepends=True))))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def snippet(self, line, context=SNIPPET_CONTEXT):
+        start = max(0, line - context - 1)
+        end = min(len(self), line + context)
+        text = self.content[self.offsets[start]:self.offsets[end]] if start < end else ""
+        return '\n'.join(f"{i+1}: {l}" for i, l in enumerate(text.splitlines(), start=start))
+
+class CodeIndex:
+    """
+    Resolves stack frames to source files and memoizes their snippets.
+
+    Files come either as {'filename', 'content'} dicts (indexed up front in a
+    PathSuffixTrie) or through a fetch(path) callable that is asked at most
+    once per path. Each file gets one LineTable and each (file, line) one
+    snippet, however many frames point at it.
+    """
+    def __init__(self, files=(), fetch=None):
+        self.fetch = fetch
+        self._trie = PathSuffixTrie()
+        self._contents = {}
+        self._tables = {}
+        self._snippets = {}
+        for f in files:
+            if isinstance(f, dict) and f.get("content") is not None:
+                self._contents.setdefault(f["filename"], f["content"])
+                self._trie.insert(f["filename"], f["filename"])
+
+    @classmethod
+    def from_context(cls, code_context):
+        """
+        Build an index from the code_context accepted by analyze_log_file:
+        an object with fetch_file_content(path), or a dict whose 'files' hold
+        {'filename', 'content'} entries (bare file names are skipped).
+        """
+        fetch = getattr(code_context, "fetch_file_content", None)
+        if callable(fetch):
+            return cls(fetch=fetch)
+        if isinstance(code_context, dict):
+            return cls(code_context.get("files") or ())
+        return cls()
+
+    def _content(self, path):
+        if path not in self._contents:
+            self._contents[path] = self.fetch(path) if self.fetch else None
+        return self._contents[path]
+
+    def resolve(self, entry, language):
+        """
+        Path of the file a frame points at, or None if it is not available.
+        """
+        candidates = [frame_path(entry, language), entry["file"]]
+        for candidate in dict.fromkeys(candidates):
+            path = candidate if self.fetch else self._trie.lookup(candidate)
+            if path is not None and self._content(path):
+                return path
+        return None
+
+    def snippet(self, path, line, context=SNIPPET_CONTEXT):
+        key = (path, line, context)
+        snippet = self._snippets.get(key)
+        if snippet is None:
+            table = self._tables.get(path)
+            if table is None:
+                table = self._tables[path] = LineTable(self._content(path))
+            snippet = self._snippets[key] = table.snippet(line, context)
+        return snippet
+
+    def frame_snippet(self, entry, language, context=SNIPPET_CONTEXT):
+        """
+        Snippet around a frame's line, or None if its file is unknown.
+        """
+        path = self.resolve(entry, language)
+        if path is None:
+            return None
+        return self.snippet(path, entry["line"], context)
@@ -1,7 +1,9 @@
 import os
+import copy
 import json
-import yaml
 from dotenv import load_dotenv
+from blob_store import DEFAULT_BUDGET_BYTES, BlobStore
+from llm_cache import DEFAULT_CACHE_PATH, LLMCache
 
 CONFIG_FILE = "config.json"
 YAML_CONFIG_FILE = "config.yaml"
@@ -9,24 +11,47 @@ YAML_CONFIG_FILE = "config.yaml"
 # Load .env if present
 load_dotenv()
 
+# Parsed config files, kept for the life of the process and re-read only
+# when config.yaml or config.json change.
+_file_cache = {"stamp": None, "config": None}
+
 def load_yaml_config():
     if os.path.exists(YAML_CONFIG_FILE):
+        import yaml  # only paid for when there is a YAML file to parse
         with open(YAML_CONFIG_FILE, "r") as f:
             return yaml.safe_load(f) or {}
     return {}
 
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def load_file_config():
+    """
+    config.yaml overlaid with config.json. Parsed once per process and
+    cached until either file's mtime or size changes (or save_config runs).
+    """
+    stamp = (os.getcwd(), _file_stamp(YAML_CONFIG_FILE), _file_stamp(CONFIG_FILE))
+    if _file_cache["stamp"] != stamp:
+        config = {}
+        # 1. YAML config
+        config.update(load_yaml_config())
+        # 2. config.json
+        if os.path.exists(CONFIG_FILE):
+            with open(CONFIG_FILE, "r") as f:
+                config.update(json.load(f))
+        _file_cache["stamp"], _file_cache["config"] = stamp, config
+    return _file_cache["config"]
+
 def load_config():
-    # Load all config sources
-    config = {}
-    # 1. YAML config
-    config.update(load_yaml_config())
-    # 2. config.json
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r") as f:
-            config.update(json.load(f))
+    # Load all config sources; callers get their own copy to modify
+    config = copy.deepcopy(load_file_config())
     # 3. .env and environment variables (already loaded by dotenv)
     # Flatten YAML/config.json for top-level keys
-    for key in ["llamalyticshub_api_key", "github_token", "LLAMALYTICSHUB_URL"]:
+    for key in ["llamalyticshub_api_key", "github_token", "LLAMALYTICSHUB_URL", "analysis_workers", "analysis_bucket", "llm_cache_mode"]:
         env_val = os.environ.get(key)
         if env_val:
             config[key] = env_val
@@ -36,8 +61,30 @@ def load_config():
             config["llamalyticshub_api_key"] = config["llamalyticshub"]["api_key"]
         if "url" in config["llamalyticshub"]:
             config["LLAMALYTICSHUB_URL"] = config["llamalyticshub"]["url"]
-    if "github" in config and "token" in config["github"]:
-        config["github_token"] = config["github"]["token"]
+        for key in ["concurrency", "timeout", "retries", "connect_timeout"]:
+            if key in config["llamalyticshub"]:
+                config[f"llm_{key}"] = config["llamalyticshub"][key]
+    if "github" in config:
+        if "token" in config["github"]:
+            config["github_token"] = config["github"]["token"]
+        for key in ["concurrency", "api_url", "cache_budget_mb"]:
+            if key in config["github"]:
+                config[f"github_{key}"] = config["github"][key]
+    if "analysis" in config:
+        if "workers" in config["analysis"]:
+            config["analysis_workers"] = config["analysis"]["workers"]
+        for key in ["bucket", "report_format", "performance_section", "profile", "index_dir", "search_index", "fields"]:
+            if key in config["analysis"]:
+                config[f"analysis_{key}"] = config["analysis"][key]
+    if "jira" in config:
+        if "url" in config["jira"]:
+            config["JIRASSICPACK_URL"] = config["jira"]["url"]
+        if "concurrency" in config["jira"]:
+            config["jira_concurrency"] = config["jira"]["concurrency"]
+    if "llm_cache" in config:
+        for key in ["path", "ttl_hours", "max_mb", "mode"]:
+            if key in config["llm_cache"]:
+                config[f"llm_cache_{key}"] = config["llm_cache"][key]
     return config
 
 def get_config_value(key, default=None):
@@ -50,4 +97,62 @@ def get_config_value(key, default=None):
 
 def save_config(config):
     with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2) 
\ No newline at end of file
+        json.dump(config, f, indent=2)
+    _file_cache["stamp"] = None
+
+def get_flag(config, key, default=False):
+    # Booleans may arrive as strings from the environment or .env
+    value = config.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+def get_analysis_workers(config):
+    # Unset means "use every core"; large logs are split across processes.
+    try:
+        return max(1, int(config.get("analysis_workers") or os.cpu_count() or 1))
+    except (TypeError, ValueError):
+        return 1
+
+def get_analysis_fields(config):
+    # Structured-record fields to aggregate: a list, or a comma-separated
+    # string from the environment or .env.
+    fields = config.get("analysis_fields") or []
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [str(field).strip() for field in fields if str(field).strip()]
+
+def get_llm_options(config):
+    # Keyword arguments for analyze_log_file's LLM calls.
+    return {
+        "llm_concurrency": int(config.get("llm_concurrency", 4)),
+        "llm_timeout": float(config.get("llm_timeout", 90)),
+        "llm_retries": int(config.get("llm_retries", 2)),
+    }
+
+def get_hub_options(config):
+    # Keyword arguments for hub_client.get_hub_client, shared by the
+    # analysis, the endpoint menu and the log watcher.
+    return {
+        "url": config.get("LLAMALYTICSHUB_URL"),
+        "api_key": config.get("llamalyticshub_api_key", "changeme"),
+        "concurrency": int(config.get("llm_concurrency", 4)),
+        "timeout": float(config.get("llm_timeout", 90)),
+        "retries": int(config.get("llm_retries", 2)),
+        "connect_timeout": float(config.get("llm_connect_timeout", 5)),
+    }
+
+def get_llm_cache(config, mode=None):
+    # Repeat runs over the same findings get their LLM answers from disk.
+    return LLMCache(
+        path=config.get("llm_cache_path", DEFAULT_CACHE_PATH),
+        ttl=float(config.get("llm_cache_ttl_hours", 168)) * 3600,
+        max_bytes=int(float(config.get("llm_cache_max_mb", 64)) * (1 << 20)),
+        mode=mode or config.get("llm_cache_mode", "use"),
+    )
+
+def get_blob_store(config):
+    # Shared by every cached repo/ref; least recently used blobs are evicted beyond the budget.
+    budget_mb = config.get("github_cache_budget_mb")
+    budget = int(float(budget_mb) * (1 << 20)) if budget_mb else DEFAULT_BUDGET_BYTES
+    return BlobStore(budget_bytes=budget)
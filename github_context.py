@@ -1,60 +1,300 @@
 import os
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
+from blob_store import DEFAULT_BUDGET_BYTES, BlobStore, cached_ref_dir, load_manifest, manifest_entry, repo_dir_name, save_manifest
+import perf
 
-def fetch_code_context(repo, github_token):
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+DEFAULT_CONCURRENCY = 8
+# From this many files on, one tree listing (and, if they also make up
+# BULK_SHARE of the repository, one tarball) is cheaper than a request per
+# file.
+BULK_THRESHOLD = 50
+BULK_SHARE = 0.5
+MAX_RATE_LIMIT_WAIT = 900  # seconds; GitHub's primary limit resets hourly
+MAX_RETRIES = 3
+RAW_MEDIA_TYPE = "application/vnd.github.raw"
+
+def endpoint_label(path):
+    """
+    Path of an API request with the repository and anything after the
+    resource kind elided, for grouping latencies: "repos/a/b/contents/x.py"
+    becomes "/repos/:repo/contents".
+    """
+    parts = urlsplit(path).path.strip("/").split("/")
+    if len(parts) >= 4 and parts[0] == "repos":
+        kind = "/".join(parts[3:5]) if parts[3] == "git" else parts[3]
+        return f"/repos/:repo/{kind}"
+    return "/" + "/".join(parts)
+
+class GitHubClient:
+    """
+    GitHub REST client for fetching code context. One pooled session is
+    shared by all requests; file fetches run up to `concurrency` at a time,
+    send If-None-Match when an ETag is known (an unchanged file costs a 304)
+    and wait out rate limits instead of failing: X-RateLimit-Remaining /
+    X-RateLimit-Reset are tracked on every response, and 403/429 responses
+    from primary or secondary limits are retried after the advertised delay.
+    """
+    def __init__(self, github_token=None, api_url=None, concurrency=DEFAULT_CONCURRENCY, timeout=30, session=None):
+        self.api_url = (api_url or GITHUB_API_URL).rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        if github_token:
+            self.session.headers["Authorization"] = f"token {github_token}"
+        self.session.headers.setdefault("X-GitHub-Api-Version", "2022-11-28")
+        self._rate_lock = threading.Lock()
+        self._remaining = None
+        self._reset_at = 0.0
+
+    def _wait_for_rate_limit(self):
+        with self._rate_lock:
+            delay = self._reset_at - time.time() if self._remaining == 0 else 0
+        if delay > 0:
+            time.sleep(min(delay, MAX_RATE_LIMIT_WAIT))
+
+    def _note_rate_limit(self, resp):
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        reset = resp.headers.get("X-RateLimit-Reset")
+        with self._rate_lock:
+            if remaining is not None and remaining.isdigit():
+                self._remaining = int(remaining)
+            if reset is not None and reset.isdigit():
+                self._reset_at = float(reset)
+
+    def _retry_delay(self, resp):
+        # None when the response is not a rate-limit rejection
+        if resp.status_code not in (403, 429):
+            return None
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return int(retry_after)
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            return max(1.0, self._reset_at - time.time())
+        return 60 if resp.status_code == 429 else None
+
+    def request(self, method, path, headers=None, **kwargs):
+        """
+        Send a request to the API (`path` relative to the API root, or a
+        full URL), honouring rate limits. Returns the final response.
+        """
+        url = path if path.startswith(("http://", "https://")) else f"{self.api_url}/{path.lstrip('/')}"
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(MAX_RETRIES + 1):
+            self._wait_for_rate_limit()
+            resp = perf.request(method, url, "github", endpoint_label(path), session=self.session, headers=headers, **kwargs)
+            self._note_rate_limit(resp)
+            delay = self._retry_delay(resp)
+            if delay is None or attempt == MAX_RETRIES:
+                return resp
+            resp.close()
+            time.sleep(min(delay, MAX_RATE_LIMIT_WAIT))
+        return resp
+
+    def get(self, path, headers=None, **kwargs):
+        return self.request("GET", path, headers=headers, **kwargs)
+
+    def fetch_code_context(self, repo):
+        """
+        README and root file list, fetched concurrently.
+        Returns a dict with 'readme' and 'files'.
+        """
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            readme_future = pool.submit(self.get, f"repos/{repo}/readme", headers={"Accept": RAW_MEDIA_TYPE})
+            files_future = pool.submit(self.get, f"repos/{repo}/contents")
+            readme_resp, files_resp = readme_future.result(), files_future.result()
+        result = {}
+        result["readme"] = readme_resp.text if readme_resp.status_code == 200 else None
+        if files_resp.status_code == 200:
+            result["files"] = [f["name"] for f in files_resp.json() if f["type"] == "file"]
+        else:
+            result["files"] = []
+        return result
+
+    def resolve_pr_ref(self, repo, pr_number):
+        """
+        Head commit SHA of a pull request, or None.
+        """
+        resp = self.get(f"repos/{repo}/pulls/{pr_number}")
+        if resp.status_code == 200:
+            return resp.json()["head"]["sha"]
+        return None
+
+    def fetch_file(self, repo, file_path, ref=None, etag=None):
+        """
+        Fetch one file's raw content. Returns (status, data, etag): status is
+        "ok" (data holds the bytes), "unchanged" (304 for the given etag) or
+        "missing".
+        """
+        headers = {"Accept": RAW_MEDIA_TYPE}
+        if etag:
+            headers["If-None-Match"] = etag
+        params = {"ref": ref} if ref else {}
+        resp = self.get(f"repos/{repo}/contents/{file_path}", headers=headers, params=params)
+        if resp.status_code == 304:
+            return "unchanged", None, etag
+        if resp.status_code == 200:
+            return "ok", resp.content, resp.headers.get("ETag")
+        return "missing", None, None
+
+    def fetch_files(self, repo, file_paths, ref=None, etags=None):
+        """
+        Fetch many files concurrently; returns {path: (status, data, etag)}
+        as for fetch_file.
+        """
+        etags = etags or {}
+        def fetch(path):
+            return self.fetch_file(repo, path, ref, etags.get(path))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return dict(zip(file_paths, pool.map(fetch, file_paths)))
+
+    def fetch_blob(self, repo, sha):
+        """
+        Raw bytes of a git blob, or None.
+        """
+        resp = self.get(f"repos/{repo}/git/blobs/{sha}", headers={"Accept": RAW_MEDIA_TYPE})
+        return resp.content if resp.status_code == 200 else None
+
+    def fetch_blobs(self, repo, shas):
+        """
+        Fetch many blobs concurrently; returns {sha: bytes or None}.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return dict(zip(shas, pool.map(lambda sha: self.fetch_blob(repo, sha), shas)))
+
+    def fetch_tree(self, repo, ref):
+        """
+        {path: blob sha} for every file at ref (one request), or None.
+        """
+        resp = self.get(f"repos/{repo}/git/trees/{ref}", params={"recursive": "1"})
+        if resp.status_code != 200:
+            return None
+        data = resp.json()
+        if data.get("truncated"):
+            return None
+        return {item["path"]: item["sha"] for item in data.get("tree", []) if item.get("type") == "blob"}
+
+    def fetch_tarball_files(self, repo, ref, file_paths):
+        """
+        Stream the repository tarball at ref and pull out just file_paths.
+        Returns {path: bytes}, or None if the tarball is unavailable.
+        """
+        wanted = set(file_paths)
+        resp = self.get(f"repos/{repo}/tarball/{ref}", stream=True)
+        if resp.status_code != 200:
+            resp.close()
+            return None
+        contents = {}
+        with resp, tarfile.open(fileobj=resp.raw, mode="r|gz") as tar:
+            for member in tar:
+                # members live under a single "<owner>-<repo>-<sha>/" directory
+                path = member.name.split("/", 1)[1] if "/" in member.name else ""
+                if member.isfile() and path in wanted:
+                    contents[path] = tar.extractfile(member).read()
+                    if len(contents) == len(wanted):
+                        break
+        return contents
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_github_client(github_token, api_url=None, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Shared client per token and API root, so connections are reused across calls.
+    """
+    key = (github_token, api_url or GITHUB_API_URL, concurrency)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = GitHubClient(github_token, api_url, concurrency)
+        return _clients[key]
+
+def fetch_code_context(repo, github_token, api_url=None):
     """
     Fetch code context from GitHub: README and file list.
     Returns a dict with 'readme' and 'files'.
     """
-    headers = {"Authorization": f"token {github_token}"}
-    api_url = f"https://api.github.com/repos/{repo}"
-    result = {}
-    # Fetch README
-    readme_resp = requests.get(f"{api_url}/readme", headers=headers, params={"accept": "application/vnd.github.v3.raw"})
-    if readme_resp.status_code == 200:
-        result["readme"] = readme_resp.text
-    else:
-        result["readme"] = None
-    # Fetch file list (root only for now)
-    files_resp = requests.get(f"{api_url}/contents", headers=headers)
-    if files_resp.status_code == 200:
-        result["files"] = [f["name"] for f in files_resp.json() if f["type"] == "file"]
-    else:
-        result["files"] = []
-    return result
+    return get_github_client(github_token, api_url).fetch_code_context(repo)
 
-def fetch_file_content(repo, github_token, file_path, ref=None):
+def fetch_file_content(repo, github_token, file_path, ref=None, api_url=None):
     """
     Fetch the content of a specific file from GitHub.
     """
-    headers = {"Authorization": f"token {github_token}"}
-    api_url = f"https://api.github.com/repos/{repo}/contents/{file_path}"
-    params = {}
-    if ref:
-        params["ref"] = ref
-    resp = requests.get(api_url, headers=headers, params=params)
-    if resp.status_code == 200:
-        import base64
-        content = resp.json().get("content", "")
-        if content:
-            return base64.b64decode(content).decode("utf-8")
-    return None
-
-def cache_github_files(repo, github_token, file_paths, branch=None, pr_number=None):
+    status, data, _ = get_github_client(github_token, api_url).fetch_file(repo, file_path, ref)
+    return data.decode("utf-8", errors="replace") if status == "ok" else None
+
+def cache_github_files(repo, github_token, file_paths, branch=None, pr_number=None, concurrency=DEFAULT_CONCURRENCY, api_url=None,
+                       budget_bytes=DEFAULT_BUDGET_BYTES):
     """
     Cache files from a GitHub repo for a specific branch or PR.
-    Files are saved in cached_github_files/<repo>/<branch_or_pr>/
+    Contents go into the shared blob store (see blob_store), deduplicated
+    across refs by git blob SHA; cached_github_files/<repo>/<branch_or_pr>/
+    holds a manifest mapping full paths to blobs. A tree listing tells which
+    blobs are already stored, so only changed content is downloaded: blob by
+    blob, concurrently, or as one tarball when at least BULK_THRESHOLD files
+    and BULK_SHARE of the repository's files are missing. Files the tarball
+    lacks are fetched as blobs.
+    Without a tree, files are fetched conditionally with their stored ETags.
+    Least recently used blobs are evicted beyond budget_bytes.
+    Returns the cache directory, or None if the pull request could not be
+    found: nothing is cached then, rather than the default branch under
+    the PR's label.
     """
-    base_dir = os.path.join("cached_github_files", repo.replace('/', '__'))
+    client = get_github_client(github_token, api_url, concurrency)
+    store = BlobStore(budget_bytes=budget_bytes)
     ref_label = f"pr_{pr_number}" if pr_number else (branch or "main")
-    target_dir = os.path.join(base_dir, ref_label)
-    os.makedirs(target_dir, exist_ok=True)
-    for file_path in file_paths:
-        content = fetch_file_content(repo, github_token, file_path, ref=branch)
-        if content is not None:
-            local_path = os.path.join(target_dir, os.path.basename(file_path))
-            with open(local_path, "w", encoding="utf-8") as f:
-                f.write(content)
+    target_dir = cached_ref_dir(repo_dir_name(repo), ref_label)
+    ref = client.resolve_pr_ref(repo, pr_number) if pr_number else branch
+    if pr_number and ref is None:
+        print(f"[WARN] Could not find pull request #{pr_number} of {repo}; nothing cached")
+        return None
+    manifest = load_manifest(target_dir)
+    tree = client.fetch_tree(repo, ref or "HEAD")
+    results = {}
+    reused = 0
+    if tree is not None:
+        to_fetch = {}
+        for path in file_paths:
+            sha = tree.get(path)
+            if sha is None:
+                results[path] = ("missing", None, None)
+            elif store.has(sha):
+                store.touch(sha)
+                if manifest.get(path, {}).get("sha") != sha:
+                    manifest[path] = manifest_entry(sha, store.size(sha))
+                reused += 1
+            else:
+                to_fetch[path] = sha
+        if len(to_fetch) >= max(BULK_THRESHOLD, len(tree) * BULK_SHARE):
+            contents = client.fetch_tarball_files(repo, ref or "HEAD", list(to_fetch)) or {}
+            results.update((path, ("ok", contents[path], None)) for path in to_fetch if path in contents)
+            to_fetch = {path: sha for path, sha in to_fetch.items() if path not in contents}
+        blobs = client.fetch_blobs(repo, list(to_fetch.values())) if to_fetch else {}
+        results.update((path, ("ok", blobs[sha], None) if blobs.get(sha) is not None else ("missing", None, None)) for path, sha in to_fetch.items())
+    else:
+        etags = {p: manifest[p]["etag"] for p in file_paths if p in manifest and manifest[p].get("etag") and store.has(manifest[p]["sha"])}
+        results = client.fetch_files(repo, file_paths, ref, etags)
+    for file_path, (status, data, etag) in results.items():
+        if status == "ok":
+            sha = store.put(data)
+            manifest[file_path] = manifest_entry(sha, len(data), etag)
+        elif status == "unchanged":
+            store.touch(manifest[file_path]["sha"])
+            reused += 1
         else:
             print(f"[WARN] Could not fetch {file_path} from {repo} ({ref_label})")
-    print(f"Cached files in {target_dir}") 
\ No newline at end of file
+    save_manifest(target_dir, manifest)
+    evicted = store.evict(keep={entry["sha"] for entry in manifest.values()})
+    downloaded = sum(1 for status, _, _ in results.values() if status == "ok")
+    print(f"Cached files in {target_dir} ({downloaded} downloaded, {reused} already stored, {evicted} blobs evicted)")
+    return target_dir
@@ -0,0 +1,248 @@
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+import perf
+
+DEFAULT_HUB_URL = os.environ.get("LLAMALYTICSHUB_URL", "http://localhost:5000")
+HUB_CONCURRENCY = 4
+HUB_TIMEOUT = 90  # seconds to wait for a response
+CONNECT_TIMEOUT = 5  # seconds to establish a connection
+HUB_RETRIES = 2
+RETRY_BACKOFF = 1.0  # seconds, doubled on every further attempt
+MAX_RETRY_DELAY = 30.0
+
+class HubError(Exception):
+    """
+    The hub answered with an error status (after any retries).
+    """
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code} {text}")
+        self.status_code = status_code
+        self.text = text
+
+def _retryable_status(status_code):
+    return status_code == 429 or status_code >= 500
+
+def _check(resp):
+    if not resp.ok:
+        raise HubError(resp.status_code, resp.text)
+    return resp
+
+class HubClient:
+    """
+    Client for LlamalyticsHub. One pooled session is shared by all
+    requests, at most `concurrency` of which are in flight at a time (a
+    streamed response holds its slot until it has been read). Connection
+    errors, timeouts, 429 and 5xx responses are retried `retries` times
+    after a jittered, exponentially growing delay, or the delay a 429/503
+    asks for in Retry-After; the last response is returned whatever its
+    status. timeout is the read timeout; connecting has CONNECT_TIMEOUT.
+    """
+    def __init__(self, url=DEFAULT_HUB_URL, api_key=None, concurrency=HUB_CONCURRENCY, timeout=HUB_TIMEOUT, retries=HUB_RETRIES,
+                 backoff=RETRY_BACKOFF, connect_timeout=CONNECT_TIMEOUT, session=None):
+        import requests  # deferred, as in perf
+        self.url = url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        if session is None:
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        if api_key:
+            session.headers["X-API-KEY"] = api_key
+        self.session = session
+        self.transient_errors = (requests.ConnectionError, requests.Timeout)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _send(self, method, path, endpoint, kwargs):
+        timeout = kwargs.pop("timeout", None) or self.timeout
+        return perf.request(method, f"{self.url}{path}", "llamalyticshub", endpoint, session=self.session,
+                            timeout=(self.connect_timeout, timeout), **kwargs)
+
+    def retry_delay(self, attempt, resp=None):
+        """
+        Seconds to wait before retry number attempt + 1: between half and
+        all of backoff * 2**attempt, at least what Retry-After asks for.
+        """
+        delay = min(MAX_RETRY_DELAY, self.backoff * 2 ** attempt)
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        retry_after = resp.headers.get("Retry-After", "") if resp is not None else ""
+        if retry_after.isdigit():
+            delay = max(delay, min(MAX_RETRY_DELAY, int(retry_after)))
+        return delay
+
+    def _retrying(self, send, retries):
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                resp = send()
+            except self.transient_errors:
+                if attempt == retries:
+                    raise
+                delay = self.retry_delay(attempt)
+            else:
+                if attempt == retries or not _retryable_status(resp.status_code):
+                    return resp
+                delay = self.retry_delay(attempt, resp)
+                resp.close()
+            time.sleep(delay)
+
+    def request(self, method, path, endpoint=None, retries=None, **kwargs):
+        """
+        Send a request to path (such as "/health") and return the response.
+        endpoint labels it in the performance metrics where the path carries
+        names ("/reports/:name"); retries overrides the client's. Other
+        keyword arguments go to requests, timeout included. Uploads must be
+        bytes, not open files, so that a retry can send them again.
+        """
+        def send():
+            with self._slots:
+                return self._send(method, path, endpoint, dict(kwargs))
+        return self._retrying(send, retries)
+
+    def json(self, method, path, endpoint=None, retries=None, **kwargs):
+        """
+        The decoded JSON body of request(); raises HubError for an error status.
+        """
+        return _check(self.request(method, path, endpoint, retries, **kwargs)).json()
+
+    @contextmanager
+    def _streaming(self, method, path, endpoint, retries, kwargs):
+        # The response of a stream=True request, its slot held until the
+        # block ends. Only the request itself is retried, never a body that
+        # has started to arrive.
+        with self._slots:
+            resp = self._retrying(lambda: self._send(method, path, endpoint, dict(kwargs, stream=True)), retries)
+            with resp:
+                _check(resp)
+                if resp.encoding is None:
+                    resp.encoding = "utf-8"
+                yield resp
+
+    def stream(self, method, path, endpoint=None, retries=None, **kwargs):
+        """
+        Yield the body of the response as text chunks as they arrive; raises
+        HubError for an error status.
+        """
+        with self._streaming(method, path, endpoint, retries, kwargs) as resp:
+            yield from resp.iter_content(chunk_size=None, decode_unicode=True)
+
+    def generate_text(self, prompt, timeout=None, retries=None):
+        """
+        The hub's answer to a prompt, or None if it returned none.
+        """
+        return self.json("POST", "/generate/text", retries=retries, json={"prompt": prompt}, timeout=timeout).get("response")
+
+    def stream_text(self, prompt, timeout=None, retries=None):
+        """
+        The answer to a prompt, yielded piece by piece as it is generated.
+        The hub may stream newline-delimited JSON ({"response": ...} per
+        line) or plain text, or answer with one JSON object at once.
+        """
+        kwargs = {"json": {"prompt": prompt, "stream": True}, "timeout": timeout}
+        with self._streaming("POST", "/generate/text", None, retries, kwargs) as resp:
+            content_type = resp.headers.get("Content-Type", "")
+            if "ndjson" in content_type or "jsonl" in content_type:
+                for line in resp.iter_lines(decode_unicode=True):
+                    if line.strip():
+                        yield json.loads(line).get("response") or ""
+            elif "json" in content_type:
+                yield resp.json().get("response") or ""
+            else:
+                yield from resp.iter_content(chunk_size=None, decode_unicode=True)
+
+class AsyncHubClient:
+    """
+    asyncio interface to a HubClient. Each attempt runs the client's pooled
+    session in a worker thread, at most `concurrency` at a time and never
+    more than the client itself allows; waits between retries are asyncio
+    sleeps and hold no thread.
+    """
+    def __init__(self, client=None, concurrency=None):
+        import asyncio  # not paid for by the synchronous callers
+        self.client = client or get_hub_client()
+        self._slots = asyncio.Semaphore(concurrency or self.client.concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def request(self, method, path, endpoint=None, retries=None, **kwargs):
+        import asyncio
+        client = self.client
+        retries = client.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                async with self._slots:
+                    resp = await asyncio.to_thread(client.request, method, path, endpoint, 0, **kwargs)
+            except client.transient_errors:
+                if attempt == retries:
+                    raise
+                delay = client.retry_delay(attempt)
+            else:
+                if attempt == retries or not _retryable_status(resp.status_code):
+                    return resp
+                delay = client.retry_delay(attempt, resp)
+                resp.close()
+            await asyncio.sleep(delay)
+
+    async def json(self, method, path, endpoint=None, retries=None, **kwargs):
+        return _check(await self.request(method, path, endpoint, retries, **kwargs)).json()
+
+    async def generate_text(self, prompt, timeout=None, retries=None):
+        return (await self.json("POST", "/generate/text", retries=retries, json={"prompt": prompt}, timeout=timeout)).get("response")
+
+    async def _iterate(self, chunks):
+        import asyncio
+        done = object()
+        async with self._slots:
+            try:
+                while (chunk := await asyncio.to_thread(next, chunks, done)) is not done:
+                    yield chunk
+            finally:
+                chunks.close()
+
+    def stream(self, method, path, endpoint=None, retries=None, **kwargs):
+        """
+        Async iterator over HubClient.stream.
+        """
+        return self._iterate(self.client.stream(method, path, endpoint, retries, **kwargs))
+
+    def stream_text(self, prompt, timeout=None, retries=None):
+        """
+        Async iterator over HubClient.stream_text.
+        """
+        return self._iterate(self.client.stream_text(prompt, timeout, retries))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_hub_client(url=None, api_key=None, concurrency=HUB_CONCURRENCY, timeout=HUB_TIMEOUT, retries=HUB_RETRIES, connect_timeout=CONNECT_TIMEOUT):
+    """
+    Shared client per URL, key and settings, so connections are reused
+    across calls. url defaults to LLAMALYTICSHUB_URL.
+    """
+    key = ((url or DEFAULT_HUB_URL).rstrip("/"), api_key, concurrency, timeout, retries, connect_timeout)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = HubClient(key[0], api_key, concurrency, timeout, retries, connect_timeout=connect_timeout)
+        return _clients[key]
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join("cached_llm_responses", "llm_cache.sqlite")
+DEFAULT_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_MAX_BYTES = 64 << 20
+# use: read and write; refresh: ignore stored answers but store new ones;
+# bypass: don't touch the cache at all
+CACHE_MODES = ("use", "refresh", "bypass")
+
+def cache_key(llm_url, payload):
+    """
+    Content address of a request: SHA-256 over the endpoint and the full
+    JSON payload (prompt plus any model settings sent with it).
+    """
+    blob = json.dumps({"url": llm_url, "payload": payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """
+    On-disk cache of successful LLM responses in a SQLite file. Entries
+    expire after `ttl` seconds; when the stored responses grow past
+    `max_bytes` the least recently used ones are evicted. SQLite's locking
+    makes it safe to share between threads and processes.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, mode="use"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode {mode!r}; expected one of {', '.join(CACHE_MODES)}")
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """
+        Return the cached response for key, or None on a miss (or when the
+        mode says not to read).
+        """
+        if self.mode != "use":
+            return None
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.stats["misses"] += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key, response):
+        if self.mode == "bypass":
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            self.stats["stores"] += 1
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            evicted = conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                stale = []
+                for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                    if excess <= 0:
+                        break
+                    stale.append((key,))
+                    excess -= size
+                conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+                evicted += len(stale)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.stats["evictions"] += evicted
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def describe(self):
+        """
+        One-line summary of this run's hits and misses.
+        """
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = f" ({self.stats['hits'] / lookups:.0%} hit rate)" if lookups else ""
+        return f"LLM cache: {self.stats['hits']} hits, {self.stats['misses']} misses{rate}, {self.stats['evictions']} evicted"
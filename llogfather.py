@@ -0,0 +1,329 @@
+"""
+Non-interactive entry point, for cron jobs and CI:
+
+    python llogfather.py analyze app.log --output-dir reports
+    python llogfather.py analyze '/var/log/app/*/app.log*'
+    python llogfather.py analyze app.log --since '2024-03-01 14:05' --until '2024-03-01 14:20'
+    python llogfather.py analyze app.jsonl --field latency_ms --field status:top
+    python llogfather.py index /var/log/app
+    python llogfather.py search '8812 "connection refused"' app.log --level error -C 2
+    python llogfather.py watch --duration 3600
+    python llogfather.py cache-github user/repo --branch main src/app.py
+    python llogfather.py tickets reports/log_report_app.log.md --project OPS
+
+Without a subcommand it opens the interactive menu of cli.py. Each command
+imports what it needs when it runs, so `--help` and local analysis start
+without loading rich, questionary or requests.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from config import get_analysis_fields, get_analysis_workers, get_blob_store, get_config_value, get_flag, get_hub_options, get_llm_cache, get_llm_options, load_config
+from llm_cache import CACHE_MODES
+from report_writers import REPORT_FORMATS
+from timestamps import BUCKET_SECONDS, time_bound
+
+def ticket_report_path(output_dir, log_name):
+    return os.path.join(output_dir, f"suggested_tickets_{log_name}.md")
+
+def read_code_files(paths):
+    code_files = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            code_files.append({"filename": path, "content": f.read()})
+    return code_files
+
+def read_cached_code_files(config, repo, ref):
+    from blob_store import cached_ref_dir, load_manifest, read_cached_file, repo_dir_name
+    store = get_blob_store(config)
+    manifest = load_manifest(cached_ref_dir(repo_dir_name(repo), ref))
+    if not manifest:
+        raise SystemExit(f"No cached files for {repo} ({ref}); run cache-github first")
+    code_files = []
+    for path in sorted(manifest):
+        content = read_cached_file(store, manifest, path)
+        if content is None:
+            print(f"[WARN] {path} was evicted from the cache; re-cache it to use it", file=sys.stderr)
+            continue
+        code_files.append({"filename": path, "content": content})
+    return code_files
+
+def field_spec(spec):
+    # argparse type for --field: NAME or NAME:top
+    from structured_logs import parse_field_spec
+    parse_field_spec(spec)
+    return spec.strip()
+
+def cmd_analyze(args, config):
+    import perf
+    from log_analysis import analyze_log_result
+    from log_sets import log_label
+    from report_writers import report_path as log_report_path, write_report
+    from tickets import suggested_tickets, write_ticket_report
+    os.makedirs(args.output_dir, exist_ok=True)
+    metrics = perf.Metrics()
+    code_context = None
+    github_token = config.get("github_token")
+    if args.repo and github_token:
+        from github_context import fetch_code_context
+        with perf.recording(metrics), perf.stage("github context"):
+            code_context = fetch_code_context(args.repo, github_token, api_url=config.get("github_api_url"))
+    report_context = None
+    if args.report_context:
+        with open(args.report_context, "r", encoding="utf-8") as f:
+            report_context = f.read()
+    code_files_context = read_code_files(args.code_file)
+    if args.cached_ref:
+        code_files_context += read_cached_code_files(config, *args.cached_ref)
+    llm_cache = hub = None
+    if report_context or code_files_context:
+        from hub_client import get_hub_client
+        llm_cache = get_llm_cache(config, args.llm_cache)
+        hub = get_hub_client(**get_hub_options(config))
+    log_spec = args.log_file[0] if len(args.log_file) == 1 else args.log_file
+    log_name = args.name or log_label(log_spec)
+    report_format = args.format or config.get("analysis_report_format", "md")
+    report_path = log_report_path(args.output_dir, log_name, report_format)
+    checkpoint_path = None if args.no_checkpoint else report_path + ".checkpoint.json"
+    workers = args.workers or get_analysis_workers(config)
+    index_dir = args.index_dir or config.get("analysis_index_dir")
+    bucket = args.bucket or config.get("analysis_bucket", "hour")
+    profile_prefix = None
+    if args.profile or get_flag(config, "analysis_profile"):
+        profile_prefix = os.path.join(args.output_dir, f"profile_{log_name}")
+    performance = args.performance or get_flag(config, "analysis_performance_section")
+    with perf.profiling(profile_prefix):
+        result = analyze_log_result(log_spec, code_context, report_context, llm_api_key=config.get("llamalyticshub_api_key"), code_files_context=code_files_context,
+                                  workers=workers, bucket=bucket, checkpoint_path=checkpoint_path, llm_cache=llm_cache,
+                                  metrics=metrics, performance=performance, since=args.since, until=args.until, index_dir=index_dir,
+                                  hub=hub, fields=args.field or get_analysis_fields(config), **get_llm_options(config))
+        if result.error is None and (args.search_index or get_flag(config, "analysis_search_index")):
+            update_search_indexes(log_spec, index_dir, workers, metrics)
+    write_report(result, report_path, report_format)
+    print(f"Report saved to {report_path}")
+    metrics_path = args.metrics or os.path.join(args.output_dir, f"metrics_{log_name}.json")
+    metrics.save(metrics_path)
+    print(f"Stage timings saved to {metrics_path}")
+    if profile_prefix:
+        print(f"Profile saved to {profile_prefix}.prof and {profile_prefix}.txt")
+    if llm_cache is not None:
+        print(llm_cache.describe())
+        llm_cache.close()
+    tickets = suggested_tickets(result)
+    if tickets:
+        path = ticket_report_path(args.output_dir, log_name)
+        write_ticket_report(tickets, log_name, path)
+        print(f"Suggested Jira tickets report saved to {path}")
+    return 1 if result.error is not None else 0
+
+def update_search_indexes(log_spec, index_dir, workers, metrics=None):
+    import sqlite3
+    import perf
+    import search_index
+    try:
+        with perf.recording(metrics):
+            results = search_index.update_search_indexes(log_spec, index_dir, workers)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[WARN] Could not update the search index: {e}", file=sys.stderr)
+        return []
+    indexed = [path for path, stats in results if stats is not None]
+    print(f"Search index up to date for {len(indexed)} of {len(results)} files")
+    return results
+
+def cmd_index(args, config):
+    from log_input import is_compressed
+    from log_sets import expand_log_paths
+    from time_index import index_path, load_time_index
+    from timestamps import epoch_to_datetime
+    index_dir = args.index_dir or config.get("analysis_index_dir")
+    log_spec = args.log_file[0] if len(args.log_file) == 1 else args.log_file
+    for path in expand_log_paths(log_spec):
+        if is_compressed(path):
+            print(f"{path}: compressed, not indexed")
+            continue
+        index = load_time_index(path, index_dir)
+        span = f", {epoch_to_datetime(index.epochs[0])} to {epoch_to_datetime(index.epochs[-1])}" if index.epochs else ""
+        print(f"{path}: {len(index.offsets)} entries over {index.end} bytes{span} ({index_path(path, index_dir)})")
+    if args.search:
+        update_search_indexes(log_spec, index_dir, args.workers or get_analysis_workers(config))
+    return 0
+
+def cmd_search(args, config):
+    from log_analysis import LEVEL_NAMES
+    from search_index import search_logs
+    levels = {level.upper() for level in args.level} or None
+    if levels and not levels <= set(LEVEL_NAMES.values()):
+        print(f"Unknown level(s): {', '.join(sorted(levels - set(LEVEL_NAMES.values())))}", file=sys.stderr)
+        return 2
+    try:
+        hits, skipped = search_logs(args.log_file[0] if len(args.log_file) == 1 else args.log_file, args.query, args.since, args.until, levels, args.context,
+                                    args.limit, args.index_dir or config.get("analysis_index_dir"), args.workers or get_analysis_workers(config))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    # grep -b style: path:offset:line for matches, path-offset-line for context
+    for i, hit in enumerate(hits):
+        if args.context and i:
+            print("--")
+        for offset, line in hit.before:
+            print(f"{hit.path}-{offset}-{line}")
+        print(f"{hit.path}:{hit.offset}:{hit.line}")
+        for offset, line in hit.after:
+            print(f"{hit.path}-{offset}-{line}")
+    for path in skipped:
+        print(f"[WARN] {path} is compressed and was not searched", file=sys.stderr)
+    if len(hits) >= args.limit:
+        print(f"[WARN] Stopped at {args.limit} matches; raise --limit to see more", file=sys.stderr)
+    return 0 if hits else 1
+
+def cmd_watch(args, config):
+    from hub_client import get_hub_client
+    from log_watcher import watch_log_endpoint
+    options = get_hub_options(config)
+    if args.url:
+        options["url"] = args.url
+    client = get_hub_client(**options)
+    url = client.url + "/logs"
+    stop = threading.Event()
+    watcher = threading.Thread(target=watch_log_endpoint, args=(client, args.output, stop),
+                               kwargs={"on_error": lambda message: print(message, file=sys.stderr)}, daemon=True)
+    print(f"Watching {url}, writing to {args.output}" + (f" for {args.duration:g} seconds" if args.duration else " until interrupted"))
+    watcher.start()
+    try:
+        # joined in slices so Ctrl+C is delivered promptly
+        deadline = None if args.duration is None else time.monotonic() + args.duration
+        while watcher.is_alive() and (deadline is None or time.monotonic() < deadline):
+            watcher.join(0.5)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    watcher.join()
+    return 0
+
+def cmd_cache_github(args, config):
+    from github_context import cache_github_files, fetch_code_context
+    github_token = config.get("github_token")
+    file_paths = list(args.paths)
+    if args.files_from:
+        f = sys.stdin if args.files_from == "-" else open(args.files_from, "r", encoding="utf-8")
+        with f:
+            file_paths += [line.strip() for line in f if line.strip()]
+    if not file_paths:
+        # same default as the interactive menu: the repository's root files
+        file_paths = fetch_code_context(args.repo, github_token, api_url=config.get("github_api_url")).get("files", [])
+    if not file_paths:
+        print(f"No files to cache for {args.repo}", file=sys.stderr)
+        return 1
+    target_dir = cache_github_files(args.repo, github_token, file_paths, branch=args.branch, pr_number=args.pr,
+                                    concurrency=int(config.get("github_concurrency", 8)), api_url=config.get("github_api_url"),
+                                    budget_bytes=get_blob_store(config).budget_bytes)
+    return 0 if target_dir is not None else 1
+
+def cmd_tickets(args, config):
+    from tickets import DEFAULT_JIRA_URL, JIRA_CONCURRENCY, describe_filed, get_jira_client, load_report_tickets, write_ticket_report
+    tickets = load_report_tickets(args.report)
+    if not tickets:
+        print("No patch suggestions found for Jira ticket report.")
+        return 0
+    report_name = os.path.basename(args.report)
+    log_name = report_name[len("log_report_"):] if report_name.startswith("log_report_") else report_name
+    for fmt in REPORT_FORMATS:
+        if log_name.endswith(f".{fmt}"):
+            log_name = log_name[:-len(fmt) - 1]
+            break
+    path = args.output or ticket_report_path(os.path.dirname(args.report), log_name)
+    write_ticket_report(tickets, log_name, path)
+    print(f"Suggested Jira tickets report saved to {path}")
+    if args.project:
+        jira_url = args.jira_url or get_config_value("JIRASSICPACK_URL", DEFAULT_JIRA_URL)
+        client = get_jira_client(jira_url, int(config.get("jira_concurrency", JIRA_CONCURRENCY)))
+        results = client.file_tickets(args.project, tickets, args.issuetype, args.update_existing)
+        for line in describe_filed(results):
+            print(line)
+        return 1 if any(action == "failed" for _, action, _ in results) else 0
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="llogfather", description="Llogfather log analysis. Run without a command for the interactive menu.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    analyze = commands.add_parser("analyze", help="analyze a log file and write a report")
+    analyze.add_argument("log_file", nargs="+", help="log file(s), directories or glob patterns; several are analyzed together")
+    analyze.add_argument("--name", help="report name (default: derived from the log path)")
+    analyze.add_argument("-o", "--output-dir", default="reports", help="where to write the report (default: reports)")
+    analyze.add_argument("--format", choices=REPORT_FORMATS, help="report format (default: analysis.report_format or md)")
+    analyze.add_argument("--repo", help="GitHub repo (user/repo) for code context; needs github_token")
+    analyze.add_argument("--bucket", choices=list(BUCKET_SECONDS), help="log frequency granularity (default: analysis.bucket or hour)")
+    analyze.add_argument("--workers", type=int, help="worker processes for large logs (default: analysis.workers or one per core)")
+    analyze.add_argument("--no-checkpoint", action="store_true", help="rescan the whole log instead of resuming from the last run")
+    analyze.add_argument("--since", type=time_bound, metavar="TIME", help="only analyze lines from TIME on (YYYY-MM-DD [HH:MM[:SS]])")
+    analyze.add_argument("--until", type=time_bound, metavar="TIME", help="only analyze lines up to TIME (inclusive)")
+    analyze.add_argument("--index-dir", metavar="DIR", help="where to keep time and search indexes (default: analysis.index_dir or next to each log)")
+    analyze.add_argument("--field", type=field_spec, action="append", default=[], metavar="NAME[:top]",
+                         help="field of JSON-lines records to aggregate: percentiles of its numbers, or with :top its most common values (repeatable; default: analysis.fields)")
+    analyze.add_argument("--search-index", action="store_true", help="also build or extend the logs' search indexes (default: analysis.search_index)")
+    analyze.add_argument("--report-context", metavar="FILE", help="cached report to relate the findings to")
+    analyze.add_argument("--code-file", metavar="PATH", action="append", default=[], help="local source file to use as LLM context (repeatable)")
+    analyze.add_argument("--cached-ref", nargs=2, metavar=("REPO", "REF"), help="use every file cached by cache-github for REPO at REF (a branch or pr_<n>)")
+    analyze.add_argument("--llm-cache", choices=CACHE_MODES, help="LLM response cache mode (default: llm_cache.mode or use)")
+    analyze.add_argument("--metrics", metavar="FILE", help="where to write stage timings and HTTP latencies as JSON (default: metrics_<name>.json in the output dir)")
+    analyze.add_argument("--performance", action="store_true", help="append a Performance section to the report (default: analysis.performance_section)")
+    analyze.add_argument("--profile", action="store_true", help="run under cProfile and tracemalloc and save profile_<name>.prof/.txt in the output dir")
+    analyze.set_defaults(handler=cmd_analyze)
+
+    index = commands.add_parser("index", help="build or extend the time indexes used by analyze --since/--until")
+    index.add_argument("log_file", nargs="+", help="log file(s), directories or glob patterns")
+    index.add_argument("--index-dir", metavar="DIR", help="where to keep the indexes (default: analysis.index_dir or next to each log)")
+    index.add_argument("--search", action="store_true", help="also build or extend the search indexes")
+    index.add_argument("--workers", type=int, help="worker processes for tokenizing large logs (default: analysis.workers or one per core)")
+    index.set_defaults(handler=cmd_index)
+
+    search = commands.add_parser("search", help="find log lines by words and phrases through the search index")
+    search.add_argument("query", help='words that must all appear, and "quoted phrases" that must appear as written')
+    search.add_argument("log_file", nargs="+", help="log file(s), directories or glob patterns")
+    search.add_argument("--since", type=time_bound, metavar="TIME", help="only lines from TIME on (YYYY-MM-DD [HH:MM[:SS]])")
+    search.add_argument("--until", type=time_bound, metavar="TIME", help="only lines up to TIME (inclusive)")
+    search.add_argument("--level", action="append", default=[], help="only lines of this log level, e.g. error (repeatable)")
+    search.add_argument("-C", "--context", type=int, default=0, metavar="N", help="show N lines before and after each match")
+    search.add_argument("--limit", type=int, default=100, help="stop after this many matches (default: 100)")
+    search.add_argument("--index-dir", metavar="DIR", help="where the indexes are kept (default: analysis.index_dir or next to each log)")
+    search.add_argument("--workers", type=int, help="worker processes for indexing large logs (default: analysis.workers or one per core)")
+    search.set_defaults(handler=cmd_search)
+
+    watch = commands.add_parser("watch", help="append new errors from the LlamalyticsHub /logs endpoint to a file")
+    watch.add_argument("--url", help="LlamalyticsHub base URL (default: LLAMALYTICSHUB_URL)")
+    watch.add_argument("-o", "--output", default="log_watcher.md")
+    watch.add_argument("--duration", type=float, help="stop after this many seconds (default: run until interrupted)")
+    watch.set_defaults(handler=cmd_watch)
+
+    cache = commands.add_parser("cache-github", help="cache files from a GitHub branch or PR")
+    cache.add_argument("repo", help="user/repo")
+    cache.add_argument("paths", nargs="*", help="repository paths to cache (default: the root files)")
+    ref = cache.add_mutually_exclusive_group()
+    ref.add_argument("--branch", help="branch name (default: main)")
+    ref.add_argument("--pr", type=int, help="pull request number")
+    cache.add_argument("--files-from", metavar="FILE", help="read more paths from FILE, one per line ('-' for stdin)")
+    cache.set_defaults(handler=cmd_cache_github)
+
+    tickets = commands.add_parser("tickets", help="build suggested Jira tickets from an analysis report")
+    tickets.add_argument("report", help="log_report_<name>.md (or .json/.ndjson) written by analyze")
+    tickets.add_argument("-o", "--output", help="ticket report path (default: suggested_tickets_<name>.md next to the report)")
+    tickets.add_argument("--project", help="also create the tickets in this Jira project")
+    tickets.add_argument("--issuetype", default="Task")
+    tickets.add_argument("--update-existing", action="store_true", help="rewrite tickets already filed for the same errors instead of skipping them")
+    tickets.add_argument("--jira-url", help="Jira service URL (default: JIRASSICPACK_URL)")
+    tickets.set_defaults(handler=cmd_tickets)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        from cli import main_menu
+        main_menu()
+        return 0
+    return args.handler(args, load_config())
+
+if __name__ == "__main__":
+    sys.exit(main())
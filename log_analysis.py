@@ -1,124 +1,973 @@
+import copy
+import hashlib
+import os
 import re
-from collections import Counter, defaultdict
-from datetime import datetime
-import requests
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from analysis_results import (AnalysisResult, CodeContextSummary, CodeSnippet, FieldSummary, FileSummary, PatchSuggestion, ReportContext, StructuredSummary,
+                              TemplateFinding, TraceFinding, TraceSummary)
+from checkpoints import load_checkpoint, resume_offset, save_checkpoint
+from code_index import CodeIndex
+from hub_client import HubError, get_hub_client
+from llm_cache import cache_key
+from log_input import complete_lines_end, decode_line, is_compressed, iter_stream_lines, open_log_lines
+from log_sets import expand_log_paths, is_log_set, rotation_sets
+from log_templates import TemplateMiner, mask_variables
+from report_writers import render_markdown
+import perf
+from structured_logs import (ERROR_LEVELS, FIELD_PERCENTILES, JSON_PARSER, SCHEMA_CACHE_LIMIT, TOP_FIELD_VALUES, FieldColumn, exception_summary,
+                             exception_text, field_value, level_name, new_columns, parse_record, record_epoch, record_schema)
+from time_index import window_lines, window_range
+from timestamps import TimeHistogram, TimestampParser, epoch_to_datetime, parse_epoch
+
+PARALLEL_MIN_BYTES = 64 << 20  # below this a process pool costs more than it saves
+PARALLEL_CHUNKS_PER_WORKER = 4
+LLM_CONCURRENCY = 4
+LLM_TIMEOUT = 90
+LLM_RETRIES = 2
+
+class Detector:
+    """
+    A precompiled regex guarded by cheap literal prefilters. The regex only
+    runs on lines that contain at least one of the prefilter strings, so
+    lines with no candidate detector cost a substring scan at most.
+    Detectors work on raw byte lines; str patterns and prefilters are
+    encoded as UTF-8.
+    """
+    def __init__(self, name, pattern, prefilters=(), flags=0):
+        self.name = name
+        self.regex = re.compile(_as_bytes(pattern), flags)
+        self.prefilters = tuple(_as_bytes(p) for p in prefilters)
+        if not self.prefilters:
+            # Nothing to screen with: go straight to the compiled regex.
+            self.candidate = lambda line: True
+            self.search = self.regex.search
+            self.match = self.regex.match
+        elif len(self.prefilters) > 1:
+            self._prefilter = re.compile(b'|'.join(map(re.escape, self.prefilters)))
+
+    def __getstate__(self):
+        # The fast-path bound methods above are rebuilt rather than pickled.
+        return {'name': self.name, 'pattern': self.regex.pattern, 'flags': self.regex.flags, 'prefilters': self.prefilters}
+
+    def __setstate__(self, state):
+        self.__init__(state['name'], state['pattern'], state['prefilters'], state['flags'])
+
+    def candidate(self, line):
+        if len(self.prefilters) == 1:
+            return self.prefilters[0] in line
+        return self._prefilter.search(line) is not None
+
+    def search(self, line):
+        return self.regex.search(line) if self.candidate(line) else None
+
+    def match(self, line):
+        return self.regex.match(line) if self.candidate(line) else None
+
+def _as_bytes(text):
+    return text.encode('utf-8') if isinstance(text, str) else text
+
+class TraceFormat:
+    """
+    Describes one stack trace dialect: the header line that starts a trace
+    (matched against the stripped raw line), an optional pattern that ends it
+    in addition to a blank line, whether that ending line belongs to the
+    trace, and a frame pattern with `file`, `line` and `func` groups that
+    runs on the decoded trace lines.
+    """
+    def __init__(self, language, start, end=None, include_end=False, frame=None):
+        self.language = language
+        self.start = start
+        self.end = end
+        self.include_end = include_end
+        self.frame = frame
+
+    def is_start(self, stripped):
+        return self.start.match(stripped) is not None
+
+    def is_end(self, stripped):
+        return stripped == b'' or (self.end is not None and self.end.match(stripped) is not None)
+
+    @property
+    def prefilters(self):
+        # None means "every line is a candidate"
+        detectors = [self.start] + ([self.end] if self.end else [])
+        if any(not d.prefilters for d in detectors):
+            return None
+        return {p for d in detectors for p in d.prefilters}
+
+# Registries consulted when a LogAnalyzer is created. Register custom
+# formats at import time so process-pool workers see them too.
+DETECTORS = {}
+TRACE_FORMATS = {}
+
+def register_detector(name, pattern, prefilters=(), flags=0):
+    """
+    Count lines matching `pattern`; the totals are listed under
+    "Custom Detector Matches" in the report.
+    """
+    DETECTORS[name] = Detector(name, pattern, prefilters, flags)
+    return DETECTORS[name]
+
+def register_trace_format(language, start_pattern, start_prefilters=(), end_pattern=None, end_prefilters=(), include_end=False, frame_pattern=None):
+    """
+    Add a stack trace dialect. Patterns are matched against stripped lines;
+    frame_pattern runs on whole decoded trace lines and must define `file`, `line` and
+    (optionally) `func` groups.
+    """
+    TRACE_FORMATS[language] = TraceFormat(
+        language,
+        Detector(f"{language}_trace_start", start_pattern, start_prefilters),
+        Detector(f"{language}_trace_end", end_pattern, end_prefilters) if end_pattern else None,
+        include_end=include_end,
+        frame=re.compile(frame_pattern) if frame_pattern else None,
+    )
+    return TRACE_FORMATS[language]
+
+# Matched against line.upper(): a case-sensitive scan of the upper-cased
+# line is about twice as fast as re.IGNORECASE.
+LOG_LEVEL_DETECTOR = Detector('level', r"\b(INFO|ERROR|WARNING|DEBUG|CRITICAL)\b")
+LEVEL_NAMES = {name.encode(): name for name in ('INFO', 'ERROR', 'WARNING', 'DEBUG', 'CRITICAL')}
+ERROR_LINE_KEYWORDS = (b'error', b'warning', b'exception')
+ERROR_TYPE_PATTERN = re.compile(r'(\w+Error|Exception|Warning)')
+EXCEPTION_NAME_PATTERN = re.compile(r'[\w.$]*(?:Error|Exception|Warning)\b')
+
+register_trace_format(
+    'python',
+    r'Traceback \(most recent call last\):', ('Traceback',),
+    end_pattern=r'\w*Error:|Exception:', end_prefilters=('Error:', 'Exception:'),
+    include_end=True,
+    frame_pattern=r'\s*File "(?P<file>[^"]+)", line (?P<line>\d+), in (?P<func>.+)',
+)
+register_trace_format(
+    'java',
+    r'([a-zA-Z0-9_$.]+Exception|Error):', ('Exception:', 'Error:'),
+    frame_pattern=r'\s*at (?P<func>[\w.$]+)\((?P<file>[^:]+):(?P<line>\d+)\)',
+)
+register_trace_format(
+    'nodejs',
+    r'(\w*Error|Exception):', ('Error:', 'Exception:'),
+    frame_pattern=r'\s*at (?:(?P<func>[\w.< anonymous >]+) )?\(?(?P<file>[^:]+):(?P<line>\d+):(\d+)\)?',
+)
+
+def parse_timestamp(line):
+    epoch = parse_epoch(_as_bytes(line))
+    return None if epoch is None else epoch_to_datetime(epoch)
 
 def parse_log_levels_and_timestamps(lines):
-    log_level_pattern = re.compile(r"\\b(INFO|ERROR|WARNING|DEBUG|CRITICAL)\\b", re.IGNORECASE)
-    timestamp_pattern = re.compile(r"(\\d{4}-\\d{2}-\\d{2}[ T]\\d{2}:\\d{2}:\\d{2})")
     levels = []
     timestamps = []
     for line in lines:
-        lvl = log_level_pattern.search(line)
+        raw = _as_bytes(line)
+        lvl = LOG_LEVEL_DETECTOR.search(raw.upper())
         if lvl:
-            levels.append(lvl.group(1).upper())
-        ts = timestamp_pattern.search(line)
+            levels.append(LEVEL_NAMES[lvl.group(1)])
+        ts = parse_timestamp(raw)
         if ts:
-            try:
-                timestamps.append(datetime.fromisoformat(ts.group(1).replace(' ', 'T')))
-            except Exception:
-                pass
+            timestamps.append(ts)
     return levels, timestamps
 
+class StackTraceTracker:
+    """
+    Line-at-a-time state machine for one TraceFormat. It is fed raw byte
+    lines and only decodes the ones that end up in a trace.
+
+    Besides the traces themselves it records the "lead": how many lines at
+    the start of the input would continue a trace left open by whatever came
+    before it, and whether that inherited trace ends inside this input. This
+    is what lets independently analyzed chunks be stitched back together.
+    Lines that are neither a start nor an end candidate only matter while a
+    trace is open, so callers may skip them otherwise (the lead is derived
+    from line numbers, not from seeing every line).
+    """
+    def __init__(self, trace_format):
+        self.format = trace_format
+        self.traces = []
+        # epoch passed in with each trace's first line, parallel to traces
+        self.trace_epochs = []
+        self.current_trace = []
+        self.current_epoch = None
+        self.in_trace = False
+        self.lead_count = 0
+        self.lead_done = False
+
+    def _end_lead(self, count):
+        if not self.lead_done:
+            self.lead_count = count
+            self.lead_done = True
+
+    def _complete(self):
+        self.traces.append(self.current_trace)
+        self.trace_epochs.append(self.current_epoch)
+        self.current_trace = []
+
+    def feed(self, raw, lineno=0, epoch=None):
+        stripped = raw.strip()
+        if self.format.is_start(stripped):
+            self._end_lead(lineno)
+            if self.current_trace:
+                self._complete()
+            self.in_trace = True
+            self.current_epoch = epoch
+            self.current_trace.append(decode_line(raw))
+        elif self.format.is_end(stripped):
+            self._end_lead(lineno + 1 if self.format.include_end else lineno)
+            if self.in_trace:
+                if self.format.include_end:
+                    self.current_trace.append(decode_line(raw))
+                self._complete()
+                self.in_trace = False
+        elif self.in_trace:
+            self.current_trace.append(decode_line(raw))
+
+    def interrupt(self, lineno=0):
+        # A line that cannot belong to a trace (a JSON record) closes any
+        # open one, and the lead.
+        self._end_lead(lineno)
+        if self.current_trace:
+            self._complete()
+        self.in_trace = False
+
+    def finish(self):
+        if self.current_trace:
+            self._complete()
+        self.in_trace = False
+        return self.traces
+
+    def to_state(self):
+        return {
+            'traces': self.traces,
+            'trace_epochs': self.trace_epochs,
+            'current_trace': self.current_trace,
+            'current_epoch': self.current_epoch,
+            'in_trace': self.in_trace,
+        }
+
+    @classmethod
+    def from_state(cls, trace_format, state):
+        tracker = cls(trace_format)
+        tracker.traces = state['traces']
+        tracker.trace_epochs = state['trace_epochs']
+        tracker.current_trace = state['current_trace']
+        tracker.current_epoch = state['current_epoch']
+        tracker.in_trace = state['in_trace']
+        # A restored tracker continues its input; it is never merged as "other".
+        tracker.lead_done = True
+        return tracker
+
+    def merge(self, other, read_lead, other_line_count):
+        """
+        Append the state of a tracker that ran over the input directly
+        following this one (other_line_count lines long). read_lead(n) must
+        return the first n decoded lines of that input; it is only called when a
+        trace is open across the seam.
+        """
+        if self.current_trace:
+            lead_count = other.lead_count if other.lead_done else other_line_count
+            if lead_count:
+                self.current_trace.extend(read_lead(lead_count))
+            if not other.lead_done:
+                return
+            self._complete()
+        self.traces.extend(other.traces)
+        self.trace_epochs.extend(other.trace_epochs)
+        self.current_trace = other.current_trace
+        self.current_epoch = other.current_epoch
+        self.in_trace = other.in_trace
+
+def trace_fingerprint(trace, language):
+    """
+    Stable identity of a stack trace: the exception type plus a hash of its
+    (file, function) frames. Line numbers and messages are left out, so the
+    same crash keeps its fingerprint across deploys and inputs. Traces
+    without recognisable frames hash their masked text instead.
+    """
+    fmt = TRACE_FORMATS.get(language)
+    header = trace[-1] if fmt is not None and fmt.include_end else trace[0]
+    m = EXCEPTION_NAME_PATTERN.search(header)
+    exception = m.group(0) if m else 'Unknown'
+    frames = [entry['file'].replace('\\', '/') + ':' + entry['func'] for entry in extract_stack_trace_info(trace, language)]
+    if not frames:
+        frames = [' '.join(mask_variables(line).split()) for line in trace]
+    digest = hashlib.sha1('\n'.join(frames).encode('utf-8')).hexdigest()[:12]
+    return f"{exception}:{digest}", exception
+
+class TraceGroup:
+    """
+    All occurrences of one trace fingerprint: the first trace seen (kept as
+    the sample), how often it occurred and when (epoch seconds of the
+    closest timestamp at or before its first line). `untimed` counts
+    occurrences with no timestamp before them in the analyzed input.
+    """
+    def __init__(self, fingerprint, exception, lines):
+        self.fingerprint = fingerprint
+        self.exception = exception
+        self.lines = lines
+        self.count = 0
+        self.untimed = 0
+        self.first_seen = None
+        self.last_seen = None
+
+    def _seen(self, count, first, last, untimed=0):
+        self.count += count
+        self.untimed += untimed
+        if first is not None and (self.first_seen is None or first < self.first_seen):
+            self.first_seen = first
+        if last is not None and (self.last_seen is None or last > self.last_seen):
+            self.last_seen = last
+
+    def to_state(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'exception': self.exception,
+            'lines': self.lines,
+            'count': self.count,
+            'untimed': self.untimed,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        group = cls(state['fingerprint'], state['exception'], state['lines'])
+        group._seen(state['count'], state['first_seen'], state['last_seen'], state['untimed'])
+        return group
+
+class TraceCatalog:
+    """
+    Deduplicated stack traces of one language, in first-seen order. A crash
+    loop costs one stored trace and a counter, not one copy per occurrence.
+    """
+    MEMO_LIMIT = 4096
+
+    def __init__(self, language):
+        self.language = language
+        self.groups = {}
+        self.total = 0
+        # a crash loop repeats the exact same lines; skip re-fingerprinting
+        self._memo = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_memo'] = {}
+        return state
+
+    def add(self, trace, epoch=None):
+        key = tuple(trace)
+        cached = self._memo.get(key)
+        if cached is None:
+            if len(self._memo) >= self.MEMO_LIMIT:
+                self._memo.clear()
+            cached = self._memo[key] = trace_fingerprint(trace, self.language)
+        fingerprint, exception = cached
+        group = self.groups.get(fingerprint)
+        if group is None:
+            group = self.groups[fingerprint] = TraceGroup(fingerprint, exception, trace)
+        group._seen(1, epoch, epoch, int(epoch is None))
+        self.total += 1
+
+    def merge(self, other, epoch_before=None):
+        """
+        Fold in the catalog of the input directly following this one.
+        epoch_before is the last timestamp of this input; it dates other's
+        untimed traces, which all precede other's first timestamp.
+        """
+        for fingerprint, theirs in other.groups.items():
+            group = self.groups.get(fingerprint)
+            if group is None:
+                group = self.groups[fingerprint] = TraceGroup(fingerprint, theirs.exception, theirs.lines)
+            group._seen(theirs.count, theirs.first_seen, theirs.last_seen)
+            if theirs.untimed:
+                if epoch_before is None:
+                    group._seen(0, None, None, theirs.untimed)
+                else:
+                    group._seen(0, epoch_before, epoch_before)
+        self.total += other.total
+        return self
+
+    def __iter__(self):
+        return iter(self.groups.values())
+
+    def __len__(self):
+        return len(self.groups)
+
+    def to_state(self):
+        return [group.to_state() for group in self.groups.values()]
+
+    @classmethod
+    def from_state(cls, language, state):
+        catalog = cls(language)
+        for group_state in state:
+            group = TraceGroup.from_state(group_state)
+            catalog.groups[group.fingerprint] = group
+            catalog.total += group.count
+        return catalog
+
+def new_trace_trackers():
+    return {lang: StackTraceTracker(fmt) for lang, fmt in TRACE_FORMATS.items()}
+
+def _run_tracker(language, lines):
+    tracker = StackTraceTracker(TRACE_FORMATS[language])
+    for lineno, line in enumerate(lines):
+        tracker.feed(_as_bytes(line), lineno)
+    return tracker.finish()
+
 def parse_python_stack_traces(lines):
-    stack_traces = []
-    current_trace = []
-    in_trace = False
-    for line in lines:
-        if line.strip().startswith('Traceback (most recent call last):'):
-            if current_trace:
-                stack_traces.append(list(current_trace))
-                current_trace = []
-            in_trace = True
-            current_trace.append(line)
-        elif in_trace and (line.startswith('  File') or line.strip().startswith('File')):
-            current_trace.append(line)
-        elif in_trace and (line.strip() == '' or re.match(r'\w*Error:|Exception:', line.strip())):
-            current_trace.append(line)
-            stack_traces.append(list(current_trace))
-            current_trace = []
-            in_trace = False
-        elif in_trace:
-            current_trace.append(line)
-    if current_trace:
-        stack_traces.append(list(current_trace))
-    return stack_traces
+    return _run_tracker('python', lines)
 
 def parse_java_stack_traces(lines):
-    stack_traces = []
-    current_trace = []
-    in_trace = False
-    for line in lines:
-        if re.match(r'^([a-zA-Z0-9_$.]+Exception|Error):', line.strip()):
-            if current_trace:
-                stack_traces.append(list(current_trace))
-                current_trace = []
-            in_trace = True
-            current_trace.append(line)
-        elif in_trace and re.match(r'^\\s*at ', line):
-            current_trace.append(line)
-        elif in_trace and line.strip() == '':
-            stack_traces.append(list(current_trace))
-            current_trace = []
-            in_trace = False
-        elif in_trace:
-            current_trace.append(line)
-    if current_trace:
-        stack_traces.append(list(current_trace))
-    return stack_traces
+    return _run_tracker('java', lines)
 
 def parse_nodejs_stack_traces(lines):
-    stack_traces = []
-    current_trace = []
-    in_trace = False
-    for line in lines:
-        if re.match(r'^(\w*Error|Exception):', line.strip()):
-            if current_trace:
-                stack_traces.append(list(current_trace))
-                current_trace = []
-            in_trace = True
-            current_trace.append(line)
-        elif in_trace and re.match(r'^\\s*at ', line):
-            current_trace.append(line)
-        elif in_trace and line.strip() == '':
-            stack_traces.append(list(current_trace))
-            current_trace = []
+    return _run_tracker('nodejs', lines)
+
+def is_error_line(line):
+    lower = _as_bytes(line).lower()
+    return any(keyword in lower for keyword in ERROR_LINE_KEYWORDS)
+
+def trace_candidate_check(trace_formats):
+    # Idle trace trackers only need lines that could start or end a trace:
+    # ones containing a registered literal, or blank ones. Plain `in` tests
+    # beat a regex alternation here.
+    literals = set()
+    for fmt in trace_formats:
+        if fmt.prefilters is None:
+            return None
+        literals |= fmt.prefilters
+    literals = tuple(sorted(literals))
+    def is_candidate(raw):
+        for literal in literals:
+            if literal in raw:
+                return True
+        return not raw.strip()
+    return is_candidate
+
+class LogAnalyzer:
+    """
+    Single-pass log aggregator. Every line is fed once to all detectors
+    (levels, timestamps, error types and the stack trace state machines),
+    so a log can be streamed instead of loaded with readlines().
+
+    Lines are fed as raw bytes; only error lines and stack trace lines are
+    ever decoded. A line that is a JSON object is read as a structured
+    record instead (see structured_logs): level, timestamp, logger, message
+    and exception come from its fields, a multi-line exception is parsed
+    as a stack trace, and the fields named in `fields` ("latency_ms",
+    "status:top") are aggregated in columns.
+
+    A timed analyzer also adds up, in `timings`, the seconds spent reading,
+    scanning and parsing stack traces and the lines and bytes read (see
+    perf); timings travel with merges but not with checkpoints.
+    """
+    def __init__(self, bucket='hour', timed=False, fields=()):
+        self.line_count = 0
+        self.level_counter = Counter()
+        self.timeline = TimeHistogram(bucket)
+        self.error_line_count = 0
+        self.error_templates = TemplateMiner()
+        self.error_counter = Counter()
+        self.detector_counts = Counter()
+        self.trace_trackers = new_trace_trackers()
+        self.trace_catalogs = {lang: TraceCatalog(lang) for lang in self.trace_trackers}
+        self._last_epoch = None
+        self._in_trace = False
+        self.timings = Counter() if timed else None
+        self.fields = tuple(fields)
+        self.structured_count = 0
+        self.loggers = FieldColumn('logger', top=True)
+        self.columns = new_columns(self.fields)
+        # until the first record, the trackers' leads may still be open
+        self._lead_open = True
+        self._bind_detectors()
+
+    def _bind_detectors(self):
+        self._detectors = list(DETECTORS.values())
+        self._trace_candidate = trace_candidate_check(t.format for t in self.trace_trackers.values())
+        self._schemas = {}
+        self._parse_epoch = TimestampParser().parse
+
+    def __getstate__(self):
+        # Process-pool results are pickled; the prefilter closure, the record
+        # schemas and the timestamp parser are rebuilt.
+        state = dict(self.__dict__)
+        del state['_detectors'], state['_trace_candidate'], state['_schemas'], state['_parse_epoch']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._bind_detectors()
+
+    def feed(self, raw):
+        if raw[:1] == b'{':
+            record = parse_record(raw)
+            if record is not None:
+                self._feed_record(raw, record)
+                return
+        lineno = self.line_count
+        self.line_count += 1
+        lvl = LOG_LEVEL_DETECTOR.search(raw.upper())
+        if lvl:
+            self.level_counter[LEVEL_NAMES[lvl.group(1)]] += 1
+        epoch = self._parse_epoch(raw)
+        if epoch is not None:
+            self.timeline.add(epoch)
+            self._last_epoch = epoch
+        if is_error_line(raw):
+            line = decode_line(raw)
+            self.error_line_count += 1
+            self.error_templates.add(line, epoch)
+            self.error_counter.update(ERROR_TYPE_PATTERN.findall(line))
+        for detector in self._detectors:
+            if detector.search(raw):
+                self.detector_counts[detector.name] += 1
+        if self._in_trace or self._trace_candidate is None or self._trace_candidate(raw):
+            if self.timings is not None:
+                start = time.perf_counter()
             in_trace = False
-        elif in_trace:
-            current_trace.append(line)
-    if current_trace:
-        stack_traces.append(list(current_trace))
-    return stack_traces
+            for tracker in self.trace_trackers.values():
+                tracker.feed(raw, lineno, self._last_epoch)
+                if tracker.traces:
+                    self._catalog_traces(tracker)
+                in_trace = in_trace or tracker.in_trace
+            self._in_trace = in_trace
+            if self.timings is not None:
+                self.timings['trace_seconds'] += time.perf_counter() - start
+                self.timings['trace_lines'] += 1
+
+    def _feed_record(self, raw, record):
+        lineno = self.line_count
+        self.line_count += 1
+        self.structured_count += 1
+        keys = tuple(record)
+        schema = self._schemas.get(keys)
+        if schema is None:
+            if len(self._schemas) >= SCHEMA_CACHE_LIMIT:
+                self._schemas.clear()
+            schema = self._schemas[keys] = record_schema(keys, tuple(self.columns))
+        (level_path, time_path, logger_path, message_path, exception_path), field_paths = schema
+        if self._in_trace or self._lead_open:
+            self._interrupt_traces(lineno)
+        level = epoch = exception = None
+        if level_path is not None:
+            level = level_name(field_value(record, level_path))
+            if level is not None:
+                self.level_counter[level] += 1
+        if time_path is not None:
+            epoch = record_epoch(field_value(record, time_path))
+            if epoch is not None:
+                self.timeline.add(epoch)
+                self._last_epoch = epoch
+        if logger_path is not None:
+            self.loggers.add(field_value(record, logger_path))
+        if exception_path is not None:
+            exception = exception_text(field_value(record, exception_path))
+        if level in ERROR_LEVELS or exception or (level is None and is_error_line(raw)):
+            message = field_value(record, message_path) if message_path is not None else None
+            if message is not None and message.__class__ is not str:
+                message = str(message)
+            summary = exception_summary(exception) if exception else ""
+            line = message or summary or decode_line(raw)
+            self.error_line_count += 1
+            self.error_templates.add(line, epoch)
+            self.error_counter.update(ERROR_TYPE_PATTERN.findall(line) or ERROR_TYPE_PATTERN.findall(summary))
+            if exception and "\n" in exception.strip():
+                self._catalog_exception(exception, epoch)
+        for detector in self._detectors:
+            if detector.search(raw):
+                self.detector_counts[detector.name] += 1
+        if field_paths:
+            for column, path in zip(self.columns.values(), field_paths):
+                if path is not None:
+                    value = field_value(record, path)
+                    if value is not None:
+                        column.add(value)
+
+    def _interrupt_traces(self, lineno):
+        for tracker in self.trace_trackers.values():
+            tracker.interrupt(lineno)
+            self._catalog_traces(tracker)
+        self._in_trace = False
+        self._lead_open = False
+
+    def _catalog_exception(self, text, epoch):
+        # A record's exception is a trace of its own: the first trace format
+        # that finds one in it claims it.
+        if self.timings is not None:
+            start = time.perf_counter()
+        lines = text.strip().splitlines()
+        for lang, catalog in self.trace_catalogs.items():
+            traces = [trace for trace in _run_tracker(lang, lines) if len(trace) > 1]
+            if traces:
+                for trace in traces:
+                    catalog.add(trace, epoch)
+                break
+        if self.timings is not None:
+            self.timings['trace_seconds'] += time.perf_counter() - start
+            self.timings['trace_lines'] += len(lines)
+
+    def _catalog_traces(self, tracker):
+        # Completed traces are folded into the catalog straight away.
+        catalog = self.trace_catalogs[tracker.format.language]
+        for trace, epoch in zip(tracker.traces, tracker.trace_epochs):
+            catalog.add(trace, epoch)
+        tracker.traces = []
+        tracker.trace_epochs = []
+
+    def feed_lines(self, lines):
+        if self.timings is None:
+            for line in lines:
+                self.feed(line)
+            return self
+        # Time spent waiting for the next line is reading; the rest of feed
+        # is scanning, apart from the trace parsing feed times itself.
+        clock = time.perf_counter
+        timings = self.timings
+        trace_before = timings['trace_seconds']
+        lines = iter(lines)
+        read = 0.0
+        count = size = 0
+        start = clock()
+        while True:
+            before = clock()
+            line = next(lines, None)
+            read += clock() - before
+            if line is None:
+                break
+            count += 1
+            size += len(line)
+            self.feed(line)
+        timings['read_seconds'] += read
+        timings['scan_seconds'] += clock() - start - read - (timings['trace_seconds'] - trace_before)
+        timings['reads'] += 1
+        timings['lines'] += count
+        timings['bytes'] += size
+        return self
+
+    def finish(self):
+        for tracker in self.trace_trackers.values():
+            tracker.finish()
+            self._catalog_traces(tracker)
+        self.timeline.flush()
+        self.loggers.flush()
+        for column in self.columns.values():
+            column.flush()
+        self._in_trace = False
+        return self
+
+    def _add_totals(self, other):
+        self.line_count += other.line_count
+        self.level_counter.update(other.level_counter)
+        self.timeline.merge(other.timeline)
+        self.error_line_count += other.error_line_count
+        self.error_templates.merge(other.error_templates)
+        self.error_counter.update(other.error_counter)
+        self.detector_counts.update(other.detector_counts)
+        self.structured_count += other.structured_count
+        self.loggers.merge(other.loggers)
+        if other.fields and not self.fields:
+            self.fields = other.fields
+            self._schemas = {}
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = FieldColumn(name, column.top).merge(column)
+        if other.timings is not None:
+            if self.timings is None:
+                self.timings = Counter()
+            self.timings.update(other.timings)
+
+    def merge(self, other, read_lead):
+        """
+        Fold in an unfinished analyzer that ran over the input directly
+        following this one (map-reduce style). See StackTraceTracker.merge
+        for read_lead. Only other's open trace is shared, so other's own
+        totals stay usable afterwards.
+        """
+        self._add_totals(other)
+        for lang, tracker in self.trace_trackers.items():
+            theirs = other.trace_trackers[lang]
+            tracker.merge(theirs, read_lead, other.line_count)
+            if tracker.current_trace is theirs.current_trace and tracker.current_epoch is None:
+                # opened before other's first timestamp
+                tracker.current_epoch = self._last_epoch
+            # a trace stitched across the seam completes before any of other's
+            self._catalog_traces(tracker)
+            self.trace_catalogs[lang].merge(other.trace_catalogs[lang], self._last_epoch)
+        if other._last_epoch is not None:
+            self._last_epoch = other._last_epoch
+        self._in_trace = any(t.in_trace for t in self.trace_trackers.values())
+        return self
+
+    def combine(self, other):
+        """
+        Fold in a finished analyzer of an unrelated input, such as another
+        host's log. Totals add up, but no trace is stitched across the two
+        and other's untimed traces stay untimed.
+        """
+        self._add_totals(other)
+        for lang, catalog in self.trace_catalogs.items():
+            catalog.merge(other.trace_catalogs[lang])
+        if other._last_epoch is not None and (self._last_epoch is None or other._last_epoch > self._last_epoch):
+            self._last_epoch = other._last_epoch
+        return self
+
+    def to_state(self):
+        """
+        JSON-serializable snapshot of an unfinished analyzer, including any
+        stack trace still open at the end of the input.
+        """
+        return {
+            'line_count': self.line_count,
+            'level_counter': dict(self.level_counter),
+            'timeline': self.timeline.to_state(),
+            'error_line_count': self.error_line_count,
+            'error_templates': self.error_templates.to_state(),
+            'error_counter': dict(self.error_counter),
+            'detector_counts': dict(self.detector_counts),
+            'trace_trackers': {lang: tracker.to_state() for lang, tracker in self.trace_trackers.items()},
+            'trace_catalogs': {lang: catalog.to_state() for lang, catalog in self.trace_catalogs.items()},
+            'last_epoch': self._last_epoch,
+            'fields': list(self.fields),
+            'structured_count': self.structured_count,
+            'loggers': self.loggers.to_state(),
+            'columns': [column.to_state() for column in self.columns.values()],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        analyzer = cls(state['timeline']['bucket'])
+        analyzer.line_count = state['line_count']
+        analyzer.level_counter = Counter(state['level_counter'])
+        analyzer.timeline = TimeHistogram.from_state(state['timeline'])
+        analyzer.error_line_count = state['error_line_count']
+        analyzer.error_templates = TemplateMiner.from_state(state['error_templates'])
+        analyzer.error_counter = Counter(state['error_counter'])
+        analyzer.detector_counts = Counter(state['detector_counts'])
+        analyzer.trace_trackers = {
+            lang: StackTraceTracker.from_state(TRACE_FORMATS[lang], tracker_state)
+            for lang, tracker_state in state['trace_trackers'].items()
+        }
+        analyzer.trace_catalogs = {
+            lang: TraceCatalog.from_state(lang, catalog_state)
+            for lang, catalog_state in state['trace_catalogs'].items()
+        }
+        analyzer._last_epoch = state['last_epoch']
+        analyzer.fields = tuple(state['fields'])
+        analyzer.structured_count = state['structured_count']
+        analyzer.loggers = FieldColumn.from_state(state['loggers'])
+        analyzer.columns = {column_state['name']: FieldColumn.from_state(column_state) for column_state in state['columns']}
+        analyzer._lead_open = False
+        analyzer._in_trace = any(t.in_trace for t in analyzer.trace_trackers.values())
+        analyzer._bind_detectors()
+        return analyzer
+
+    @property
+    def stack_traces(self):
+        return self.trace_catalogs
+
+def analyze_log_stream(f, bucket='hour'):
+    """
+    Run a LogAnalyzer over an open binary stream in one chunked pass.
+    """
+    return LogAnalyzer(bucket).feed_lines(iter_stream_lines(f)).finish()
+
+def analyze_log_path(log_file_path, start=0, end=None, bucket='hour', timed=False, window=None, fields=()):
+    """
+    Run a LogAnalyzer over a plain or compressed log (optionally just a
+    byte range of a plain one), unfinished so it can still be merged.
+    window, a (since, until) pair of epochs, keeps only the lines of that
+    time window; plain logs are better narrowed to it by byte range.
+    fields are the structured-record fields to aggregate (see LogAnalyzer).
+    """
+    with open_log_lines(log_file_path, start, end) as lines:
+        if window is not None:
+            lines = window_lines(lines, *window)
+        return LogAnalyzer(bucket, timed, fields).feed_lines(lines)
+
+def split_byte_ranges(path, n_chunks, start=0, end=None):
+    """
+    Split a file (or its [start, end) byte range) into at most n_chunks
+    (start, end) byte ranges that each begin right after a newline.
+    """
+    end = os.path.getsize(path) if end is None else end
+    size = end - start
+    bounds = [start]
+    with open(path, 'rb') as f:
+        for i in range(1, n_chunks):
+            f.seek(max(start + size * i // n_chunks, bounds[-1]))
+            f.readline()
+            pos = f.tell()
+            if pos >= end:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+def _lead_reader(log_file_path, start, end):
+    def read_lead(n):
+        with open_log_lines(log_file_path, start, end) as lines:
+            return [decode_line(raw) for raw in islice(lines, n)]
+    return read_lead
+
+def _analyze_byte_range(args):
+    # Left unfinished: open traces are stitched by the parent.
+    return analyze_log_path(*args)
+
+def _analyze_range_parallel(log_file_path, start, end, workers, bucket, timed=False, fields=()):
+    # multiprocessing is only loaded for logs big enough to need it
+    from concurrent.futures import ProcessPoolExecutor
+    ranges = split_byte_ranges(log_file_path, workers * PARALLEL_CHUNKS_PER_WORKER, start, end)
+    result = None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [(log_file_path, start, end, bucket, timed, None, fields) for start, end in ranges]
+        for (start, end), part in zip(ranges, pool.map(_analyze_byte_range, jobs)):
+            if result is None:
+                result = part
+            else:
+                result.merge(part, _lead_reader(log_file_path, start, end))
+    return result or LogAnalyzer(bucket, fields=fields)
+
+def analyze_log_file_parallel(log_file_path, workers, bucket='hour'):
+    """
+    Analyze a log with a process pool: line-aligned byte ranges are mapped
+    to LogAnalyzers and reduced in file order, re-joining stack traces that
+    straddle a range boundary.
+    """
+    return _analyze_range_parallel(log_file_path, 0, os.path.getsize(log_file_path), workers, bucket).finish()
+
+def _analyze_range(log_file_path, start, end, workers, bucket, timed=False, fields=()):
+    if workers and workers > 1 and end - start >= PARALLEL_MIN_BYTES:
+        return _analyze_range_parallel(log_file_path, start, end, workers, bucket, timed, fields)
+    return analyze_log_path(log_file_path, start, end, bucket, timed, fields=fields)
+
+def analysis_settings(bucket, fields=()):
+    # A checkpoint is only reusable by an analyzer configured the same way.
+    return {'bucket': bucket, 'trace_formats': sorted(TRACE_FORMATS), 'detectors': sorted(DETECTORS), 'fields': list(fields)}
+
+def _window_range(log_file_path, window, index_dir):
+    with perf.stage("time index"):
+        return window_range(log_file_path, *window, index_dir=index_dir)
+
+def analyze_log(log_file_path, workers=1, bucket='hour', checkpoint_path=None, timed=False, window=None, index_dir=None, fields=()):
+    """
+    Analyze a log file and return the finished LogAnalyzer.
+
+    With checkpoint_path, the analyzer state after the last complete line
+    is saved there together with the file's identity and offset; the next
+    run on the same, grown file restores it and only reads the appended
+    bytes. Rotation or truncation is detected and falls back to a full
+    rescan. Compressed archives are always read in full.
+    timed=True fills the analyzer's timings (see LogAnalyzer).
+
+    window, a (since, until) pair of epochs (either may be None), limits
+    the analysis to that stretch of time. A plain log is only read between
+    the byte offsets its time index (see time_index, kept in index_dir or
+    next to the log) gives for the window; no checkpoint is involved.
+
+    fields names the fields of structured (JSON-lines) records to
+    aggregate, as "name" or "name:top" (see structured_logs).
+    """
+    if is_compressed(log_file_path):
+        return analyze_log_path(log_file_path, bucket=bucket, timed=timed, window=window, fields=fields).finish()
+    if window is not None:
+        start, end = _window_range(log_file_path, window, index_dir)
+        return _analyze_range(log_file_path, start, end, workers, bucket, timed, fields).finish()
+    end = complete_lines_end(log_file_path)
+    settings = analysis_settings(bucket, fields)
+    checkpoint = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    offset = resume_offset(checkpoint, log_file_path, settings)
+    if offset is None or offset > end:
+        analysis = _analyze_range(log_file_path, 0, end, workers, bucket, timed, fields)
+    else:
+        analysis = LogAnalyzer.from_state(checkpoint['state'])
+        analysis.merge(_analyze_range(log_file_path, offset, end, workers, bucket, timed, fields), _lead_reader(log_file_path, offset, end))
+    if checkpoint_path:
+        save_checkpoint(checkpoint_path, log_file_path, end, settings, analysis.to_state())
+    # A trailing line without a newline may still be being written: it is
+    # reported but left out of the checkpoint.
+    with open_log_lines(log_file_path, end) as lines:
+        analysis.feed_lines(lines)
+    return analysis.finish()
+
+def _file_jobs(path, workers, bucket, timed=False, window=None, index_dir=None, fields=()):
+    # A large plain file is split into chunks just as a single log would be,
+    # after narrowing it to the time window.
+    if is_compressed(path):
+        return [(path, 0, None, bucket, timed, window, fields)]
+    if window is None:
+        start, end = 0, os.path.getsize(path)
+    else:
+        start, end = _window_range(path, window, index_dir)
+    if workers > 1 and end - start >= PARALLEL_MIN_BYTES:
+        return [(path, s, e, bucket, timed, None, fields) for s, e in split_byte_ranges(path, workers * PARALLEL_CHUNKS_PER_WORKER, start, end)]
+    return [(path, start, None if window is None else end, bucket, timed, None, fields)]
+
+def _reduce_log_sets(sets, jobs, parts, bucket):
+    parts = iter(parts)
+    combined = LogAnalyzer(bucket)
+    files_by_set = []
+    for set_name, members in sets:
+        set_analysis = LogAnalyzer(bucket)
+        files = []
+        for path in members:
+            file_analysis = None
+            for _, start, end, *_ in jobs[path]:
+                part = next(parts)
+                if file_analysis is None:
+                    file_analysis = part
+                else:
+                    file_analysis.merge(part, _lead_reader(path, start, end))
+            # The file's own summary is finished on a deep copy: the set-level
+            # merge keeps stitching into file_analysis's open trace, and
+            # to_state() would share its trace lists.
+            files.append((path, copy.deepcopy(file_analysis).finish()))
+            # oldest first, so a trace cut off by the rotation continues here
+            set_analysis.merge(file_analysis, _lead_reader(path, jobs[path][0][1], None))
+        combined.combine(set_analysis.finish())
+        files_by_set.append((set_name, files))
+    return combined.finish(), files_by_set
+
+def analyze_log_files(paths, workers=1, bucket='hour', timed=False, window=None, index_dir=None, fields=()):
+    """
+    Analyze many logs at once. The files are grouped into rotation sets
+    (see log_sets.rotation_sets) and each file, or each chunk of a large
+    plain one, is analyzed in the process pool. Within a set the results
+    are joined oldest first, so stack traces split across a rotation are
+    stitched back together; different sets are combined without stitching.
+    window and index_dir narrow every file to a time window, and fields
+    are aggregated, as in analyze_log.
+
+    Returns (combined, sets): the finished LogAnalyzer over all files, and
+    [(set name, [(path, finished LogAnalyzer of that file alone)])].
+    """
+    sets = rotation_sets(paths)
+    jobs = {path: _file_jobs(path, workers, bucket, timed, window, index_dir, fields) for _, members in sets for path in members}
+    args = [job for _, members in sets for path in members for job in jobs[path]]
+    total_bytes = sum((os.path.getsize(path) if end is None else end) - start for path, start, end, *_ in args)
+    if workers > 1 and len(args) > 1 and total_bytes >= PARALLEL_MIN_BYTES:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return _reduce_log_sets(sets, jobs, pool.map(_analyze_byte_range, args), bucket)
+    return _reduce_log_sets(sets, jobs, map(_analyze_byte_range, args), bucket)
 
 def extract_stack_trace_info(trace, language):
     entries = []
-    if language == 'python':
-        for line in trace:
-            m = re.match(r'\s*File "([^"]+)", line (\d+), in (.+)', line)
-            if m:
-                entries.append({
-                    'file': m.group(1),
-                    'line': int(m.group(2)),
-                    'func': m.group(3)
-                })
-    elif language == 'java':
-        for line in trace:
-            m = re.match(r'\s*at ([\w.$]+)\(([^:]+):(\d+)\)', line)
-            if m:
-                entries.append({
-                    'file': m.group(2),
-                    'line': int(m.group(3)),
-                    'func': m.group(1)
-                })
-    elif language == 'nodejs':
-        for line in trace:
-            m = re.match(r'\s*at (?:([\w.< anonymous >]+) )?\(?([^:]+):(\d+):(\d+)\)?', line)
-            if m:
-                entries.append({
-                    'file': m.group(2),
-                    'line': int(m.group(3)),
-                    'func': m.group(1) or ''
-                })
+    fmt = TRACE_FORMATS.get(language)
+    if fmt is None or fmt.frame is None:
+        return entries
+    for line in trace:
+        m = fmt.frame.match(line)
+        if m:
+            groups = m.groupdict()
+            entries.append({
+                'file': groups['file'],
+                'line': int(groups['line']),
+                'func': groups.get('func') or ''
+            })
     return entries
 
 def get_code_snippet(file_content, line, context=5):
@@ -128,124 +977,214 @@ def get_code_snippet(file_content, line, context=5):
     snippet = lines[start:end]
     return '\n'.join(f"{i+1}: {l}" for i, l in enumerate(snippet, start=start))
 
-def summarize_relationship_with_llm(log_findings, report_context, llm_url="http://localhost:5000/generate/text", api_key=None):
-    prompt = f"Given the following service log findings and a cached code review report, summarize any relationships, root causes, or actionable insights that connect the two.\n\nService Log Findings:\n{log_findings}\n\nCached Report:\n{report_context[:2000]}"  # Truncate for prompt size
-    headers = {"Content-Type": "application/json"}
-    if api_key:
-        headers["X-API-KEY"] = api_key
+def _generate_text(hub, prompt, timeout, empty_response, retries=0, cache=None):
+    # Ask the hub (retrying as HubClient does) and report any failure as
+    # the answer. Only real answers are cached, never error placeholders.
+    key = None
+    if cache is not None:
+        key = cache_key(f"{hub.url}/generate/text", {"prompt": prompt})
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
     try:
-        resp = requests.post(llm_url, json={"prompt": prompt}, headers=headers, timeout=60)
-        if resp.status_code == 200:
-            return resp.json().get("response", "(No summary returned)")
-        else:
-            return f"(LLM error: {resp.status_code} {resp.text})"
+        response = hub.generate_text(prompt, timeout=timeout, retries=retries)
+    except HubError as e:
+        return f"(LLM error: {e.status_code} {e.text})"
     except Exception as e:
         return f"(LLM request failed: {e})"
+    if response is None:
+        return empty_response
+    if key is not None:
+        cache.put(key, response)
+    return response
+
+def summarize_relationship_with_llm(log_findings, report_context, hub=None, api_key=None, cache=None):
+    hub = hub or get_hub_client(api_key=api_key)
+    prompt = f"Given the following service log findings and a cached code review report, summarize any relationships, root causes, or actionable insights that connect the two.\n\nService Log Findings:\n{log_findings}\n\nCached Report:\n{report_context[:2000]}"  # Truncate for prompt size
+    return _generate_text(hub, prompt, 60, "(No summary returned)", cache=cache)
 
-def suggest_patch_with_llm(error_line, code_files_context, llm_url="http://localhost:5000/generate/text", api_key=None):
+def suggest_patch_with_llm(error_line, code_files_context, hub=None, api_key=None, timeout=LLM_TIMEOUT, retries=0, cache=None):
     # Use the LLM to suggest a patch for the error/warning, using code files as context
+    hub = hub or get_hub_client(api_key=api_key)
     code_context_str = "\n\n".join(f"File: {f['filename']}\n{f['content'][:1000]}" for f in code_files_context)
     prompt = f"Given the following error or warning from a service log, and the following code files, suggest a code patch or fix for the issue.\n\nError/Warning:\n{error_line}\n\nCode Files:\n{code_context_str}"
-    headers = {"Content-Type": "application/json"}
-    if api_key:
-        headers["X-API-KEY"] = api_key
-    try:
-        resp = requests.post(llm_url, json={"prompt": prompt}, headers=headers, timeout=90)
-        if resp.status_code == 200:
-            return resp.json().get("response", "(No patch suggestion returned)")
-        else:
-            return f"(LLM error: {resp.status_code} {resp.text})"
-    except Exception as e:
-        return f"(LLM request failed: {e})"
+    return _generate_text(hub, prompt, timeout, "(No patch suggestion returned)", retries, cache=cache)
 
-def analyze_log_file(log_file_path, code_context=None, report_context=None, llm_api_key=None, code_files_context=None):
+def describe_template(template):
+    # Counts are left out so the prompt (and its cache key) stays the same
+    # while a known problem keeps recurring.
+    return f"{template.text}\n\nExamples:\n" + "\n".join(template.samples)
+
+def suggest_patches(templates, code_files_context, api_key=None, concurrency=LLM_CONCURRENCY, timeout=LLM_TIMEOUT, retries=LLM_RETRIES, cache=None, hub=None):
+    """
+    Ask the LLM once per error template (see log_templates), up to
+    `concurrency` requests at a time, through hub (a hub_client.HubClient;
+    by default the shared one for api_key). Returns (template, patch) pairs
+    in the order given.
+    """
+    hub = hub or get_hub_client(api_key=api_key, concurrency=concurrency)
+    def suggest(template):
+        return suggest_patch_with_llm(describe_template(template), code_files_context, hub, timeout=timeout, retries=retries, cache=cache)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(zip(templates, pool.map(suggest, templates)))
+
+def _record_scan(analysis, seconds):
+    # The whole analysis as one stage, then its reading, scanning and trace
+    # parsing, summed over all worker processes. Bytes are those read, which
+    # is less than the log's size after a checkpoint or in a time window.
+    timings = analysis.timings or Counter()
+    perf.record("analyze", seconds, nbytes=timings['bytes'], lines=analysis.line_count)
+    reads, size, lines = timings['reads'], timings['bytes'], timings['lines']
+    perf.record("read", timings['read_seconds'], reads, size, lines)
+    perf.record("scan", timings['scan_seconds'], reads, size, lines)
+    perf.record("trace parsing", timings['trace_seconds'], reads, lines=timings['trace_lines'])
+
+def _template_finding(template):
+    return TemplateFinding(template.id, template.text, template.count, template.first_seen, template.last_seen, list(template.samples))
+
+def _trace_summaries(analysis, code_index=None):
+    # Traces are deduplicated by fingerprint, so each distinct one is kept
+    # (and its snippets resolved) once; the index looks each file up once.
+    summaries = []
+    for lang, catalog in analysis.stack_traces.items():
+        traces = []
+        for group in catalog:
+            trace = TraceFinding(lang, group.fingerprint, group.exception, group.count, group.first_seen, group.last_seen, list(group.lines))
+            if code_index:
+                for entry in extract_stack_trace_info(group.lines, lang):
+                    with perf.stage("snippet lookup"):
+                        snippet = code_index.frame_snippet(entry, lang)
+                    if snippet is not None:
+                        trace.snippets.append(CodeSnippet(entry['file'], entry['line'], snippet))
+            traces.append(trace)
+        summaries.append(TraceSummary(lang, catalog.total, traces))
+    return summaries
+
+def _timeline(analysis):
+    # bucket starts as they read in the report
+    return [(str(start), cnt) for start, cnt in analysis.timeline.items()] if analysis.timeline else []
+
+def _file_summary(path, analysis):
+    return FileSummary(
+        path, analysis.line_count, analysis.error_line_count, len(analysis.error_templates),
+        analysis.level_counter.most_common(), analysis.timeline.label, _timeline(analysis),
+        analysis.error_counter.most_common(10),
+        [(lang, catalog.total, [(group.fingerprint, group.count) for group in catalog]) for lang, catalog in analysis.stack_traces.items()],
+    )
+
+def _field_summary(column):
+    numbers = column.numbers
+    return FieldSummary(
+        column.name, column.count, column.values.most_common(TOP_FIELD_VALUES), column.capped, numbers.count, numbers.minimum, numbers.maximum,
+        numbers.total / numbers.count if numbers.count else None,
+        [(p, numbers.percentile(p)) for p in FIELD_PERCENTILES] if numbers.count else [],
+    )
+
+def _structured_summary(analysis):
+    if not analysis.structured_count:
+        return None
+    return StructuredSummary(
+        analysis.structured_count, JSON_PARSER, analysis.loggers.values.most_common(TOP_FIELD_VALUES),
+        [_field_summary(column) for column in analysis.columns.values()],
+    )
+
+def analyze_log_result(log_file_path, code_context=None, report_context=None, llm_api_key=None, code_files_context=None, workers=1, bucket='hour', checkpoint_path=None,
+                       llm_concurrency=LLM_CONCURRENCY, llm_timeout=LLM_TIMEOUT, llm_retries=LLM_RETRIES, llm_cache=None, metrics=None, performance=False,
+                       since=None, until=None, index_dir=None, hub=None, fields=()):
     """
-    Analyze the log file and return a markdown report as a string.
+    Analyze the log file and return an analysis_results.AnalysisResult,
+    ready for the writers in report_writers.
+    log_file_path may also be a directory, a glob pattern or a list of
+    paths: the files are analyzed together (see analyze_log_files) and the
+    result adds the rotation sets found and a per-file breakdown.
     Optionally use code_context for deeper analysis.
+    With workers > 1, large files are analyzed in parallel processes.
+    gzip, bz2 and zstd archives are read as streams.
+    bucket sets the log frequency granularity: minute, 5min, hour or day.
+    checkpoint_path enables incremental re-analysis of a single file (see
+    analyze_log).
+    since and until (epochs, see timestamps.time_bound) limit the analysis
+    to a time window; plain logs are then only read between the offsets
+    their time index gives (see time_index), and no checkpoint is used.
+    Error lines are clustered into templates; patch suggestions are
+    requested once per template (see suggest_patches). Stack traces are
+    reported once per fingerprint (see trace_fingerprint).
+    llm_cache (an llm_cache.LLMCache) answers repeated prompts from disk.
+    hub (a hub_client.HubClient) is where the LLM is asked; by default the
+    shared client for LLAMALYTICSHUB_URL and llm_api_key.
+    fields names the fields of JSON-lines records to aggregate ("name" or
+    "name:top", see structured_logs); the result's structured section is
+    only filled when the log has such records.
+    metrics (a perf.Metrics) records the time spent in each stage and every
+    HTTP call made; performance=True also keeps them in the result, for the
+    report's Performance section.
+    """
+    with perf.recording(metrics), perf.stage("report"):
+        result = _analyze_log_result(log_file_path, code_context, report_context, llm_api_key, code_files_context, workers, bucket, checkpoint_path,
+                                     llm_concurrency, llm_timeout, llm_retries, llm_cache, since, until, index_dir, hub, fields)
+    if performance and metrics is not None and result.error is None:
+        result.performance = metrics.to_dict()
+    return result
+
+def analyze_log_file(log_file_path, *args, **kwargs):
+    """
+    Analyze the log file and return a markdown report as a string. Takes
+    the arguments of analyze_log_result; use report_writers to stream the
+    result to a file (or as JSON) instead.
     """
-    report = [f"# Log Analysis Report for `{log_file_path}`\n"]
+    return render_markdown(analyze_log_result(log_file_path, *args, **kwargs))
+
+def _analyze_log_result(log_file_path, code_context, report_context, llm_api_key, code_files_context, workers, bucket, checkpoint_path,
+                        llm_concurrency, llm_timeout, llm_retries, llm_cache, since, until, index_dir, hub, fields):
+    result = AnalysisResult(log_file_path if isinstance(log_file_path, str) else ", ".join(log_file_path))
+    window = None
+    if since is not None or until is not None:
+        window = (since, until)
+        result.window = tuple(None if bound is None else str(epoch_to_datetime(bound)) for bound in window)
+    log_sets = None
+    timed = perf.active()
+    start = time.perf_counter()
     try:
-        with open(log_file_path, 'r') as f:
-            lines = f.readlines()
+        if is_log_set(log_file_path):
+            analysis, log_sets = analyze_log_files(expand_log_paths(log_file_path), workers, bucket, timed, window, index_dir, fields)
+        else:
+            analysis = analyze_log(log_file_path, workers, bucket, checkpoint_path, timed, window, index_dir, fields)
     except Exception as e:
-        return f"# Error\nCould not read log file: {e}"
-    # Log level and timestamp analysis
-    levels, timestamps = parse_log_levels_and_timestamps(lines)
-    level_counter = Counter(levels)
-    report.append(f"## Log Levels\n" + '\n'.join(f"- {lvl}: {cnt}" for lvl, cnt in level_counter.most_common()))
-    if timestamps:
-        by_hour = defaultdict(int)
-        for ts in timestamps:
-            by_hour[ts.replace(minute=0, second=0, microsecond=0)] += 1
-        report.append("\n## Log Frequency by Hour\n" + '\n'.join(f"- {hour}: {cnt}" for hour, cnt in sorted(by_hour.items())))
-    # Error summary
-    error_lines = [l for l in lines if 'error' in l.lower() or 'warning' in l.lower() or 'exception' in l.lower()]
-    error_types = [re.findall(r'(\w+Error|Exception|Warning)', l) for l in error_lines]
-    error_types_flat = [item for sublist in error_types for item in sublist]
-    error_counter = Counter(error_types_flat)
-    report.append(f"\n## Error Summary\n- Total lines: {len(lines)}\n- Error/Warning/Exception lines: {len(error_lines)}\n")
-    if error_counter:
-        report.append("### Top Error/Warning Types\n")
-        for err, count in error_counter.most_common(10):
-            report.append(f"- {err}: {count}")
-    # Stack trace analysis
-    stack_traces = {
-        'python': parse_python_stack_traces(lines),
-        'java': parse_java_stack_traces(lines),
-        'nodejs': parse_nodejs_stack_traces(lines)
-    }
-    for lang, traces in stack_traces.items():
-        if traces:
-            report.append(f"\n## {lang.capitalize()} Stack Traces Found: {len(traces)}\n")
-            for idx, trace in enumerate(traces, 1):
-                report.append(f"### Stack Trace {idx}\n```")
-                report.extend(trace)
-                report.append("```")
-                entries = extract_stack_trace_info(trace, lang)
-                if entries and code_context:
-                    for entry in entries:
-                        file_content = None
-                        if callable(getattr(code_context, 'fetch_file_content', None)):
-                            file_content = code_context.fetch_file_content(entry['file'])
-                        elif isinstance(code_context, dict) and 'files' in code_context:
-                            for f in code_context['files']:
-                                if f.get('filename', '').endswith(entry['file']):
-                                    file_content = f.get('content')
-                                    break
-                        if file_content:
-                            snippet = get_code_snippet(file_content, entry['line'])
-                            report.append(f"#### Code Snippet for {entry['file']} line {entry['line']}\n```")
-                            report.append(snippet)
-                            report.append("```")
-    # If report_context is provided, include it and relate to log findings
+        result.error = str(e)
+        return result
+    if timed:
+        _record_scan(analysis, time.perf_counter() - start)
+    if log_sets is not None:
+        result.log_sets = [(set_name, [path for path, _ in files]) for set_name, files in log_sets]
+        result.files = [_file_summary(path, file_analysis) for _, files in log_sets for path, file_analysis in files]
+    result.levels = analysis.level_counter.most_common()
+    result.timeline_label = analysis.timeline.label
+    result.timeline = _timeline(analysis)
+    result.line_count = analysis.line_count
+    result.error_line_count = analysis.error_line_count
+    result.error_types = analysis.error_counter.most_common()
+    result.templates = [_template_finding(template) for template in analysis.error_templates.most_common()]
+    code_index = CodeIndex.from_context(code_context) if code_context else None
+    result.traces = _trace_summaries(analysis, code_index)
+    result.detector_counts = analysis.detector_counts.most_common()
+    result.structured = _structured_summary(analysis)
+    # If report_context is provided, relate it to the log findings
     if report_context:
-        report.append("\n## Related Cached Report Context\n")
-        report.append("---\n**Cached Report Excerpt:**\n\n" + report_context[:1000] + ("..." if len(report_context) > 1000 else ""))
         # Simple heuristic: check if any error types from logs appear in the report context
-        related = []
-        for err in error_counter:
-            if err in report_context:
-                related.append(err)
-        if related:
-            report.append(f"\n**The following error types from the logs were also mentioned in the cached report:**\n- " + ", ".join(related))
-        else:
-            report.append("\nNo direct overlap found between log errors and cached report.")
-        # LLM summary section
-        log_findings_summary = '\n'.join(report)
-        llm_summary = summarize_relationship_with_llm(log_findings_summary, report_context, api_key=llm_api_key)
-        report.append("\n## LLM Summary: Relationship Between Logs and Cached Report\n")
-        report.append(llm_summary)
+        related = [err for err in analysis.error_counter if err in report_context]
+        result.report_context = ReportContext(report_context[:1000], len(report_context) > 1000, related)
+        # The LLM sees the report rendered so far
+        with perf.stage("llm summary"):
+            result.report_context.llm_summary = summarize_relationship_with_llm(render_markdown(result), report_context, hub, llm_api_key, cache=llm_cache)
     # LLM patch suggestions for errors/warnings
     if code_files_context:
-        report.append("\n## LLM Patch Suggestions for Errors/Warnings\n")
-        for err_line in error_lines:
-            patch = suggest_patch_with_llm(err_line, code_files_context, api_key=llm_api_key)
-            report.append(f"### Patch Suggestion for: {err_line.strip()}\n{patch}\n")
+        with perf.stage("llm patch suggestions"):
+            suggestions = suggest_patches(result.templates, code_files_context, api_key=llm_api_key,
+                                          concurrency=llm_concurrency, timeout=llm_timeout, retries=llm_retries, cache=llm_cache, hub=hub)
+        result.suggestions = [PatchSuggestion(template, patch) for template, patch in suggestions]
     if code_context:
-        report.append("\n## Code Context (from GitHub)\n")
         if isinstance(code_context, dict):
-            if 'readme' in code_context and code_context['readme']:
-                report.append("### README.md\n\n" + code_context['readme'][:1000] + ('...' if len(code_context['readme']) > 1000 else ''))
-            if 'files' in code_context:
-                report.append(f"\n### Files in repo: {len(code_context['files'])}")
-    return '\n'.join(report) 
\ No newline at end of file
+            result.code_context = CodeContextSummary(code_context.get('readme'), len(code_context['files']) if 'files' in code_context else None)
+        else:
+            result.code_context = CodeContextSummary(None, None)
+    return result
@@ -0,0 +1,220 @@
+import os
+import time
+from collections import Counter, deque
+from rich.console import Group
+from rich.live import Live
+from rich.table import Table
+from log_analysis import ERROR_TYPE_PATTERN, LEVEL_NAMES, LOG_LEVEL_DETECTOR, is_error_line, new_trace_trackers, trace_candidate_check
+from log_input import decode_line
+
+FOLLOW_READ_LIMIT = 8 << 20  # per file per poll, so one busy file can't stall the others
+POLL_INTERVAL = 0.1
+REFRESH_INTERVAL = 0.25
+ROLLING_WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+RECENT_TRACES = 5
+
+class FileFollower:
+    """
+    tail -F for one path: yields lines appended since the last call, follows
+    the path to a new file after rotation (draining the old one first),
+    starts over after truncation and waits for a missing file to appear.
+    """
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self._f = None
+        self._ident = None
+        self._pending = b""
+        self._open(seek_end=not from_start)
+
+    def _open(self, seek_end):
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            self._f = None
+            return
+        st = os.fstat(f.fileno())
+        self._ident = (st.st_dev, st.st_ino)
+        if seek_end:
+            f.seek(0, os.SEEK_END)
+        self._f = f
+
+    def _split(self, data, final=False):
+        data = self._pending + data
+        cut = len(data) if final else data.rfind(b"\n") + 1
+        self._pending = data[cut:]
+        return data[:cut].splitlines(keepends=True)
+
+    def read_lines(self):
+        """
+        Return the raw complete lines appended since the previous call.
+        """
+        if self._f is None:
+            self._open(seek_end=False)
+            if self._f is None:
+                return []
+        data = self._f.read(FOLLOW_READ_LIMIT)
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            st = None
+        if st is None or (st.st_dev, st.st_ino) != self._ident:
+            if len(data) == FOLLOW_READ_LIMIT:
+                # old file not drained yet
+                return self._split(data)
+            lines = self._split(data, final=True)
+            self._f.close()
+            self._open(seek_end=False)
+            return lines
+        if st.st_size < self._f.tell():
+            # truncated (copytruncate): start over from the beginning
+            self._f.seek(0)
+            self._pending = b""
+        return self._split(data)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+class RollingCounters:
+    """
+    Event counts over sliding wall-clock windows (1m, 5m, 1h by default).
+    Counts land in per-second slots; each window keeps a running total and
+    subtracts slots as they age out, so updates and reads are O(1) amortized.
+    """
+    def __init__(self, windows=ROLLING_WINDOWS):
+        self.windows = dict(windows)
+        self.totals = {name: Counter() for name in self.windows}
+        self._slots = {name: deque() for name in self.windows}
+        self._current = None
+
+    def add(self, events, now=None):
+        now = int(time.time() if now is None else now)
+        if self._current is None or self._current[0] != now:
+            self._current = (now, Counter())
+            for slots in self._slots.values():
+                slots.append(self._current)
+        self._current[1].update(events)
+        for total in self.totals.values():
+            total.update(events)
+
+    def expire(self, now=None):
+        now = int(time.time() if now is None else now)
+        for name, width in self.windows.items():
+            slots = self._slots[name]
+            total = self.totals[name]
+            while slots and slots[0][0] <= now - width:
+                total.subtract(slots.popleft()[1])
+            # drop keys that fell back to zero
+            self.totals[name] = +total
+
+class LiveAnalyzer:
+    """
+    Runs the analyze_log_file detectors (levels, error types, stack traces)
+    over appended lines and turns each batch into rolling-window counts.
+    Stack trace state is kept per file so interleaved files don't mix.
+    """
+    def __init__(self, paths, from_start=False):
+        self.followers = [FileFollower(path, from_start) for path in paths]
+        self.trackers = {path: new_trace_trackers() for path in paths}
+        self._in_trace = Counter()
+        self._trace_candidate = trace_candidate_check(t.format for t in self.trackers[paths[0]].values()) if paths else None
+        self.line_totals = Counter()
+        self.rolling = RollingCounters()
+        self.recent_traces = deque(maxlen=RECENT_TRACES)
+
+    def _analyze(self, path, raws):
+        events = Counter()
+        events["lines"] = len(raws)
+        trackers = self.trackers[path].values()
+        is_candidate = self._trace_candidate
+        in_trace = self._in_trace[path]
+        for raw in raws:
+            lvl = LOG_LEVEL_DETECTOR.search(raw.upper())
+            if lvl:
+                events["level:" + LEVEL_NAMES[lvl.group(1)]] += 1
+            if is_error_line(raw):
+                for err in ERROR_TYPE_PATTERN.findall(decode_line(raw)):
+                    events["error:" + err] += 1
+            if in_trace or is_candidate is None or is_candidate(raw):
+                in_trace = False
+                for tracker in trackers:
+                    tracker.feed(raw)
+                    in_trace = in_trace or tracker.in_trace
+        self._in_trace[path] = in_trace
+        for tracker in trackers:
+            if tracker.traces:
+                events["trace:" + tracker.format.language] += len(tracker.traces)
+                for trace in tracker.traces:
+                    self.recent_traces.append((path, trace[0].strip()))
+                tracker.traces = []
+                tracker.trace_epochs = []
+        return events
+
+    def poll(self):
+        """
+        Read and analyze whatever was appended; return the number of lines.
+        """
+        count = 0
+        for follower in self.followers:
+            raws = follower.read_lines()
+            if raws:
+                self.line_totals[follower.path] += len(raws)
+                self.rolling.add(self._analyze(follower.path, raws))
+                count += len(raws)
+        self.rolling.expire()
+        return count
+
+    def close(self):
+        for follower in self.followers:
+            follower.close()
+
+def render_live_view(live):
+    windows = list(live.rolling.windows)
+    summary = Table(title="Rolling window", expand=True)
+    summary.add_column("")
+    for name in windows:
+        summary.add_column(name, justify="right")
+    keys = ["lines"] + sorted({k for t in live.rolling.totals.values() for k in t if k.startswith(("level:", "trace:"))})
+    for key in keys:
+        kind, _, name = key.partition(":")
+        label = "Lines" if key == "lines" else (f"{name} traces" if kind == "trace" else name)
+        summary.add_row(label, *(str(live.rolling.totals[w][key]) for w in windows))
+    errors = Table(title="Top error types (last 1h)", expand=True)
+    errors.add_column("Type")
+    errors.add_column("Count", justify="right")
+    top = [(k, c) for k, c in live.rolling.totals[windows[-1]].most_common() if k.startswith("error:")][:10]
+    for key, cnt in top:
+        errors.add_row(key.split(":", 1)[1], str(cnt))
+    files = Table(title="Files", expand=True)
+    files.add_column("Path")
+    files.add_column("Lines read", justify="right")
+    for follower in live.followers:
+        files.add_row(follower.path, str(live.line_totals[follower.path]))
+    traces = Table(title="Recent stack traces", expand=True)
+    traces.add_column("File")
+    traces.add_column("First line")
+    for path, first in reversed(live.recent_traces):
+        traces.add_row(path, first)
+    return Group(summary, errors, traces, files)
+
+def follow_log_files(paths, from_start=False, console=None):
+    """
+    Follow local log files like tail -F and show rolling 1m/5m/1h
+    aggregates in a Rich live view until interrupted with Ctrl+C.
+    """
+    live = LiveAnalyzer(paths, from_start)
+    last_render = 0.0
+    try:
+        with Live(render_live_view(live), console=console, refresh_per_second=4) as view:
+            while True:
+                if not live.poll():
+                    time.sleep(POLL_INTERVAL)
+                now = time.monotonic()
+                if now - last_render >= REFRESH_INTERVAL:
+                    view.update(render_live_view(live))
+                    last_render = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        live.close()
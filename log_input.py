@@ -0,0 +1,131 @@
+import bz2
+import gzip
+import mmap
+import os
+from contextlib import contextmanager
+
+READ_CHUNK_SIZE = 1 << 20  # 1 MiB per read keeps memory flat on multi-GB logs
+LOG_ENCODING = "utf-8"
+
+# Leading bytes of each supported archive format
+COMPRESSION_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+def detect_compression(path):
+    """
+    Return "gzip", "bz2", "zstd" or None, judged by magic bytes so rotated
+    archives without the usual extension are still recognised.
+    """
+    with open(path, "rb") as f:
+        head = f.read(4)
+    for magic, kind in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+def decode_line(raw):
+    """
+    Decode one raw line, never raising on bad bytes, and normalise the line
+    ending to "\\n" the way text-mode reads do.
+    """
+    if raw.endswith(b"\r\n"):
+        raw = raw[:-2] + b"\n"
+    elif raw.endswith(b"\r"):
+        raw = raw[:-1] + b"\n"
+    return raw.decode(LOG_ENCODING, errors="replace")
+
+def iter_stream_lines(f, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield raw lines (line ending kept) from a binary stream, reading it in
+    fixed-size chunks. Splitting follows universal newlines: \\n, \\r\\n and \\r.
+    """
+    pending = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        chunk = pending + chunk
+        # Hold back everything after the last \n; a trailing \r may be half
+        # of a \r\n pair split across reads.
+        cut = chunk.rfind(b"\n") + 1
+        if not cut:
+            # old Mac-style \r-only endings
+            cut = chunk.rfind(b"\r", 0, len(chunk) - 1) + 1
+        pending = chunk[cut:]
+        if cut:
+            yield from chunk[:cut].splitlines(keepends=True)
+    if pending:
+        yield from pending.splitlines(keepends=True)
+
+def iter_mmap_lines(mm, start=0, end=None, block_size=READ_CHUNK_SIZE):
+    """
+    Yield raw lines from the byte range [start, end) of a memory map. Blocks
+    are cut after a newline, so only one block is materialised at a time.
+    """
+    end = len(mm) if end is None else end
+    pos = start
+    while pos < end:
+        stop = min(pos + block_size, end)
+        if stop < end:
+            nl = mm.rfind(b"\n", pos, stop)
+            if nl == -1:
+                # a single line longer than the block
+                nl = mm.find(b"\n", stop, end)
+            stop = end if nl == -1 else nl + 1
+        yield from mm[pos:stop].splitlines(keepends=True)
+        pos = stop
+
+def _open_compressed(path, kind):
+    if kind == "gzip":
+        return gzip.open(path, "rb")
+    if kind == "bz2":
+        return bz2.open(path, "rb")
+    try:
+        import zstandard  # optional: only needed for .zst archives
+    except ImportError:
+        raise RuntimeError(f"{path} is zstd-compressed; install the 'zstandard' package to read it") from None
+    f = open(path, "rb")
+    reader = zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+    return reader
+
+@contextmanager
+def open_log_lines(path, start=0, end=None):
+    """
+    Context manager yielding an iterator of raw byte lines for a log file.
+
+    Plain files are memory-mapped (optionally just the [start, end) byte
+    range); gzip, bz2 and zstd archives are decompressed as a stream, never
+    to disk. Decoding is left to the caller, which can skip it for lines it
+    throws away.
+    """
+    kind = detect_compression(path)
+    if kind:
+        if start or end is not None:
+            raise ValueError("byte ranges are only supported for uncompressed logs")
+        with _open_compressed(path, kind) as f:
+            yield iter_stream_lines(f)
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap refuses empty files
+            yield iter(())
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield iter_mmap_lines(mm, start, end)
+
+def complete_lines_end(path):
+    """
+    Offset just past the last "\\n" of a plain file: everything before it is
+    whole lines, anything after may still be being written.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.rfind(b"\n") + 1
+
+def is_compressed(path):
+    return detect_compression(path) is not None
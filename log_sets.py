@@ -0,0 +1,123 @@
+import glob
+import os
+import re
+from itertools import islice
+from log_input import open_log_lines
+from timestamps import parse_epoch
+
+# logrotate-style names: app.log, app.log.1, app.log.2.gz, app.log-20240301.gz,
+# app.log.2024-03-01. The base name ("app.log") names the rotation set.
+ROTATION_PATTERN = re.compile(
+    r"^(?P<base>.+?)"
+    r"(?:[.-](?P<date>\d{4}-?\d{2}-?\d{2}(?:[-_T]?\d{2,6})?)|\.(?P<index>\d+))?"
+    r"(?P<ext>\.(?:gz|bz2|zst))?$"
+)
+GLOB_CHARS = re.compile(r"[*?[]")
+FIRST_EPOCH_LINES = 1000
+# Written next to reports or logs (time indexes), never logs themselves
+SKIPPED_SUFFIXES = (".checkpoint.json", ".tmp", ".tsidx", ".search.sqlite", ".search.sqlite-journal")
+
+def is_log_set(spec):
+    """
+    True for what names several logs: a directory, a glob pattern or a
+    list of paths.
+    """
+    if not isinstance(spec, str):
+        return True
+    return os.path.isdir(spec) or (GLOB_CHARS.search(spec) is not None and not os.path.isfile(spec))
+
+def _wanted(path):
+    name = os.path.basename(path)
+    return not name.startswith(".") and not name.endswith(SKIPPED_SUFFIXES)
+
+def expand_log_paths(spec):
+    """
+    Sorted, de-duplicated log files named by a path, directory (searched
+    recursively), glob pattern ("**" recurses) or a list of those. Hidden
+    files, checkpoints and time indexes are skipped. Raises
+    FileNotFoundError when nothing matches.
+    """
+    specs = [spec] if isinstance(spec, str) else list(spec)
+    paths = set()
+    for item in specs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                paths.update(os.path.join(root, name) for name in files)
+        elif os.path.isfile(item):
+            paths.add(item)
+        else:
+            paths.update(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+    paths = sorted(p for p in paths if _wanted(p))
+    if not paths:
+        raise FileNotFoundError(f"No log files match {', '.join(specs)}")
+    return paths
+
+def rotation_key(path):
+    """
+    (set name, suffix order) of a log file. The set name is the path
+    without its rotation suffix. Within a set, dated files sort by date,
+    numbered ones from the highest number down, and the unsuffixed
+    (current) file comes last.
+    """
+    directory, name = os.path.split(path)
+    m = ROTATION_PATTERN.match(name)
+    set_name = os.path.join(directory, m.group("base"))
+    if m.group("date"):
+        return set_name, (0, m.group("date").replace("-", ""))
+    if m.group("index"):
+        return set_name, (1, -int(m.group("index")))
+    # "app.log.gz" without a number is an archive of app.log, so older
+    return set_name, (1 if m.group("ext") else 2, 0)
+
+def first_epoch(path, max_lines=FIRST_EPOCH_LINES):
+    """
+    Epoch seconds of the first timestamp among a log's first lines, or None.
+    """
+    with open_log_lines(path) as lines:
+        for raw in islice(lines, max_lines):
+            epoch = parse_epoch(raw)
+            if epoch is not None:
+                return epoch
+    return None
+
+def order_by_time(paths):
+    """
+    Files of one rotation set, oldest first: by their first timestamp when
+    every file has one, otherwise by rotation suffix, then modification time.
+    """
+    ordered = sorted(paths, key=lambda p: (rotation_key(p)[1], os.path.getmtime(p)))
+    if len(ordered) > 1:
+        epochs = {path: first_epoch(path) for path in ordered}
+        if None not in epochs.values():
+            ordered.sort(key=epochs.__getitem__)
+    return ordered
+
+def rotation_sets(paths):
+    """
+    Group log files into rotation sets: [(set name, [paths oldest first])],
+    sorted by set name.
+    """
+    sets = {}
+    for path in paths:
+        sets.setdefault(rotation_key(path)[0], []).append(path)
+    return [(name, order_by_time(members)) for name, members in sorted(sets.items())]
+
+def log_label(spec):
+    """
+    File-name friendly label for a log path, directory, glob or list of
+    paths, as used in report names: "app.log" for a file, "var_log_app_.log"
+    for "/var/log/app*.log".
+    """
+    specs = [spec] if isinstance(spec, str) else list(spec)
+    if len(specs) > 1:
+        try:
+            common = os.path.commonpath(specs)
+        except ValueError:
+            common = ""
+        name = os.path.basename(common) or "logs"
+    elif GLOB_CHARS.search(specs[0]):
+        name = re.sub(r"[^\w.-]+", "_", specs[0]).strip("_.")
+    else:
+        name = os.path.basename(os.path.normpath(specs[0]))
+    return name or "logs"
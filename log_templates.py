@@ -0,0 +1,229 @@
+import re
+from collections import OrderedDict
+from timestamps import TIMESTAMP_PATTERN
+
+WILDCARD = "<*>"
+# Variable parts of a message. Lines that differ only by time, IDs,
+# addresses, ports or counts end up with the same tokens.
+VARIABLE_MASKS = [
+    (re.compile(TIMESTAMP_PATTERN.pattern.decode("ascii")), "<TS>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{12,}\b"), "<HEX>"),
+    (re.compile(r"\d+"), "<NUM>"),
+]
+TREE_DEPTH = 4
+SIMILARITY_THRESHOLD = 0.4
+MAX_CHILDREN = 100
+MAX_SAMPLES = 3
+_MEMO_LIMIT = 1 << 16
+
+def mask_variables(line):
+    for pattern, mask in VARIABLE_MASKS:
+        line = pattern.sub(mask, line)
+    return line
+
+class LogTemplate:
+    """
+    One cluster of similar lines: the shared tokens (differing positions
+    become <*>), how many lines matched, when the first and last of them
+    were logged (epoch seconds, if they had a timestamp) and a few samples.
+    """
+    def __init__(self, template_id, tokens, path):
+        self.id = template_id
+        self.tokens = tokens
+        self.path = path
+        self.count = 0
+        self.first_seen = None
+        self.last_seen = None
+        self.samples = []
+
+    @property
+    def text(self):
+        return " ".join(self.tokens)
+
+    def _seen(self, first, last):
+        if first is not None and (self.first_seen is None or first < self.first_seen):
+            self.first_seen = first
+        if last is not None and (self.last_seen is None or last > self.last_seen):
+            self.last_seen = last
+
+    def _absorb(self, tokens):
+        if tokens != self.tokens:
+            self.tokens = [a if a == b else WILDCARD for a, b in zip(self.tokens, tokens)]
+
+    def to_state(self):
+        return {
+            "id": self.id,
+            "tokens": self.tokens,
+            "path": list(self.path),
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "samples": self.samples,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        template = cls(state["id"], state["tokens"], tuple(state["path"]))
+        template.count = state["count"]
+        template.first_seen = state["first_seen"]
+        template.last_seen = state["last_seen"]
+        template.samples = state["samples"]
+        return template
+
+class TemplateMiner:
+    """
+    Online log template miner after Drain (He et al., ICWS 2017). A line is
+    masked and tokenized, then routed through a fixed-depth tree keyed by
+    token count and its first few tokens to a short list of templates; the
+    most similar one absorbs it if enough tokens agree, otherwise the line
+    starts a new template. Each line costs O(depth + leaf size).
+
+    With max_templates set, the least recently matched templates are
+    dropped beyond that many, so long-running users stay bounded.
+    """
+    def __init__(self, depth=TREE_DEPTH, similarity=SIMILARITY_THRESHOLD, max_children=MAX_CHILDREN,
+                 max_samples=MAX_SAMPLES, max_templates=None):
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_samples = max_samples
+        self.max_templates = max_templates
+        self.templates = OrderedDict()
+        self._next_id = 1
+        self._children = {}  # tree node (path prefix) -> child keys
+        self._leaves = {}  # full path -> templates
+        # masked line -> template, so repeats skip the tree entirely
+        self._memo = {}
+
+    def _path(self, tokens):
+        # Route by length, then by the first tokens. Tokens holding a
+        # masked variable go to the wildcard branch, as does anything past
+        # max_children distinct values at one level.
+        path = (len(tokens),)
+        for token in tokens[:self.depth]:
+            if "<" in token:
+                key = WILDCARD
+            else:
+                children = self._children.setdefault(path, set())
+                if token not in children and len(children) >= self.max_children:
+                    key = WILDCARD
+                else:
+                    children.add(token)
+                    key = token
+            path += (key,)
+        return path
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_memo"] = {}
+        return state
+
+    def _register_path(self, path):
+        for i in range(1, len(path)):
+            if path[i] != WILDCARD:
+                self._children.setdefault(path[:i], set()).add(path[i])
+
+    def _best_match(self, leaf, tokens):
+        best, best_score = None, None
+        for template in leaf:
+            same = params = 0
+            for a, b in zip(template.tokens, tokens):
+                if a == WILDCARD:
+                    params += 1
+                elif a == b:
+                    same += 1
+            score = (same / len(tokens) if tokens else 1.0, params)
+            if best_score is None or score > best_score:
+                best, best_score = template, score
+        if best is not None and best_score[0] >= self.similarity:
+            return best
+        return None
+
+    def _match(self, tokens, path):
+        leaf = self._leaves.setdefault(path, [])
+        template = self._best_match(leaf, tokens)
+        if template is None:
+            template = LogTemplate(self._next_id, list(tokens), path)
+            self._next_id += 1
+            leaf.append(template)
+            self.templates[template.id] = template
+            self._evict()
+        else:
+            template._absorb(tokens)
+            if self.max_templates is not None:
+                self.templates.move_to_end(template.id)
+        return template
+
+    def _evict(self):
+        if self.max_templates is None:
+            return
+        while len(self.templates) > self.max_templates:
+            _, stale = self.templates.popitem(last=False)
+            self._leaves[stale.path].remove(stale)
+
+    def add(self, line, epoch=None):
+        """
+        Assign a line (with its timestamp as epoch seconds, if known) to a
+        template and return that template.
+        """
+        masked = mask_variables(line)
+        template = self._memo.get(masked)
+        if template is None or template.id not in self.templates:
+            tokens = masked.split()
+            template = self._match(tokens, self._path(tokens))
+            if len(self._memo) >= _MEMO_LIMIT:
+                self._memo.clear()
+            self._memo[masked] = template
+        elif self.max_templates is not None:
+            self.templates.move_to_end(template.id)
+        template.count += 1
+        template._seen(epoch, epoch)
+        if len(template.samples) < self.max_samples:
+            sample = line.strip()
+            if sample not in template.samples:
+                template.samples.append(sample)
+        return template
+
+    def merge(self, other):
+        """
+        Fold in the templates of a miner that ran over other input.
+        """
+        for theirs in other.templates.values():
+            # Their tokens may already hold wildcards, so follow the path
+            # the template was created under rather than re-deriving it.
+            self._register_path(theirs.path)
+            ours = self._match(theirs.tokens, theirs.path)
+            ours.count += theirs.count
+            ours._seen(theirs.first_seen, theirs.last_seen)
+            for sample in theirs.samples:
+                if len(ours.samples) >= self.max_samples:
+                    break
+                if sample not in ours.samples:
+                    ours.samples.append(sample)
+        return self
+
+    def most_common(self, n=None):
+        """
+        Templates by descending line count (ties in first-seen order).
+        """
+        ranked = sorted(self.templates.values(), key=lambda t: -t.count)
+        return ranked if n is None else ranked[:n]
+
+    def __len__(self):
+        return len(self.templates)
+
+    def to_state(self):
+        return {"next_id": self._next_id, "templates": [t.to_state() for t in self.templates.values()]}
+
+    @classmethod
+    def from_state(cls, state, **kwargs):
+        miner = cls(**kwargs)
+        miner._next_id = state["next_id"]
+        for template_state in state["templates"]:
+            template = LogTemplate.from_state(template_state)
+            miner.templates[template.id] = template
+            miner._leaves.setdefault(template.path, []).append(template)
+            miner._register_path(template.path)
+        return miner
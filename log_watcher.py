@@ -0,0 +1,207 @@
+import re
+import time
+from log_input import decode_line
+from log_templates import TemplateMiner
+
+TAIL_ANCHOR_BYTES = 4096
+WATCHER_MAX_TEMPLATES = 10000
+MIN_POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 60.0
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+
+class LogFetchError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Failed to fetch logs: {status_code}")
+        self.status_code = status_code
+
+class HttpLogTail:
+    """
+    Fetches only the part of a remote log that is new since the last poll.
+
+    Servers that honour Range get a byte cursor (206 responses carry just
+    the appended bytes); ETag / Last-Modified make an unchanged log cost a
+    304. When the server ignores all of that and sends the whole body, the
+    last few KB seen so far are located in it and only what follows is new,
+    which also copes with endpoints that return a sliding window of lines.
+    A 206 whose Content-Range does not start at the cursor, or whose total
+    is below it, drops the cursor and refetches the whole body.
+    Only complete lines are ever returned; a partial last line is fetched
+    again on the next poll. Requests go through client (a
+    hub_client.HubClient), which retries server errors within a poll.
+    """
+    def __init__(self, client, path="/logs", headers=None, timeout=30):
+        self.client = client
+        self.path = path
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.offset = 0
+        self.etag = None
+        self.last_modified = None
+        self.anchor = b""
+
+    def _request_headers(self):
+        headers = dict(self.headers)
+        if self.offset:
+            headers["Range"] = f"bytes={self.offset}-"
+            # byte offsets must refer to the unencoded body
+            headers["Accept-Encoding"] = "identity"
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def _reset(self):
+        self.offset = 0
+        self.etag = None
+        self.last_modified = None
+
+    def _seen_prefix_len(self, body):
+        # How much of a full body we have already consumed: up to the last
+        # copy of the anchor, or, for a window that slid past part of the
+        # anchor, the longest whole-line suffix of it that the body starts with.
+        if not self.anchor:
+            return 0
+        pos = body.rfind(self.anchor)
+        if pos >= 0:
+            return pos + len(self.anchor)
+        start = self.anchor.find(b"\n") + 1
+        while 0 < start < len(self.anchor):
+            if body.startswith(self.anchor[start:]):
+                return len(self.anchor) - start
+            start = self.anchor.find(b"\n", start) + 1
+        return 0
+
+    def _range_matches(self, resp):
+        # A 206 body is only the continuation if it starts at our offset of
+        # a log no shorter than that.
+        m = CONTENT_RANGE_PATTERN.fullmatch(resp.headers.get("Content-Range", "").strip())
+        if m is None or int(m.group(1)) != self.offset:
+            return False
+        return m.group(2) == "*" or int(m.group(2)) >= self.offset
+
+    def poll(self, refetch=True):
+        """
+        Return the new complete lines (decoded, without line endings).
+        Raises LogFetchError for unexpected HTTP statuses.
+        """
+        resp = self.client.request("GET", self.path, headers=self._request_headers(), timeout=self.timeout)
+        if resp.status_code == 304:
+            return []
+        if resp.status_code == 416:
+            # Nothing past our offset. "bytes */<size>" smaller than the
+            # offset means the log was rotated or truncated: start over.
+            total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            if total.isdigit() and int(total) < self.offset:
+                self._reset()
+            return []
+        if resp.status_code not in (200, 206):
+            raise LogFetchError(resp.status_code)
+        if resp.status_code == 206 and not self._range_matches(resp):
+            resp.close()
+            self._reset()
+            # without a cursor the whole body comes back and the anchor
+            # finds where we were
+            return self.poll(refetch=False) if refetch else []
+        body = resp.content
+        if resp.status_code == 206:
+            new = body
+            base = self.offset
+        else:
+            new = body[self._seen_prefix_len(body):]
+            base = len(body) - len(new)
+        cut = new.rfind(b"\n") + 1
+        complete = new[:cut]
+        if complete:
+            self.anchor = (self.anchor + complete)[-TAIL_ANCHOR_BYTES:]
+        self.offset = base + cut
+        if cut == len(new):
+            # validators only describe what we fully consumed
+            self.etag = resp.headers.get("ETag")
+            self.last_modified = resp.headers.get("Last-Modified")
+        else:
+            self.etag = self.last_modified = None
+        return [decode_line(raw).rstrip("\n") for raw in complete.splitlines(keepends=True)]
+
+class AdaptiveInterval:
+    """
+    Poll interval that halves while new entries keep arriving and backs
+    off by half again each time a poll comes back quiet.
+    """
+    def __init__(self, initial=10.0, minimum=MIN_POLL_INTERVAL, maximum=MAX_POLL_INTERVAL):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.current = initial
+
+    def next(self, busy):
+        if busy:
+            self.current = max(self.minimum, self.current / 2)
+        else:
+            self.current = min(self.maximum, self.current * 1.5)
+        return self.current
+
+class BufferedAppender:
+    """
+    Keeps the output file open and flushes at most every flush_interval
+    seconds (and on close) instead of reopening it for every batch.
+    """
+    def __init__(self, path, flush_interval=2.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._f = None
+        self._last_flush = 0.0
+
+    def __enter__(self):
+        self._f = open(self.path, "a", encoding="utf-8", buffering=1 << 16)
+        self._last_flush = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+    def write(self, text):
+        self._f.write(text)
+        self.maybe_flush()
+
+    def write_lines(self, lines):
+        self._f.writelines(line + "\n" for line in lines)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._f.flush()
+            self._last_flush = now
+
+def watch_log_endpoint(client, log_file, stop, on_error=print, path="/logs"):
+    """
+    Poll the hub's log endpoint (path, through client, a
+    hub_client.HubClient) until the stop event is set, appending the first
+    line of each new error/warning template to log_file and, on stop, the
+    per-template counts. Fetch failures are passed to on_error and polling carries on.
+    Returns the TemplateMiner.
+    """
+    tail = HttpLogTail(client, path)
+    templates = TemplateMiner(max_templates=WATCHER_MAX_TEMPLATES)
+    interval = AdaptiveInterval()
+    with BufferedAppender(log_file) as out:
+        out.write(f"# Log Watcher Report\n\n")
+        while not stop.is_set():
+            new_entries = []
+            try:
+                for line in tail.poll():
+                    lower = line.lower()
+                    if ("error" in lower or "warning" in lower) and templates.add(line).count == 1:
+                        new_entries.append(line)
+                if new_entries:
+                    out.write_lines(new_entries)
+            except LogFetchError as e:
+                on_error(f"Failed to fetch logs: {e.status_code}")
+            except Exception as e:
+                on_error(f"Exception in log watcher: {e}")
+            out.maybe_flush()
+            stop.wait(interval.next(bool(new_entries)))
+        if templates:
+            out.write("\n## Error Templates\n\n")
+            out.write_lines(f"- {t.count} × `{t.text}`" for t in templates.most_common())
+    return templates
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+PERCENTILES = (50, 90, 99)
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_TOP_ALLOCATIONS = 25
+TRACEMALLOC_FRAMES = 10
+
+class Metrics:
+    """
+    Per-stage wall time, call counts, bytes and lines, plus the latency of
+    every outbound HTTP call, for one run (or one interactive session).
+    Stages are recorded while the object is active (see recording); safe to
+    record into from several threads.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+        self.http = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds=0.0, calls=1, nbytes=0, lines=0):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0, "lines": 0})
+            stage["calls"] += calls
+            stage["seconds"] += seconds
+            stage["bytes"] += nbytes
+            stage["lines"] += lines
+
+    def add_http(self, label, seconds, status):
+        # status is the HTTP status code, or the exception name of a failed call
+        with self._lock:
+            call = self.http.setdefault(label, {"latencies": [], "statuses": {}})
+            call["latencies"].append(seconds)
+            call["statuses"][str(status)] = call["statuses"].get(str(status), 0) + 1
+
+    def to_dict(self):
+        """
+        JSON-serializable summary: throughput per stage and latency
+        percentiles (nearest rank, in milliseconds) per HTTP endpoint.
+        """
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+            http = {label: (sorted(call["latencies"]), dict(call["statuses"])) for label, call in self.http.items()}
+        for stage in stages.values():
+            seconds = stage["seconds"]
+            stage["seconds"] = round(seconds, 6)
+            stage["mb_per_sec"] = round(stage["bytes"] / (1 << 20) / seconds, 2) if stage["bytes"] and seconds > 0 else None
+            stage["lines_per_sec"] = round(stage["lines"] / seconds, 1) if stage["lines"] and seconds > 0 else None
+        calls = {}
+        for label, (latencies, statuses) in http.items():
+            summary = {
+                "calls": len(latencies),
+                "errors": sum(n for status, n in statuses.items() if not (status.isdigit() and int(status) < 400)),
+                "statuses": statuses,
+                "total_seconds": round(sum(latencies), 6),
+            }
+            for p in PERCENTILES:
+                summary[f"p{p}_ms"] = round(percentile(latencies, p) * 1000, 1)
+            summary["max_ms"] = round(latencies[-1] * 1000, 1)
+            calls[label] = summary
+        return {
+            "started": self.started,
+            "stages": stages,
+            "http": calls,
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+
+def percentile(sorted_values, p):
+    # nearest-rank percentile of an ascending, non-empty list
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+_recorders = []
+
+@contextmanager
+def recording(metrics):
+    """
+    Record stages and HTTP calls into metrics (a Metrics, or None for no-op)
+    until the block ends. Recordings nest: an analysis run inside an
+    interactive session is counted in both.
+    """
+    if metrics is None:
+        yield None
+        return
+    _recorders.append(metrics)
+    try:
+        yield metrics
+    finally:
+        _recorders.remove(metrics)
+
+def active():
+    return bool(_recorders)
+
+def record(name, seconds=0.0, calls=1, nbytes=0, lines=0):
+    for metrics in list(_recorders):
+        metrics.add(name, seconds, calls, nbytes, lines)
+
+@contextmanager
+def stage(name, nbytes=0, lines=0):
+    """
+    Time the block as one call of a stage.
+    """
+    if not _recorders:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, 1, nbytes, lines)
+
+def request(method, url, service, endpoint=None, session=None, **kwargs):
+    """
+    Send an HTTP request through requests (or a requests.Session) and record
+    its latency and status under "<service> <METHOD> <endpoint>"; endpoint
+    defaults to the URL's path, so pass a template such as
+    "/jira/ticket/:id" where the path carries ids. Exceptions propagate.
+    """
+    if session is None:
+        import requests  # deferred, as for every caller of this module
+        session = requests
+    if not _recorders:
+        return session.request(method, url, **kwargs)
+    label = f"{service} {method.upper()} {endpoint or urlsplit(url).path or '/'}"
+    start = time.perf_counter()
+    status = "error"
+    try:
+        resp = session.request(method, url, **kwargs)
+        status = resp.status_code
+        return resp
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        for metrics in list(_recorders):
+            metrics.add_http(label, seconds, status)
+
+def _format_bytes(n):
+    return f"{n / (1 << 20):.1f} MB" if n >= 1 << 20 else f"{n / 1024:.1f} KB"
+
+@contextmanager
+def profiling(path_prefix):
+    """
+    Run the block under cProfile and tracemalloc. Writes <path_prefix>.prof
+    (pstats format, for snakeviz or `python -m pstats`) and
+    <path_prefix>.txt with the slowest functions, peak traced memory and the
+    top allocation sites. Worker processes are not profiled: use one worker
+    to see the scan itself. Expect the run to be several times slower.
+    A path_prefix of None profiles nothing.
+    """
+    if path_prefix is None:
+        yield
+        return
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+    profiler = cProfile.Profile()
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        profiler.dump_stats(path_prefix + ".prof")
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(path_prefix + ".txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+            f.write(f"\nTraced memory: {_format_bytes(current)} at exit, {_format_bytes(peak)} peak\n")
+            f.write(f"\nTop {PROFILE_TOP_ALLOCATIONS} allocation sites:\n")
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
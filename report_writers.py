@@ -0,0 +1,254 @@
+import io
+import json
+import os
+from dataclasses import asdict, fields, is_dataclass
+from perf import PERCENTILES
+from timestamps import epoch_to_datetime
+
+TOP_TEMPLATES = 20
+TOP_ERROR_TYPES = 10
+README_EXCERPT = 1000
+REPORT_FORMATS = ("md", "json", "ndjson")
+
+def _counts(pairs):
+    return ", ".join(f"{key}: {cnt}" for key, cnt in pairs)
+
+def _seen(first, last):
+    if first is None:
+        return ""
+    return f" (first {epoch_to_datetime(first)}, last {epoch_to_datetime(last)})"
+
+def _log_files_section(log_sets):
+    n_files = sum(len(paths) for _, paths in log_sets)
+    sets_label = "rotation set" if len(log_sets) == 1 else "rotation sets"
+    yield f"## Log Files\n- {n_files} files in {len(log_sets)} {sets_label}, oldest first"
+    for set_name, paths in log_sets:
+        yield f"- `{set_name}`: " + " → ".join(f"`{os.path.basename(path)}`" for path in paths)
+    yield ""
+
+def _file_breakdown(summary):
+    # One compact block per file; the full sections above cover all files.
+    yield f"\n### `{summary.path}`"
+    yield f"- Lines: {summary.line_count}; error/warning/exception lines: {summary.error_line_count}; distinct error templates: {summary.distinct_templates}"
+    if summary.levels:
+        yield f"- Levels: {_counts(summary.levels)}"
+    if summary.timeline:
+        yield f"- Log frequency by {summary.timeline_label}: {_counts(summary.timeline)}"
+    if summary.error_types:
+        yield f"- Top error types: {_counts(summary.error_types)}"
+    for language, total, groups in summary.traces:
+        if groups:
+            yield (f"- {language.capitalize()} stack traces: {total} ({len(groups)} distinct): "
+                   + ", ".join(f"`{fingerprint}` × {count}" for fingerprint, count in groups))
+
+def _number(value):
+    return f"{value:.6g}"
+
+def _structured_section(structured):
+    yield f"\n## Structured Records\n- JSON records: {structured.record_count} (parsed with {structured.parser})"
+    if structured.loggers:
+        yield f"- Top loggers: {_counts(structured.loggers)}"
+    for summary in structured.fields:
+        yield f"\n### Field `{summary.name}`\n- Records with the field: {summary.count}"
+        if summary.numeric_count:
+            yield (f"- Numeric values: {summary.numeric_count}; min {_number(summary.minimum)}, max {_number(summary.maximum)}, "
+                   f"mean {_number(summary.mean)}, " + ", ".join(f"p{p} {_number(value)}" for p, value in summary.percentiles))
+        if summary.top_values:
+            yield f"- Top values{' (approximate)' if summary.capped else ''}: {_counts(summary.top_values)}"
+
+def _performance_section(data):
+    yield "\n## Performance"
+    for name, stage in data["stages"].items():
+        parts = [f"{stage['calls']} call{'s' if stage['calls'] != 1 else ''}", f"{stage['seconds']:.3f} s"]
+        if stage["bytes"]:
+            size = stage["bytes"]
+            size_text = f"{size / (1 << 20):.1f} MB" if size >= 1 << 20 else f"{size / 1024:.1f} KB"
+            parts.append(size_text + (f" ({stage['mb_per_sec']:.1f} MB/s)" if stage["mb_per_sec"] else ""))
+        if stage["lines"]:
+            parts.append(f"{stage['lines']} lines")
+        yield f"- {name}: " + ", ".join(parts)
+    if data["http"]:
+        yield "\n### HTTP Calls"
+        for label, call in data["http"].items():
+            failed = f" ({call['errors']} failed)" if call["errors"] else ""
+            yield (f"- `{label}`: {call['calls']} calls{failed}, "
+                   + ", ".join(f"p{p} {call[f'p{p}_ms']:.0f} ms" for p in PERCENTILES) + f", max {call['max_ms']:.0f} ms")
+
+def performance_lines(data):
+    """
+    Markdown lines of the Performance section for perf.Metrics.to_dict() data.
+    """
+    return list(_performance_section(data))
+
+def markdown_chunks(result):
+    """
+    The Markdown report as chunks to be joined with newlines. Sections of a
+    result that are not filled in yet (suggestions, the LLM summary) are
+    left out, so a partial result renders as a prefix of the final report.
+    """
+    if result.error is not None:
+        yield f"# Error\nCould not read log file: {result.error}"
+        return
+    yield f"# Log Analysis Report for `{result.label}`\n"
+    if result.window is not None:
+        since, until = result.window
+        yield f"## Time Window\n- From: {since or 'start of log'}\n- Until: {until or 'end of log'}\n"
+    if result.log_sets is not None:
+        yield from _log_files_section(result.log_sets)
+    yield f"## Log Levels\n" + '\n'.join(f"- {lvl}: {cnt}" for lvl, cnt in result.levels)
+    if result.timeline:
+        yield f"\n## Log Frequency by {result.timeline_label}\n" + '\n'.join(f"- {start}: {cnt}" for start, cnt in result.timeline)
+    yield f"\n## Error Summary\n- Total lines: {result.line_count}\n- Error/Warning/Exception lines: {result.error_line_count}\n- Distinct error templates: {len(result.templates)}\n"
+    if result.error_types:
+        yield "### Top Error/Warning Types\n"
+        for err, count in result.error_types[:TOP_ERROR_TYPES]:
+            yield f"- {err}: {count}"
+    if result.templates:
+        yield "\n### Top Error Templates\n"
+        for template in result.templates[:TOP_TEMPLATES]:
+            yield f"- {template.count} × `{template.text}`{_seen(template.first_seen, template.last_seen)}"
+    for traces in result.traces:
+        if not traces.traces:
+            continue
+        yield f"\n## {traces.language.capitalize()} Stack Traces Found: {traces.total} ({len(traces.traces)} distinct)\n"
+        for idx, trace in enumerate(traces.traces, 1):
+            yield f"### Stack Trace {idx}: `{trace.fingerprint}`\n- Occurrences: {trace.count}"
+            if trace.first_seen is not None:
+                yield f"- First seen: {epoch_to_datetime(trace.first_seen)}\n- Last seen: {epoch_to_datetime(trace.last_seen)}"
+            yield "```"
+            yield from trace.lines
+            yield "```"
+            for snippet in trace.snippets:
+                yield f"#### Code Snippet for {snippet.file} line {snippet.line}\n```"
+                yield snippet.text
+                yield "```"
+    if result.detector_counts:
+        yield "\n## Custom Detector Matches\n" + '\n'.join(f"- {name}: {cnt}" for name, cnt in result.detector_counts)
+    if result.structured is not None:
+        yield from _structured_section(result.structured)
+    if result.files is not None:
+        yield "\n## Per-File Breakdown"
+        for summary in result.files:
+            yield from _file_breakdown(summary)
+    context = result.report_context
+    if context is not None:
+        yield "\n## Related Cached Report Context\n"
+        yield "---\n**Cached Report Excerpt:**\n\n" + context.excerpt + ("..." if context.truncated else "")
+        if context.related_error_types:
+            yield f"\n**The following error types from the logs were also mentioned in the cached report:**\n- " + ", ".join(context.related_error_types)
+        else:
+            yield "\nNo direct overlap found between log errors and cached report."
+        if context.llm_summary is not None:
+            yield "\n## LLM Summary: Relationship Between Logs and Cached Report\n"
+            yield context.llm_summary
+    if result.suggestions is not None:
+        yield "\n## LLM Patch Suggestions for Errors/Warnings\n"
+        yield f"{result.error_line_count} error/warning lines grouped into {len(result.suggestions)} templates.\n"
+        for suggestion in result.suggestions:
+            template = suggestion.template
+            yield f"### Patch Suggestion for: {template.text}\n_Occurrences: {template.count}_\n\nExample: `{template.samples[0]}`\n\n{suggestion.patch}\n"
+    if result.code_context is not None:
+        yield "\n## Code Context (from GitHub)\n"
+        readme = result.code_context.readme
+        if readme:
+            yield "### README.md\n\n" + readme[:README_EXCERPT] + ('...' if len(readme) > README_EXCERPT else '')
+        if result.code_context.file_count is not None:
+            yield f"\n### Files in repo: {result.code_context.file_count}"
+    if result.performance is not None:
+        yield from _performance_section(result.performance)
+
+def write_markdown(result, f):
+    separator = ""
+    for chunk in markdown_chunks(result):
+        f.write(separator)
+        f.write(chunk)
+        separator = "\n"
+
+def render_markdown(result):
+    out = io.StringIO()
+    write_markdown(result, out)
+    return out.getvalue()
+
+def _write_json_value(value, f, depth=0):
+    # The layout of json.dump(asdict(value), indent=2), written piece by
+    # piece: records and lists of records are walked field by field and
+    # item by item, and only their plain values are encoded at once.
+    indent = "\n" + "  " * (depth + 1)
+    if is_dataclass(value):
+        separator = "{"
+        for field in fields(value):
+            f.write(f"{separator}{indent}{json.dumps(field.name)}: ")
+            _write_json_value(getattr(value, field.name), f, depth + 1)
+            separator = ","
+        f.write("\n" + "  " * depth + "}")
+    elif isinstance(value, list) and value and is_dataclass(value[0]):
+        separator = "["
+        for item in value:
+            f.write(separator + indent)
+            _write_json_value(item, f, depth + 1)
+            separator = ","
+        f.write("\n" + "  " * depth + "]")
+    else:
+        f.write(json.dumps(value, indent=2).replace("\n", "\n" + "  " * depth))
+
+def write_json(result, f):
+    """
+    The result as one JSON document, streamed section by section: each
+    template, trace and suggestion is encoded as it is written, without
+    first copying the whole result into dicts.
+    """
+    _write_json_value(result, f)
+    f.write("\n")
+
+def ndjson_records(result):
+    """
+    The result as a stream of flat records, each tagged with a "type":
+    summary, template, trace, structured (with one field record per
+    aggregated field), file, report_context, suggestion, code_context and
+    performance.
+    """
+    yield {
+        "type": "summary", "label": result.label, "error": result.error, "window": result.window, "log_sets": result.log_sets,
+        "line_count": result.line_count, "error_line_count": result.error_line_count, "levels": result.levels,
+        "timeline_label": result.timeline_label, "timeline": result.timeline,
+        "error_types": result.error_types, "detector_counts": result.detector_counts,
+    }
+    for template in result.templates:
+        yield {"type": "template", **asdict(template)}
+    for traces in result.traces:
+        for trace in traces.traces:
+            yield {"type": "trace", **asdict(trace)}
+    if result.structured is not None:
+        structured = result.structured
+        yield {"type": "structured", "record_count": structured.record_count, "parser": structured.parser, "loggers": structured.loggers}
+        for summary in structured.fields:
+            yield {"type": "field", **asdict(summary)}
+    for summary in result.files or ():
+        yield {"type": "file", **asdict(summary)}
+    if result.report_context is not None:
+        yield {"type": "report_context", **asdict(result.report_context)}
+    for suggestion in result.suggestions or ():
+        yield {"type": "suggestion", **asdict(suggestion)}
+    if result.code_context is not None:
+        yield {"type": "code_context", **asdict(result.code_context)}
+    if result.performance is not None:
+        yield {"type": "performance", **result.performance}
+
+def write_ndjson(result, f):
+    for record in ndjson_records(result):
+        f.write(json.dumps(record))
+        f.write("\n")
+
+WRITERS = {"md": write_markdown, "json": write_json, "ndjson": write_ndjson}
+
+def report_path(output_dir, log_name, fmt="md"):
+    return os.path.join(output_dir, f"log_report_{log_name}.{fmt}")
+
+def write_report(result, path, fmt="md"):
+    """
+    Stream the result to path as Markdown, JSON or NDJSON.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown report format {fmt!r}; expected one of {', '.join(REPORT_FORMATS)}")
+    with open(path, "w", encoding="utf-8") as f:
+        WRITERS[fmt](result, f)
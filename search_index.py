@@ -0,0 +1,322 @@
+import json
+import mmap
+import os
+import re
+import shlex
+import sqlite3
+import time
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from itertools import accumulate
+from operator import sub
+from checkpoints import file_identity, same_log
+from log_analysis import LEVEL_NAMES, LOG_LEVEL_DETECTOR, PARALLEL_MIN_BYTES, split_byte_ranges
+from log_input import complete_lines_end, decode_line, is_compressed, open_log_lines
+from log_sets import expand_log_paths
+import perf
+from time_index import index_path, window_range
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_INDEX_SUFFIX = ".search.sqlite"
+# Postings are written per segment of the log, so an interrupted build
+# keeps what it finished and memory stays flat on any size of log.
+SEGMENT_BYTES = 16 << 20
+# A last segment shorter than this (what a growing log's small appends
+# leave) is tokenized again with the next extension, so they don't pile up.
+MIN_SEGMENT_BYTES = SEGMENT_BYTES // 4
+# Words, and numbers of three digits or more: the digits of timestamps and
+# IP octets are left out, order ids and status codes are not.
+TOKEN_PATTERN = re.compile(rb"[a-z_][a-z0-9_]*|[0-9]{3,}")
+DEFAULT_LIMIT = 100
+# Shorter posting lists (most tokens: ids, numbers) are stored uncompressed;
+# zlib's per-call setup costs more than it saves on them.
+COMPRESS_MIN_POSTINGS = 16
+
+def line_tokens(raw):
+    return set(TOKEN_PATTERN.findall(raw.lower()))
+
+def _encode(segment, offsets):
+    # Ascending offsets as 32-bit deltas from the segment's start (segments
+    # are far smaller than 4 GiB), zlib-compressed if there are many.
+    data = array("I", map(sub, offsets, [segment] + offsets[:-1])).tobytes()
+    return zlib.compress(data, 1) if len(offsets) >= COMPRESS_MIN_POSTINGS else data
+
+def _decode(segment, count, data):
+    deltas = array("I")
+    deltas.frombytes(zlib.decompress(data) if count >= COMPRESS_MIN_POSTINGS else data)
+    return map(segment.__add__, accumulate(deltas))
+
+def _tokenize_range(args):
+    # (start, end, [(token, count, encoded offsets)]) of one segment
+    log_file_path, start, end = args
+    postings = {}
+    offset = start
+    with open_log_lines(log_file_path, start, end) as lines:
+        for raw in lines:
+            for token in line_tokens(raw):
+                offsets = postings.get(token)
+                if offsets is None:
+                    postings[token] = [offset]
+                else:
+                    offsets.append(offset)
+            offset += len(raw)
+    # sorted, so rows go into SQLite's B-tree in order
+    return start, end, [(token, len(offsets), _encode(start, offsets)) for token, offsets in sorted(postings.items())]
+
+class SearchIndex:
+    """
+    On-disk inverted index of one plain log, in SQLite: for every token
+    (see TOKEN_PATTERN, case-insensitive) the byte offsets of the lines
+    containing it, delta-encoded and compressed, one row per segment of
+    about SEGMENT_BYTES. Extending it tokenizes only the bytes appended
+    since, plus the last segment if it was still short.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS segments (start INTEGER PRIMARY KEY, end INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " token BLOB NOT NULL, segment INTEGER NOT NULL, count INTEGER NOT NULL, offsets BLOB NOT NULL,"
+            " PRIMARY KEY (token, segment)) WITHOUT ROWID;"
+        )
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        self.log = json.loads(meta["log"]) if meta.get("version") == str(SEARCH_INDEX_VERSION) else None
+        self.end = int(meta.get("end", 0)) if self.log is not None else 0
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _reset(self):
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for table in ("meta", "segments", "postings"):
+                self._conn.execute(f"DELETE FROM {table}")
+        self._conn.execute("VACUUM")
+        self.log = None
+        self.end = 0
+
+    def extend(self, log_file_path, workers=1):
+        """
+        Index the lines appended since the last call, starting over if the
+        log was rotated or truncated. Large stretches are tokenized by a
+        pool of `workers` processes. Returns the number of bytes tokenized.
+        """
+        if self.log is not None and not same_log(self.log, log_file_path, self.end):
+            self._reset()
+        end = complete_lines_end(log_file_path)
+        if end <= self.end:
+            return 0
+        start = self.end
+        last = self._conn.execute("SELECT start, end FROM segments ORDER BY start DESC LIMIT 1").fetchone()
+        if last is not None and last[1] - last[0] < MIN_SEGMENT_BYTES:
+            start = last[0]
+        n_segments = -(-(end - start) // SEGMENT_BYTES)
+        jobs = [(log_file_path, s, e) for s, e in split_byte_ranges(log_file_path, n_segments, start, end)]
+        identity = json.dumps(file_identity(log_file_path))
+        if workers > 1 and len(jobs) > 1 and end - start >= PARALLEL_MIN_BYTES:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                self._store(pool.map(_tokenize_range, jobs), start, identity)
+        else:
+            self._store(map(_tokenize_range, jobs), start, identity)
+        return end - start
+
+    def _store(self, segments, start, identity):
+        conn = self._conn
+        for i, (seg_start, seg_end, postings) in enumerate(segments):
+            with conn:
+                conn.execute("BEGIN")
+                if i == 0:
+                    # the short last segment being rebuilt, if any
+                    conn.execute("DELETE FROM postings WHERE segment >= ?", (start,))
+                    conn.execute("DELETE FROM segments WHERE start >= ?", (start,))
+                conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", ((token, seg_start, count, data) for token, count, data in postings))
+                conn.execute("INSERT INTO segments VALUES (?, ?)", (seg_start, seg_end))
+                conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                 [("version", str(SEARCH_INDEX_VERSION)), ("log", identity), ("end", str(seg_end))])
+            self.log = json.loads(identity)
+            self.end = seg_end
+
+    def count(self, token):
+        return self._conn.execute("SELECT COALESCE(SUM(count), 0) FROM postings WHERE token = ?", (token,)).fetchone()[0]
+
+    def postings(self, token, start=0, end=None):
+        """
+        Ascending offsets of the lines containing token, within the byte
+        range [start, end). Only the segments overlapping the range are
+        read, one at a time.
+        """
+        end = self.end if end is None else end
+        rows = self._conn.execute(
+            "SELECT segment, count, offsets FROM postings WHERE token = ? AND segment < ?"
+            " AND segment >= (SELECT COALESCE(MAX(start), 0) FROM segments WHERE start <= ?) ORDER BY segment",
+            (token, end, start))
+        for segment, count, data in rows:
+            for offset in _decode(segment, count, data):
+                if offset >= end:
+                    return
+                if offset >= start:
+                    yield offset
+
+    def stats(self):
+        tokens, rows = self._conn.execute("SELECT COUNT(DISTINCT token), COUNT(*) FROM postings").fetchone()
+        return {"end": self.end, "tokens": tokens, "rows": rows, "bytes": os.path.getsize(self.path)}
+
+def open_search_index(log_file_path, index_dir=None):
+    """
+    The SearchIndex of a plain log, kept next to it as
+    <log>.search.sqlite or in index_dir (see time_index.index_path).
+    """
+    path = index_path(log_file_path, index_dir, SEARCH_INDEX_SUFFIX)
+    if index_dir is not None:
+        os.makedirs(index_dir, exist_ok=True)
+    return SearchIndex(path)
+
+def _extend(index, log_file_path, workers):
+    start = time.perf_counter()
+    size = index.extend(log_file_path, workers)
+    perf.record("search index", time.perf_counter() - start, nbytes=size)
+
+def update_search_indexes(log_spec, index_dir=None, workers=1):
+    """
+    Bring the search index of every file named by log_spec (a path,
+    directory, glob or list, see log_sets.expand_log_paths) up to date.
+    Returns [(path, index stats)]; compressed logs, which cannot be read
+    at an offset, are not indexed and get None.
+    """
+    results = []
+    for path in expand_log_paths(log_spec):
+        if is_compressed(path):
+            results.append((path, None))
+            continue
+        with open_search_index(path, index_dir) as index:
+            _extend(index, path, workers)
+            results.append((path, index.stats()))
+    return results
+
+@dataclass(slots=True)
+class SearchHit:
+    """
+    One matching line, with up to `context` (offset, line) pairs on
+    either side.
+    """
+    path: str
+    offset: int
+    line: str
+    before: list[tuple[int, str]] = field(default_factory=list)
+    after: list[tuple[int, str]] = field(default_factory=list)
+
+class Query:
+    """
+    Words and "quoted phrases" that must all appear in a line, case
+    insensitive. A single word must match a whole token; anything else
+    (a phrase, "order-8812") must appear as written.
+    """
+    def __init__(self, text):
+        try:
+            items = shlex.split(text)
+        except ValueError as e:
+            raise ValueError(f"Bad query {text!r}: {e}") from None
+        self.words = set()
+        self.phrases = []
+        self.tokens = set()
+        for item in items:
+            needle = item.lower().encode("utf-8")
+            if TOKEN_PATTERN.fullmatch(needle):
+                self.words.add(needle)
+            else:
+                self.phrases.append(needle)
+            self.tokens.update(TOKEN_PATTERN.findall(needle))
+        if not self.tokens:
+            raise ValueError(f"Query {text!r} has nothing to look up; it needs a word or a number of three digits or more")
+
+    def matches(self, raw):
+        lowered = raw.lower()
+        return (not self.words or self.words <= set(TOKEN_PATTERN.findall(lowered))) and all(phrase in lowered for phrase in self.phrases)
+
+def _line_at(mm, offset):
+    line_end = mm.find(b"\n", offset)
+    return mm[offset:len(mm) if line_end == -1 else line_end + 1]
+
+def _context(mm, offset, line_len, n):
+    before = []
+    pos = offset
+    while len(before) < n and pos > 0:
+        start = mm.rfind(b"\n", 0, pos - 1) + 1
+        before.append((start, decode_line(mm[start:pos]).rstrip("\n")))
+        pos = start
+    before.reverse()
+    after = []
+    pos = offset + line_len
+    while len(after) < n and pos < len(mm):
+        raw = _line_at(mm, pos)
+        after.append((pos, decode_line(raw).rstrip("\n")))
+        pos += len(raw)
+    return before, after
+
+def search_log(log_file_path, query, since=None, until=None, levels=None, context=0, limit=DEFAULT_LIMIT, index_dir=None, workers=1):
+    """
+    Up to `limit` SearchHits for query (a Query or its text) in one plain
+    log, in file order. since/until (epochs) narrow the search to a time
+    window through the log's time index; levels to lines of those log
+    levels. The index is brought up to date first, so lines appended since
+    the last analysis are found too.
+    """
+    query = query if isinstance(query, Query) else Query(query)
+    if levels is not None:
+        levels = {level.upper() for level in levels}
+    with open_search_index(log_file_path, index_dir) as index:
+        _extend(index, log_file_path, workers)
+        return _search(index, log_file_path, query, since, until, levels, context, limit, index_dir)
+
+def _search(index, log_file_path, query, since, until, levels, context, limit, index_dir):
+    hits = []
+    with perf.stage("search"):
+        counts = {token: index.count(token) for token in query.tokens}
+        if not all(counts.values()):
+            return hits
+        start, end = 0, None
+        if since is not None or until is not None:
+            start, end = window_range(log_file_path, since, until, index_dir)
+        with open(log_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in index.postings(min(counts, key=counts.get), start, end):
+                raw = _line_at(mm, offset)
+                if not query.matches(raw):
+                    continue
+                if levels is not None:
+                    level = LOG_LEVEL_DETECTOR.search(raw.upper())
+                    if level is None or LEVEL_NAMES[level.group(1)] not in levels:
+                        continue
+                hit = SearchHit(log_file_path, offset, decode_line(raw).rstrip("\n"))
+                if context:
+                    hit.before, hit.after = _context(mm, offset, len(raw), context)
+                hits.append(hit)
+                if len(hits) >= limit:
+                    break
+    return hits
+
+def search_logs(log_spec, query, since=None, until=None, levels=None, context=0, limit=DEFAULT_LIMIT, index_dir=None, workers=1):
+    """
+    search_log over every file named by log_spec (a path, directory, glob
+    or list, see log_sets.expand_log_paths), up to `limit` hits in all.
+    Returns (hits, compressed paths that could not be searched).
+    """
+    query = Query(query)
+    hits = []
+    skipped = []
+    for path in expand_log_paths(log_spec):
+        if is_compressed(path):
+            skipped.append(path)
+            continue
+        if len(hits) < limit:
+            hits += search_log(path, query, since, until, levels, context, limit - len(hits), index_dir, workers)
+    return hits, skipped
@@ -0,0 +1,342 @@
+import json
+from array import array
+from collections import Counter
+from math import isfinite, log
+from timestamps import load_numpy, parse_epoch
+
+# Structured (JSON-lines) logs: every line that is a JSON object is read as
+# a record, its level, timestamp, logger, message and exception taken from
+# well-known fields instead of being searched for in the text.
+
+try:
+    import orjson  # optional: parses several times faster than json
+except ImportError:
+    orjson = None
+
+JSON_PARSER = "orjson" if orjson is not None else "json"
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Candidate field names per role, most common first; a dotted name is
+# looked up both as a flat key ("log.level") and nested ({"log": {"level"}}).
+LEVEL_FIELDS = ("level", "levelname", "severity", "log.level", "lvl", "@l")
+TIME_FIELDS = ("timestamp", "time", "@timestamp", "ts", "datetime", "asctime", "@t")
+LOGGER_FIELDS = ("logger", "logger_name", "log.logger", "loggerName", "@logger")
+MESSAGE_FIELDS = ("message", "msg", "event", "@m", "@mt")
+EXCEPTION_FIELDS = ("exception", "exc_info", "stack_trace", "stacktrace", "traceback", "stack", "err", "error", "@x")
+ROLES = (LEVEL_FIELDS, TIME_FIELDS, LOGGER_FIELDS, MESSAGE_FIELDS, EXCEPTION_FIELDS)
+
+LEVEL_ALIASES = {
+    "WARN": "WARNING", "ERR": "ERROR", "FATAL": "CRITICAL", "CRIT": "CRITICAL", "ALERT": "CRITICAL",
+    "EMERG": "CRITICAL", "EMERGENCY": "CRITICAL", "TRACE": "DEBUG", "VERBOSE": "DEBUG", "NOTICE": "INFO",
+    "INFORMATION": "INFO",
+}
+# pino and bunyan write levels as numbers
+NUMERIC_LEVELS = {10: "DEBUG", 20: "DEBUG", 30: "INFO", 40: "WARNING", 50: "ERROR", 60: "CRITICAL"}
+LEVELS = ("INFO", "ERROR", "WARNING", "DEBUG", "CRITICAL")
+ERROR_LEVELS = frozenset(("WARNING", "ERROR", "CRITICAL"))
+SCHEMA_CACHE_LIMIT = 256
+TOP_VALUES_LIMIT = 10000  # distinct values counted per field before the rarest are dropped
+FIELD_PERCENTILES = (50, 90, 99)
+TOP_FIELD_VALUES = 10
+
+def parse_record(raw):
+    """
+    The JSON object on a raw line, or None if the line is not one.
+    """
+    try:
+        record = _loads(raw)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+def parse_field_spec(spec):
+    """
+    (name, top) for a --field value: "latency_ms", or "status:top" to count
+    the values of a numeric field instead of taking percentiles.
+    """
+    name, _, mode = spec.strip().partition(":")
+    if not name or mode not in ("", "top"):
+        raise ValueError(f"Bad field {spec!r}; expected NAME or NAME:top")
+    return name, mode == "top"
+
+def _path(keys, name):
+    # How to reach name in records with these top-level keys: the key
+    # itself, a tuple of nested keys, or None if they cannot have it.
+    if name in keys:
+        return name
+    parts = tuple(name.split("."))
+    if len(parts) > 1 and parts[0] in keys:
+        return parts
+    return None
+
+def record_schema(keys, fields=()):
+    """
+    For records with these top-level keys: the path (see _path) of the
+    level, timestamp, logger, message and exception fields, then of each
+    aggregated field. Records of one log share a few schemas, so this is
+    worked out once per schema, not per record.
+    """
+    paths = []
+    for candidates in ROLES:
+        paths.append(next((path for path in (_path(keys, name) for name in candidates) if path is not None), None))
+    return tuple(paths), tuple(_path(keys, name) for name in fields)
+
+def field_value(record, path):
+    if path.__class__ is str:
+        return record[path]
+    value = record
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+_level_cache = {}
+
+def level_name(value):
+    """
+    One of LEVELS for a level field's value ("warn", "Error", 50, ...), or
+    None.
+    """
+    if not isinstance(value, str):
+        return NUMERIC_LEVELS.get(value) if value.__class__ is int else None
+    name = _level_cache.get(value)
+    if name is None:
+        upper = value.strip().upper()
+        name = LEVEL_ALIASES.get(upper, upper)
+        if name not in LEVELS:
+            name = ""
+        if len(_level_cache) < SCHEMA_CACHE_LIMIT:
+            _level_cache[value] = name
+    return name or None
+
+def record_epoch(value):
+    """
+    Epoch seconds of a timestamp field: a date-time string in any format
+    parse_epoch reads, or a number of seconds, milliseconds, microseconds
+    or nanoseconds, told apart by magnitude.
+    """
+    if isinstance(value, str):
+        return parse_epoch(value.encode("utf-8"))
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and isfinite(value):
+        if value > 1e17:
+            value /= 1e9
+        elif value > 1e14:
+            value /= 1e6
+        elif value > 1e11:
+            value /= 1e3
+        return int(value)
+    return None
+
+def exception_text(value):
+    """
+    An exception field as text: a formatted traceback string, a list of
+    lines, or an object such as {"type", "message", "stack"}.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "\n".join(map(str, value))
+    if isinstance(value, dict):
+        for key in ("stack", "stack_trace", "stacktrace", "traceback"):
+            if isinstance(value.get(key), str):
+                return value[key]
+        kind = value.get("type") or value.get("name") or value.get("class")
+        message = value.get("message") or value.get("msg")
+        return ": ".join(str(part) for part in (kind, message) if part)
+    return None
+
+def exception_summary(text):
+    # The line that names the exception: the last one of a Python
+    # traceback, the first one otherwise.
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return ""
+    return lines[-1].strip() if lines[0].startswith("Traceback") else lines[0].strip()
+
+class ValueHistogram:
+    """
+    Mergeable log-scale histogram of numbers. Bucket i of the positive (or
+    negative) side holds the values within a factor GAMMA**0.5 of GAMMA**i,
+    so percentiles read from it are within 1% of the exact ones; count,
+    sum, min and max are exact. Values are added in bulk from a float64
+    array, binned with NumPy (for full batches) when it is installed.
+    """
+    GAMMA = 1.02
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.zeros = 0
+        self.positive = {}
+        self.negative = {}
+
+    def add_values(self, values, full_batch=False):
+        numpy = load_numpy() if full_batch else None
+        scale = 1 / log(self.GAMMA)
+        if numpy:
+            data = numpy.frombuffer(values, dtype=numpy.float64)
+            data = data[numpy.isfinite(data)]
+            if not data.size:
+                return
+            count, total, low, high = int(data.size), float(data.sum()), float(data.min()), float(data.max())
+            positive, negative = data[data > 0], -data[data < 0]
+            zeros = count - positive.size - negative.size
+            sides = []
+            for side in (positive, negative):
+                keys, cnts = numpy.unique(numpy.rint(numpy.log(side) * scale).astype(numpy.int64), return_counts=True)
+                sides.append(zip(keys.tolist(), cnts.tolist()))
+        else:
+            data = [value for value in values if isfinite(value)]
+            if not data:
+                return
+            count, total, low, high = len(data), sum(data), min(data), max(data)
+            sides = [Counter(round(log(value) * scale) for value in data if value > 0).items(),
+                     Counter(round(log(-value) * scale) for value in data if value < 0).items()]
+            zeros = data.count(0.0)
+        self._add(count, total, low, high, zeros, *sides)
+
+    def _add(self, count, total, low, high, zeros, positive, negative):
+        self.count += count
+        self.total += total
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+        self.zeros += zeros
+        for buckets, binned in ((self.positive, positive), (self.negative, negative)):
+            for key, cnt in binned:
+                buckets[key] = buckets.get(key, 0) + cnt
+
+    def merge(self, other):
+        if other.count:
+            self._add(other.count, other.total, other.minimum, other.maximum, other.zeros, other.positive.items(), other.negative.items())
+        return self
+
+    def percentile(self, p):
+        """
+        Nearest-rank percentile (as perf.percentile), or None when empty.
+        """
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        ordered = [(-self.GAMMA ** key, cnt) for key, cnt in sorted(self.negative.items(), reverse=True)]
+        ordered.append((0.0, self.zeros))
+        ordered += [(self.GAMMA ** key, cnt) for key, cnt in sorted(self.positive.items())]
+        for value, cnt in ordered:
+            seen += cnt
+            if seen >= rank:
+                return min(max(value, self.minimum), self.maximum)
+        return self.maximum
+
+    def to_state(self):
+        return {
+            "count": self.count, "total": self.total, "minimum": self.minimum, "maximum": self.maximum,
+            "zeros": self.zeros, "positive": list(self.positive.items()), "negative": list(self.negative.items()),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        histogram = cls()
+        histogram.count = state["count"]
+        histogram.total = state["total"]
+        histogram.minimum = state["minimum"]
+        histogram.maximum = state["maximum"]
+        histogram.zeros = state["zeros"]
+        histogram.positive = {key: cnt for key, cnt in state["positive"]}
+        histogram.negative = {key: cnt for key, cnt in state["negative"]}
+        return histogram
+
+class FieldColumn:
+    """
+    Aggregates of one field across structured records, kept in column
+    buffers instead of per-record dicts: numbers are appended to a float64
+    array and other scalars to a list, and both are folded in bulk every
+    FLUSH_AT values, numbers into a ValueHistogram and the rest into a
+    counter of values. With top=True numbers are counted as values too,
+    for codes such as HTTP statuses. Beyond TOP_VALUES_LIMIT distinct
+    values the rarest are dropped and the counts become approximate.
+    """
+    FLUSH_AT = 1 << 16
+
+    def __init__(self, name, top=False):
+        self.name = name
+        self.top = top
+        self.values = Counter()
+        self.value_count = 0
+        self.capped = False
+        self.numbers = ValueHistogram()
+        self._numbers = array("d")
+        self._values = []
+
+    def add(self, value):
+        kind = value.__class__
+        if (kind is int or kind is float) and not self.top:
+            try:
+                self._numbers.append(value)
+            except OverflowError:
+                return
+            if len(self._numbers) >= self.FLUSH_AT:
+                self.flush()
+        elif kind is str or kind is int or kind is float:
+            self._values.append(value)
+            if len(self._values) >= self.FLUSH_AT:
+                self.flush()
+        elif kind is bool:
+            self._values.append("true" if value else "false")
+
+    def flush(self):
+        if self._numbers:
+            self.numbers.add_values(self._numbers, len(self._numbers) >= self.FLUSH_AT)
+            self._numbers = array("d")
+        if self._values:
+            self.value_count += len(self._values)
+            counts = self.values
+            for value, cnt in Counter(self._values).items():
+                key = value if value.__class__ is str else str(value)
+                counts[key] += cnt
+            self._values = []
+            self._cap()
+
+    def _cap(self):
+        if len(self.values) > TOP_VALUES_LIMIT:
+            self.values = Counter(dict(self.values.most_common(TOP_VALUES_LIMIT // 2)))
+            self.capped = True
+
+    @property
+    def count(self):
+        self.flush()
+        return self.numbers.count + self.value_count
+
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        self.values.update(other.values)
+        self.value_count += other.value_count
+        self.capped = self.capped or other.capped
+        self.numbers.merge(other.numbers)
+        self._cap()
+        return self
+
+    def to_state(self):
+        self.flush()
+        return {
+            "name": self.name, "top": self.top, "values": list(self.values.items()), "value_count": self.value_count,
+            "capped": self.capped, "numbers": self.numbers.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        column = cls(state["name"], state["top"])
+        column.values = Counter(dict(state["values"]))
+        column.value_count = state["value_count"]
+        column.capped = state["capped"]
+        column.numbers = ValueHistogram.from_state(state["numbers"])
+        return column
+
+def new_columns(fields):
+    """
+    {name: FieldColumn} for --field specs (see parse_field_spec).
+    """
+    return {name: FieldColumn(name, top) for name, top in map(parse_field_spec, fields)}
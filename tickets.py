@@ -0,0 +1,265 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from log_templates import mask_variables
+import perf
+
+# Markdown reports are only parsed back by `llogfather.py tickets`
+PATCH_SECTION_PATTERN = re.compile(r"### Patch Suggestion for: (.*?)\n(.*?)(?=\n### Patch Suggestion for:|\n\n## |\Z)", re.DOTALL)
+EXAMPLE_PATTERN = re.compile(r"^Example: `(.*)`$", re.MULTILINE)
+# A word that still holds a masked variable ("db<NUM>", "req-<HEX>") is an
+# identifier as a whole.
+IDENTIFIER_PATTERN = re.compile(r"\S*<(?:NUM|HEX|UUID|IP)>\S*")
+SUMMARY_LIMIT = 100
+DESCRIPTION_LIMIT = 2000
+DEFAULT_JIRA_URL = "http://localhost:5050"
+JIRA_CONCURRENCY = 4
+SEARCH_TTL = 300  # seconds a project's filed fingerprints are trusted
+SEARCH_PAGE_SIZE = 100  # issues asked for per /jira/search page
+# Every ticket ends with this line; it is how a re-run recognises its tickets.
+FINGERPRINT_LABEL = "llogfather-fingerprint"
+FINGERPRINT_PATTERN = re.compile(re.escape(FINGERPRINT_LABEL) + r": ([0-9a-f]{12})")
+
+@dataclass(slots=True)
+class Ticket:
+    """
+    A suggested Jira ticket. fingerprint identifies the error it was made
+    for, the same on every run over the same problem (see
+    ticket_fingerprint).
+    """
+    summary: str
+    description: str
+    fingerprint: str
+
+    def jira_description(self):
+        marker = f"\n\n{FINGERPRINT_LABEL}: {self.fingerprint}"
+        return self.description[:DESCRIPTION_LIMIT - len(marker)] + marker
+
+def error_signature(line):
+    """
+    An error line with its timestamps, numbers, addresses and the
+    identifiers containing them masked: the exception type and the fixed
+    words of the message.
+    """
+    return " ".join(IDENTIFIER_PATTERN.sub("<*>", mask_variables(line.strip())).split())
+
+def ticket_fingerprint(sample):
+    """
+    Fingerprint of the error a sample line shows. It depends on the line
+    alone, not on the template text, which widens as a run sees more
+    variants of the same error ("db1" becomes "<*>").
+    """
+    return hashlib.sha1(error_signature(sample).encode("utf-8")).hexdigest()[:12]
+
+def _ticket(text, count, sample, patch):
+    description = f"_Occurrences: {count}_\n\nExample: `{sample}`\n\n{patch}"
+    return Ticket(text.strip()[:SUMMARY_LIMIT], description.strip()[:DESCRIPTION_LIMIT], ticket_fingerprint(sample))
+
+def suggested_tickets(result):
+    """
+    A Ticket for every patch suggestion of an AnalysisResult, trimmed to
+    what a Jira ticket takes.
+    """
+    return [_ticket(s.template.text, s.template.count, s.template.samples[0], s.patch) for s in result.suggestions or ()]
+
+def tickets_from_markdown(report):
+    """
+    suggested_tickets for a rendered Markdown report.
+    """
+    tickets = []
+    for error_summary, patch in PATCH_SECTION_PATTERN.findall(report):
+        example = EXAMPLE_PATTERN.search(patch)
+        tickets.append(Ticket(error_summary.strip()[:SUMMARY_LIMIT], patch.strip()[:DESCRIPTION_LIMIT],
+                              ticket_fingerprint(example.group(1) if example else error_summary)))
+    return tickets
+
+def load_report_tickets(path):
+    """
+    suggested_tickets for a report file written in any of the report
+    formats (see report_writers), picked by its extension.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".ndjson"):
+            suggestions = [record for record in map(json.loads, f) if record["type"] == "suggestion"]
+        elif path.endswith(".json"):
+            suggestions = json.load(f)["suggestions"] or []
+        else:
+            return tickets_from_markdown(f.read())
+    return [_ticket(s["template"]["text"], s["template"]["count"], s["template"]["samples"][0], s["patch"]) for s in suggestions]
+
+def write_ticket_report(tickets, log_name, path):
+    with open(path, "w") as tf:
+        tf.write(f"# Suggested Jira Tickets for {log_name}\n\n")
+        for idx, ticket in enumerate(tickets, 1):
+            tf.write(f"## Ticket {idx}\n")
+            tf.write(f"**Summary:** {ticket.summary}\n\n")
+            tf.write(f"**Fingerprint:** `{ticket.fingerprint}`\n\n")
+            tf.write(f"**Description:**\n\n{ticket.description}\n\n")
+
+def _json(resp):
+    if not resp.ok:
+        raise RuntimeError(f"{resp.status_code} {resp.text[:200]}")
+    return resp.json()
+
+def _issues(data):
+    # Search results are Jira's {"issues": [...]} or a bare list
+    if isinstance(data, dict):
+        data = data.get("issues", [])
+    return data if isinstance(data, list) else []
+
+def _issue_key(issue):
+    if not isinstance(issue, dict):
+        return None
+    return issue.get("key") or issue.get("id")
+
+def _issue_fingerprint(issue):
+    fields = issue.get("fields") or issue
+    description = fields.get("description") or ""
+    match = FINGERPRINT_PATTERN.search(description if isinstance(description, str) else json.dumps(description))
+    return match.group(1) if match else None
+
+class JiraClient:
+    """
+    Client for the JIRASSICPACK service (/jira/ticket, /jira/search). One
+    pooled session is shared by all requests. file_tickets sends a batch
+    up to `concurrency` at a time and never files the same fingerprint
+    twice: a /jira/search per project, read page by page, finds the
+    tickets already filed, and its answer (plus every ticket created since) is cached for
+    SEARCH_TTL seconds, which also covers Jira's search index lagging
+    behind fresh tickets.
+    """
+    def __init__(self, jira_url=DEFAULT_JIRA_URL, concurrency=JIRA_CONCURRENCY, timeout=30, session=None):
+        self.url = jira_url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self._filed = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, path, endpoint=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return perf.request(method, f"{self.url}{path}", "jira", endpoint, session=self.session, **kwargs)
+
+    def search(self, jql, start_at=0, max_results=SEARCH_PAGE_SIZE):
+        return _json(self.request("GET", "/jira/search", params={"jql": jql, "startAt": start_at, "maxResults": max_results}))
+
+    def search_all(self, jql):
+        """
+        Every issue matching jql, following startAt/total page by page. The
+        server may cap maxResults; a page shorter than its maxResults ends
+        a search whose total is not reported.
+        """
+        issues = []
+        while True:
+            data = self.search(jql, len(issues))
+            page = _issues(data)
+            issues += page
+            meta = data if isinstance(data, dict) else {}
+            total = meta.get("total")
+            if not page or (total is not None and len(issues) >= total):
+                return issues
+            if total is None and len(page) < (meta.get("maxResults") or SEARCH_PAGE_SIZE):
+                return issues
+
+    def filed_tickets(self, project, refresh=False):
+        """
+        {fingerprint: issue key} of the tickets filed in project by earlier
+        runs, read from every page of the search. Raises if the search
+        fails, rather than risk duplicates.
+        """
+        with self._lock:
+            cached = self._filed.get(project)
+            if cached is not None and not refresh and time.monotonic() - cached[0] < SEARCH_TTL:
+                return cached[1]
+        jql = f'project = "{project}" AND description ~ "{FINGERPRINT_LABEL}"'
+        filed = {}
+        for issue in self.search_all(jql):
+            fingerprint = _issue_fingerprint(issue)
+            if fingerprint is not None:
+                filed.setdefault(fingerprint, _issue_key(issue))
+        with self._lock:
+            self._filed[project] = (time.monotonic(), filed)
+        return filed
+
+    def create(self, project, ticket, issuetype="Task"):
+        payload = {
+            "project": project,
+            "summary": ticket.summary,
+            "description": ticket.jira_description(),
+            "issuetype": issuetype
+        }
+        return _json(self.request("POST", "/jira/ticket", json=payload))
+
+    def update(self, issue_key, ticket):
+        payload = {"fields": {"summary": ticket.summary, "description": ticket.jira_description()}}
+        return _json(self.request("PUT", f"/jira/ticket/{issue_key}", "/jira/ticket/:id", json=payload))
+
+    def file_tickets(self, project, tickets, issuetype="Task", update_existing=False):
+        """
+        Create the tickets not filed yet; with update_existing, rewrite the
+        ones that were instead of skipping them. Returns (ticket, action,
+        detail) per distinct fingerprint, in order: action is "created" or
+        "updated" (detail is the service's response), "skipped" (detail is
+        the existing issue key) or "failed" (detail is the error).
+        """
+        filed = self.filed_tickets(project)
+        unique = {}
+        for ticket in tickets:
+            unique.setdefault(ticket.fingerprint, ticket)
+
+        def file(ticket):
+            with self._lock:
+                issue_key = filed.get(ticket.fingerprint)
+                known = ticket.fingerprint in filed
+            try:
+                if not known:
+                    response = self.create(project, ticket, issuetype)
+                    with self._lock:
+                        filed[ticket.fingerprint] = _issue_key(response)
+                    return ticket, "created", response
+                if update_existing and issue_key:
+                    return ticket, "updated", self.update(issue_key, ticket)
+                return ticket, "skipped", issue_key
+            except Exception as e:
+                return ticket, "failed", str(e)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(file, unique.values()))
+
+def describe_filed(results):
+    """
+    One line per file_tickets result, such as "created OPS-12: <summary>".
+    """
+    lines = []
+    for ticket, action, detail in results:
+        if action == "failed":
+            lines.append(f"failed: {ticket.summary} ({detail})")
+        else:
+            issue_key = detail if action == "skipped" else _issue_key(detail)
+            lines.append(f"{action} {issue_key or '?'}: {ticket.summary}")
+    return lines
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_jira_client(jira_url=DEFAULT_JIRA_URL, concurrency=JIRA_CONCURRENCY):
+    """
+    Shared client per service URL, so connections and the search cache are
+    reused across calls.
+    """
+    key = (jira_url.rstrip("/"), concurrency)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = JiraClient(jira_url, concurrency)
+        return _clients[key]
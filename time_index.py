@@ -0,0 +1,192 @@
+import hashlib
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from checkpoints import file_identity, same_log
+from log_input import complete_lines_end
+from timestamps import TimestampParser, parse_epoch
+
+INDEX_VERSION = 1
+INDEX_INTERVAL = 64 << 10  # one entry per 64 KiB: ~5 MB of index for a 20 GB log
+INDEX_SUFFIX = ".tsidx"
+
+class TimeIndex:
+    """
+    Sparse timestamp index of a plain log file: for every `interval` bytes,
+    the offset of the first line in that stretch that has a timestamp, and
+    the timestamp. A time window is then found by binary search plus a scan
+    of at most two stretches, whatever the size of the log.
+
+    Logs are assumed to be written in time order, as they nearly always
+    are: the window starts at the first line at or after `since` and ends
+    before the first line after `until`.
+    """
+    def __init__(self, interval=INDEX_INTERVAL):
+        self.interval = interval
+        self.offsets = array("q")
+        self.epochs = array("q")
+        self.end = 0  # bytes covered: the log's complete lines when last extended
+        self.log = None
+
+    def extend(self, log_file_path):
+        """
+        Index the lines appended since the last call, re-sampling the last,
+        possibly partial, stretch. Returns whether anything was added.
+        """
+        end = complete_lines_end(log_file_path)
+        if end <= self.end:
+            return False
+        first = self.end // self.interval * self.interval
+        keep = bisect_left(self.offsets, first)
+        del self.offsets[keep:], self.epochs[keep:]
+        with open(log_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for block in range(first, end, self.interval):
+                limit = min(block + self.interval, end)
+                pos = 0 if block == 0 else mm.find(b"\n", block - 1, limit) + 1
+                if not pos and block:
+                    continue  # one line spans the whole stretch
+                while pos < limit:
+                    line_end = mm.find(b"\n", pos, end) + 1
+                    epoch = parse_epoch(mm[pos:line_end])
+                    if epoch is not None:
+                        self.offsets.append(pos)
+                        self.epochs.append(epoch)
+                        break
+                    pos = line_end
+        self.end = end
+        self.log = file_identity(log_file_path)
+        return True
+
+    def byte_range(self, log_file_path, since=None, until=None):
+        """
+        (start, end) byte offsets of the lines timestamped within
+        [since, until] (epochs, either may be None), together with the
+        untimestamped lines (stack traces) that follow them.
+        """
+        if not self.end:
+            return 0, 0
+        offsets, epochs = self.offsets, self.epochs
+        with open(log_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            if since is not None:
+                i = bisect_left(epochs, since)
+                start = self._first_line(mm, offsets[i - 1] if i else 0, offsets[i] if i < len(offsets) else self.end, lambda epoch: epoch >= since)
+            end = self.end
+            if until is not None:
+                j = bisect_right(epochs, until)
+                lo = max(start, offsets[j - 1] if j else 0)
+                end = self._first_line(mm, lo, max(lo, offsets[j] if j < len(offsets) else self.end), lambda epoch: epoch > until)
+        return start, max(start, end)
+
+    def _first_line(self, mm, pos, stop, wanted):
+        # Offset of the first line in [pos, stop) whose timestamp is wanted,
+        # else stop; both ends are line starts.
+        while pos < stop:
+            line_end = mm.find(b"\n", pos, self.end) + 1
+            epoch = parse_epoch(mm[pos:line_end])
+            if epoch is not None and wanted(epoch):
+                return pos
+            pos = line_end
+        return stop
+
+    def save(self, path):
+        header = {
+            "version": INDEX_VERSION,
+            "interval": self.interval,
+            "byteorder": sys.byteorder,
+            "log": self.log,
+            "end": self.end,
+            "entries": len(self.offsets),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(self.offsets.tobytes())
+            f.write(self.epochs.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        The saved index, or None if there is none or it cannot be read.
+        """
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+        if not isinstance(header, dict) or header.get("version") != INDEX_VERSION or header.get("byteorder") != sys.byteorder:
+            return None
+        index = cls(header["interval"])
+        n = header["entries"]
+        index.offsets.frombytes(data[:n * index.offsets.itemsize])
+        index.epochs.frombytes(data[n * index.offsets.itemsize:])
+        if len(index.offsets) != n or len(index.epochs) != n:
+            return None
+        index.end = header["end"]
+        index.log = header["log"]
+        return index
+
+    def matches(self, log_file_path):
+        """
+        Whether the index still describes this file: not rotated, and not
+        truncated below what was indexed.
+        """
+        return self.log is not None and same_log(self.log, log_file_path, self.end)
+
+def index_path(log_file_path, index_dir=None, suffix=INDEX_SUFFIX):
+    """
+    Where a log's index is kept: next to it as <log>.tsidx (or another
+    suffix), or in index_dir (for logs in read-only directories) under its
+    name and a hash of its absolute path.
+    """
+    if index_dir is None:
+        return log_file_path + suffix
+    digest = hashlib.sha1(os.path.abspath(log_file_path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(index_dir, f"{os.path.basename(log_file_path)}.{digest}{suffix}")
+
+def load_time_index(log_file_path, index_dir=None, interval=INDEX_INTERVAL):
+    """
+    The log's time index, brought up to date: loaded from its sidecar file,
+    extended over the bytes appended since and saved back. The index is
+    built from scratch on first use and after rotation or truncation. If
+    the sidecar cannot be written the index still serves this run.
+    """
+    path = index_path(log_file_path, index_dir)
+    index = TimeIndex.load(path)
+    if index is None or index.interval != interval or not index.matches(log_file_path):
+        index = TimeIndex(interval)
+    if index.extend(log_file_path):
+        try:
+            if index_dir is not None:
+                os.makedirs(index_dir, exist_ok=True)
+            index.save(path)
+        except OSError:
+            pass
+    return index
+
+def window_range(log_file_path, since=None, until=None, index_dir=None):
+    """
+    (start, end) byte range of a plain log covering the time window
+    [since, until] (epochs), found through its time index.
+    """
+    return load_time_index(log_file_path, index_dir).byte_range(log_file_path, since, until)
+
+def window_lines(lines, since=None, until=None):
+    """
+    The raw lines of a stream within [since, until], for compressed logs,
+    which cannot be indexed. A line without a timestamp goes with the last
+    line that had one.
+    """
+    keep = since is None
+    parse = TimestampParser().parse
+    for raw in lines:
+        epoch = parse(raw)
+        if epoch is not None:
+            keep = (since is None or epoch >= since) and (until is None or epoch <= until)
+        if keep:
+            yield raw
@@ -0,0 +1,218 @@
+import re
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+MONTHS = {m.encode(): i for i, m in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+# Every format ends in ":SS", which parse_epoch relies on.
+TIMESTAMP_FORMATS = {
+    # 2024-03-01 10:22:33 / 2024-03-01T10:22:33
+    "iso": rb"(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2}):(\d{2})",
+    # 2024/03/01 10:22:33
+    "slash": rb"(\d{4})/(\d{2})/(\d{2})[ T:](\d{2}):(\d{2}):(\d{2})",
+    # Apache/nginx access logs: 01/Mar/2024:10:22:33
+    "clf": rb"(\d{2})/([A-Z][a-z]{2})/(\d{4}):(\d{2}):(\d{2}):(\d{2})",
+    # syslog: Mar  1 10:22:33
+    "syslog": rb"\b([A-Z][a-z]{2}) {1,2}(\d{1,2}) (\d{2}):(\d{2}):(\d{2})",
+}
+FORMAT_PATTERNS = {name: re.compile(pattern) for name, pattern in TIMESTAMP_FORMATS.items()}
+# All formats in one scan; the named outer group tells which one matched.
+TIMESTAMP_PATTERN = re.compile(b"|".join(b"(?P<%s>%s)" % (name.encode(), pattern) for name, pattern in TIMESTAMP_FORMATS.items()))
+
+BUCKET_SECONDS = {"minute": 60, "5min": 300, "hour": 3600, "day": 86400}
+BUCKET_LABELS = {"minute": "Minute", "5min": "5 Minutes", "hour": "Hour", "day": "Day"}
+
+_numpy = None
+
+def load_numpy():
+    # Imported on the first full batch rather than at startup: numpy alone
+    # takes longer to import than the rest of a small analysis.
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:  # optional: histogramming falls back to Counter
+            numpy = False
+        _numpy = numpy
+    return _numpy
+
+_MINUTE_CACHE_LIMIT = 1 << 16
+_minute_cache = {}
+_MISSING = object()
+_CLOCK_REFRESH = 60  # seconds between looks at the calendar
+_clock = [0.0, 0, 0]  # next refresh, current year, current month
+
+def syslog_year(month):
+    """
+    The year of a syslog stamp, which carries none: the current one, or
+    the year before for a month later than the current one (December
+    lines read in January). Worked out at parse time, so a long-running
+    watch crosses New Year correctly.
+    """
+    now = time.time()
+    if now >= _clock[0]:
+        today = datetime.now()
+        _clock[:] = [now + _CLOCK_REFRESH, today.year, today.month]
+    return _clock[1] - 1 if month > _clock[2] else _clock[1]
+
+def _minute_epoch(kind, stamp, year=None):
+    # year is only given for syslog stamps, which lack one (see syslog_year)
+    g = FORMAT_PATTERNS[kind].match(stamp).group
+    if kind in ("iso", "slash"):
+        year, month, day = int(g(1)), int(g(2)), int(g(3))
+        hour, minute = int(g(4)), int(g(5))
+    elif kind == "clf":
+        day, month, year = int(g(1)), MONTHS.get(g(2)), int(g(3))
+        hour, minute = int(g(4)), int(g(5))
+    else:
+        month, day = MONTHS.get(g(1)), int(g(2))
+        hour, minute = int(g(3)), int(g(4))
+    if month is None:
+        return None
+    try:
+        dt = datetime(year, month, day, hour, minute)
+    except ValueError:
+        return None
+    return (dt - EPOCH) // timedelta(seconds=1)
+
+def _stamp_epoch(kind, stamp):
+    # Parses are cached per minute prefix (and, for syslog, per year).
+    prefix = stamp[:-3]
+    year = None
+    if kind == "syslog":
+        month = MONTHS.get(stamp[:3])
+        if month is None:
+            return None
+        year = syslog_year(month)
+        prefix = (prefix, year)
+    base = _minute_cache.get(prefix, _MISSING)
+    if base is _MISSING:
+        if len(_minute_cache) >= _MINUTE_CACHE_LIMIT:
+            _minute_cache.clear()
+        base = _minute_cache[prefix] = _minute_epoch(kind, stamp, year)
+    if base is None:
+        return None
+    second = int(stamp[-2:])
+    return base + second if second < 60 else None
+
+def parse_epoch(line):
+    """
+    Return the first timestamp in a raw byte line as integer seconds since
+    the epoch (the wall-clock time, read as UTC), or None. Parses are cached
+    per minute prefix, so a busy log mostly costs one regex search, a dict
+    lookup and an int() of the seconds per line.
+    """
+    m = TIMESTAMP_PATTERN.search(line)
+    if m is None:
+        return None
+    return _stamp_epoch(m.lastgroup, m.group(0))
+
+class TimestampParser:
+    """
+    parse_epoch for one stream of lines. Logs rarely mix formats, so the
+    format last seen is searched for on its own first; its match is kept
+    only if no timestamp of another format starts earlier in the line, so
+    the result is always parse_epoch's. Each analyzer (and each thread)
+    keeps its own parser.
+    """
+    def __init__(self):
+        self.kind = "iso"
+        self.pattern = FORMAT_PATTERNS["iso"]
+
+    def parse(self, line):
+        m = self.pattern.search(line)
+        if m is not None and m.start():
+            earlier = TIMESTAMP_PATTERN.search(line, 0, m.start())
+            if earlier is not None:
+                m = None
+        if m is None:
+            m = TIMESTAMP_PATTERN.search(line)
+            if m is None:
+                return None
+            self.kind = m.lastgroup
+            self.pattern = FORMAT_PATTERNS[self.kind]
+        return _stamp_epoch(self.kind, m.group(0))
+
+def epoch_to_datetime(epoch):
+    return EPOCH + timedelta(seconds=epoch)
+
+def time_bound(text):
+    """
+    Parse a --since/--until value, "2024-03-01 14:05", "2024-03-01T14:05:30"
+    or "2024-03-01", to epoch seconds on the same wall clock as parse_epoch.
+    """
+    try:
+        dt = datetime.fromisoformat(text.strip())
+    except ValueError:
+        raise ValueError(f"Unrecognised time {text!r}; expected YYYY-MM-DD [HH:MM[:SS]]") from None
+    # Log timestamps carry no zone, so neither does the window.
+    return (dt.replace(tzinfo=None) - EPOCH) // timedelta(seconds=1)
+
+class TimeHistogram:
+    """
+    Counts timestamps per fixed-size bucket (minute, 5min, hour or day).
+    Epochs are buffered in a compact int64 array and binned in bulk, with
+    NumPy (for full batches) when it is installed.
+    """
+    FLUSH_AT = 1 << 16
+
+    def __init__(self, bucket="hour"):
+        if bucket not in BUCKET_SECONDS:
+            raise ValueError(f"Unknown time bucket {bucket!r}; expected one of {', '.join(BUCKET_SECONDS)}")
+        self.bucket = bucket
+        self.width = BUCKET_SECONDS[bucket]
+        self.counts = {}
+        self._pending = array("q")
+
+    def add(self, epoch):
+        self._pending.append(epoch)
+        if len(self._pending) >= self.FLUSH_AT:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        numpy = load_numpy() if len(self._pending) >= self.FLUSH_AT else None
+        if numpy:
+            keys, cnts = numpy.unique(numpy.frombuffer(self._pending, dtype=numpy.int64) // self.width, return_counts=True)
+            binned = zip(keys.tolist(), cnts.tolist())
+        else:
+            binned = Counter(map(self.width.__rfloordiv__, self._pending)).items()
+        counts = self.counts
+        for key, cnt in binned:
+            counts[key] = counts.get(key, 0) + cnt
+        self._pending = array("q")
+
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        for key, cnt in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + cnt
+        return self
+
+    def to_state(self):
+        self.flush()
+        return {"bucket": self.bucket, "counts": list(self.counts.items())}
+
+    @classmethod
+    def from_state(cls, state):
+        histogram = cls(state["bucket"])
+        histogram.counts = {key: cnt for key, cnt in state["counts"]}
+        return histogram
+
+    def items(self):
+        """
+        Sorted (bucket start as datetime, count) pairs.
+        """
+        self.flush()
+        return [(epoch_to_datetime(key * self.width), cnt) for key, cnt in sorted(self.counts.items())]
+
+    @property
+    def label(self):
+        return BUCKET_LABELS[self.bucket]
+
+    def __bool__(self):
+        return bool(self.counts) or bool(self._pending)